@@ -0,0 +1,90 @@
+"""Hot-path latency of the services against the configured database backend.
+
+Runs the write and read paths through the services only, so the same script
+can be pointed at Postgres or at SQLite (including ``:memory:``) and the
+numbers compared side by side:
+
+    DB_BACKEND=sqlite python -m benchmarks.backends
+    DB_BACKEND=postgres python -m benchmarks.backends
+"""
+import asyncio
+import argparse
+import random
+from time import perf_counter
+from statistics import median, quantiles
+
+from watchdog.database.config import database_config
+from watchdog.database.database import Database
+from watchdog.database.migrations import MigrationManager
+from watchdog.database.pagination import DEFAULT_LIMIT
+from watchdog.routing.alertas.service import AlertasService
+from watchdog.routing.clientes.enums import RiskLevelEnum, StatusKycEnum
+from watchdog.routing.clientes.schemas import ClienteRequest
+from watchdog.routing.clientes.service import ClientesService
+from watchdog.routing.relatorios.service import RelatorioService
+from watchdog.routing.transacoes.enums import MoedaEnum, TipoTransacaoEnum
+from watchdog.routing.transacoes.schemas import TransancaoRequest
+from watchdog.routing.transacoes.service import TransacoesService
+
+
+def new_transacao(cliente_ids: list[str]) -> TransancaoRequest:
+    return TransancaoRequest(
+        cliente_id=random.choice(cliente_ids),
+        tipo=TipoTransacaoEnum.DEPOSITO,
+        valor=round(random.uniform(1, 600), 2),
+        moeda=random.choice(list(MoedaEnum)),
+        contraparte=random.choice(cliente_ids) if random.random() < 0.3 else None
+    )
+
+
+async def seed_clientes(clientes: int) -> list[str]:
+    ids = []
+    for i in range(clientes):
+        cliente = await ClientesService.create_cliente(ClienteRequest(
+            nome=f"Cliente {i}",
+            email=f"cliente{i}@bench.example.com",
+            pais="Iran" if i % 50 == 0 else "Brasil",
+            nivel_risco=RiskLevelEnum.BAIXO,
+            status_kyc=StatusKycEnum.APROVADO
+        ))
+        ids.append(str(cliente.id))
+    return ids
+
+
+async def timed(name: str, call, repeat: int) -> None:
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        await call()
+        timings.append((perf_counter() - start) * 1000)
+    p95 = quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+    print(f"  {name:<44} p50 {median(timings):9.2f} ms   p95 {p95:9.2f} ms")
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(f"Backend: {database_config.backend}")
+    await MigrationManager.upgrade()
+    cliente_ids = await seed_clientes(args.clientes)
+    cliente_id = cliente_ids[0]
+
+    await timed("POST /transacoes", lambda: TransacoesService.create(new_transacao(cliente_ids)), args.repeat)
+    batch = [new_transacao(cliente_ids) for _ in range(args.batch)]
+    await timed(f"POST /transacoes/batch ({args.batch})", lambda: TransacoesService.create_batch(batch), 3)
+    await timed("GET /transacoes/filter (cliente)", lambda: TransacoesService.get_transactions_page(
+        cliente_id=cliente_id, moeda=None, tipo=None, periodo_inicio=None, periodo_fim=None,
+        limit=DEFAULT_LIMIT, cursor=None
+    ), args.repeat)
+    await timed("GET /alertas/filter (cliente)", lambda: AlertasService.get_alertas_page(
+        cliente_id=cliente_id, regra=None, severidade=None, status=None,
+        periodo_inicio=None, periodo_fim=None, limit=DEFAULT_LIMIT, cursor=None
+    ), args.repeat)
+    await timed("GET /relatorios (cliente)", lambda: RelatorioService.get_report(cliente_id, None, None), args.repeat)
+    await Database.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clientes", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,86 @@
+"""Rows per second of the vectorized backtest against a per-transaction replay.
+
+Builds a month of synthetic transacoes as NumPy columns, then times sorting
+them into (cliente, moeda, dia) groups and evaluating the rules with a few
+threshold sets, and compares with the rules replayed one transaction at a
+time, as ComplianceService does, over a sample of the rows.
+
+    python -m benchmarks.backtest --transacoes 10000000 --clientes 100000
+"""
+import argparse
+from time import perf_counter
+import numpy as np
+
+from watchdog.compliance.backtest import BacktestService, Colunas
+from watchdog.compliance.config import ValuesLimitConfig
+from watchdog.routing.alertas.enums import RegrasEnum
+
+CENARIOS = [
+    ValuesLimitConfig(),
+    ValuesLimitConfig(LIMIT_AMMOUNT=2000),
+    ValuesLimitConfig(MAX_LOW_AMMOUNT=100, MAX_LOW_AMMOUNT_TIMES=4),
+]
+
+
+def gerar(transacoes: int, clientes: int, seed: int) -> tuple[Colunas, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    inicio = np.datetime64("2025-01-01T00:00:00", "us")
+    contraparte = rng.integers(0, clientes, transacoes)
+    contraparte[rng.random(transacoes) < 0.5] = -1
+    colunas = Colunas(
+        np.arange(transacoes).astype(object),
+        rng.integers(0, clientes, transacoes),
+        rng.integers(0, 3, transacoes).astype(np.int8),
+        inicio + rng.integers(0, 31 * 86400 * 10**6, transacoes).astype("timedelta64[us]"),
+        np.rint(rng.lognormal(4, 1.5, transacoes) * 100).astype(np.int64),
+        contraparte
+    )
+    return colunas, rng.random(clientes) < 0.02
+
+
+def replay(colunas: Colunas, suspeitos: np.ndarray, cenario: ValuesLimitConfig, linhas: int) -> dict:
+    """The rules evaluated transaction by transaction, keeping the day totals in a dict."""
+    totais = {}
+    disparos = {regra: 0 for regra in RegrasEnum}
+    limite = round(cenario.LIMIT_AMMOUNT * 100)
+    baixo = round(cenario.MAX_LOW_AMMOUNT * 100)
+    for cliente, moeda, dia, centavos, contraparte in zip(
+        colunas.cliente[:linhas].tolist(), colunas.moeda[:linhas].tolist(), colunas.dia[:linhas].tolist(),
+        colunas.centavos[:linhas].tolist(), colunas.contraparte[:linhas].tolist()
+    ):
+        total, quantidade_baixo = totais.get((cliente, moeda, dia), (0, 0))
+        disparos[RegrasEnum.LIMITE_DIARIO] += total + centavos > limite
+        disparos[RegrasEnum.TRANSACOES_REPETIDAS] += quantidade_baixo >= cenario.MAX_LOW_AMMOUNT_TIMES
+        disparos[RegrasEnum.PAISES_SUSPEITOS] += contraparte >= 0 and bool(suspeitos[contraparte])
+        totais[(cliente, moeda, dia)] = (total + centavos, quantidade_baixo + (centavos < baixo))
+    return disparos
+
+
+def main(args: argparse.Namespace) -> None:
+    start = perf_counter()
+    colunas, suspeitos = gerar(args.transacoes, args.clientes, args.seed)
+    preparo = perf_counter() - start
+    print(f"{args.transacoes:,} transacoes, {args.clientes:,} clientes")
+    print(f"  {'sort and group':<28} {preparo:8.2f} s (includes generation)")
+
+    for numero, cenario in enumerate(CENARIOS):
+        start = perf_counter()
+        disparos = BacktestService.avaliar(colunas, cenario, suspeitos)
+        contagens = {regra.value: int(np.count_nonzero(mascara)) for regra, mascara in disparos.items()}
+        segundos = perf_counter() - start
+        print(f"  {'cenario ' + str(numero):<28} {segundos:8.2f} s {args.transacoes / segundos:>14,.0f} rows/s  {contagens}")
+
+    linhas = min(args.replay, args.transacoes)
+    start = perf_counter()
+    replay(colunas, suspeitos, CENARIOS[0], linhas)
+    segundos = perf_counter() - start
+    print(f"  {'replay (per transaction)':<28} {segundos:8.2f} s {linhas / segundos:>14,.0f} rows/s  over {linhas:,} rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transacoes", type=int, default=10000000)
+    parser.add_argument("--clientes", type=int, default=100000)
+    parser.add_argument("--replay", type=int, default=500000, help="Rows replayed one at a time for comparison.")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,90 @@
+"""Correctness and throughput of concurrent transactions with per-cliente locks.
+
+Correctness: a burst of concurrent transactions for one cliente, each below
+LIMIT_AMMOUNT, must raise exactly one LIMITE_DIARIO alerta per transaction
+past the limit. Run with --sem-locks to see the lost alertas without them.
+
+Throughput: the same number of concurrent transactions spread over one cliente
+(serialized by its lock) and over many clientes (fully parallel).
+
+    DB_BACKEND=postgres python -m benchmarks.concurrency --concorrencia 50
+"""
+import asyncio
+import argparse
+from time import perf_counter
+
+from watchdog.compliance.config import values_limit
+from watchdog.compliance.locks import ClienteLocks
+from watchdog.database.database import Database
+from watchdog.database.migrations import MigrationManager
+from watchdog.routing.alertas.enums import RegrasEnum
+from watchdog.routing.alertas.service import AlertasService
+from watchdog.routing.clientes.enums import RiskLevelEnum, StatusKycEnum
+from watchdog.routing.clientes.schemas import ClienteRequest
+from watchdog.routing.clientes.service import ClientesService
+from watchdog.routing.transacoes.enums import MoedaEnum, TipoTransacaoEnum
+from watchdog.routing.transacoes.schemas import TransancaoRequest
+from watchdog.routing.transacoes.service import TransacoesService
+
+
+async def new_cliente(nome: str) -> str:
+    cliente = await ClientesService.create_cliente(ClienteRequest(
+        nome=nome,
+        email=f"{nome.lower().replace(' ', '.')}@bench.example.com",
+        pais="Brasil",
+        nivel_risco=RiskLevelEnum.BAIXO,
+        status_kyc=StatusKycEnum.APROVADO
+    ))
+    return str(cliente.id)
+
+
+async def burst(cliente_ids: list[str], concorrencia: int, valor: float) -> float:
+    start = perf_counter()
+    await asyncio.gather(*(
+        TransacoesService.create(TransancaoRequest(
+            cliente_id=cliente_ids[indice % len(cliente_ids)],
+            tipo=TipoTransacaoEnum.DEPOSITO,
+            valor=valor,
+            moeda=MoedaEnum.BRL,
+            contraparte=None
+        ))
+        for indice in range(concorrencia)
+    ))
+    return perf_counter() - start
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.sem_locks:
+        async def no_lock(cliente_ids) -> None:
+            return None
+        ClienteLocks.acquire = no_lock
+
+    await MigrationManager.upgrade()
+    run = perf_counter()
+
+    # Each transaction is a tenth of the limit: from the 11th on, every one exceeds it.
+    valor = values_limit.LIMIT_AMMOUNT / 10
+    cliente_id = await new_cliente(f"Burst {run}")
+    await burst([cliente_id], args.concorrencia, valor)
+    quantidades = await AlertasService.get_quantidade_por_regra(cliente_id, None, None)
+    esperado = max(0, args.concorrencia - 10)
+    obtido = quantidades.get(RegrasEnum.LIMITE_DIARIO, 0)
+    print(
+        f"Correctness ({'without' if args.sem_locks else 'with'} locks): "
+        f"{obtido} LIMITE_DIARIO alertas, expected {esperado}  {'OK' if obtido == esperado else 'MISMATCH'}"
+    )
+
+    um = [await new_cliente(f"Hot {run}")]
+    muitos = [await new_cliente(f"Spread {run} {indice}") for indice in range(args.concorrencia)]
+    for nome, clientes in (("1 cliente", um), (f"{len(muitos)} clientes", muitos)):
+        elapsed = await burst(clientes, args.concorrencia * args.rodadas, valor)
+        print(f"  {nome:<14} {args.concorrencia * args.rodadas / elapsed:>10,.0f} transacoes/s")
+    await Database.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concorrencia", type=int, default=50)
+    parser.add_argument("--rodadas", type=int, default=4)
+    parser.add_argument("--sem-locks", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,81 @@
+"""Per-transaction cost of the counterparty graph rules.
+
+Streams synthetic transactions between clients through GrafoContrapartes, as
+ComplianceService does with COMPLIANCE_GRAPH_ENABLED: the cycle and
+fan-out/fan-in signals are read for each transaction, then it is registered.
+Counterparties follow a Zipf-like distribution, so a few clients are hubs, and
+the transactions span several windows, so edges keep expiring. The window and
+thresholds come from the usual COMPLIANCE_GRAPH_* variables.
+
+    python -m benchmarks.graph --transacoes 2000000 --clientes 200000 --horas 72
+"""
+import os
+import argparse
+import resource
+from uuid import uuid4
+from array import array
+from time import perf_counter, perf_counter_ns
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DB_BACKEND", "sqlite")
+
+import numpy as np
+
+from watchdog.compliance.config import grafo_config
+from watchdog.compliance.graph import GrafoContrapartes
+
+
+def gerar(transacoes: int, clientes: int, horas: float, seed: int) -> tuple[list, np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    ids = [uuid4() for _ in range(clientes)]
+    origens = rng.integers(0, clientes, transacoes)
+    destinos = (rng.zipf(1.5, transacoes) - 1) % clientes
+    # Shuffle the ranks so the hubs are not the first clients.
+    destinos = rng.permutation(clientes)[destinos]
+    segundos = np.sort(rng.uniform(0, horas * 3600, transacoes))
+    return ids, origens, destinos, segundos
+
+
+def main(args: argparse.Namespace) -> None:
+    ids, origens, destinos, segundos = gerar(args.transacoes, args.clientes, args.horas, args.seed)
+    inicio = datetime(2026, 1, 1)
+    rss_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tempos = array("q")
+    ciclos = fan_out = fan_in = 0
+    start = perf_counter()
+    for origem, destino, segundo in zip(origens.tolist(), destinos.tolist(), segundos.tolist()):
+        data_hora = inicio + timedelta(seconds=segundo)
+        antes = perf_counter_ns()
+        sinais = GrafoContrapartes.get_sinais(ids[origem], ids[destino], data_hora)
+        GrafoContrapartes.registrar(ids[origem], ids[destino], data_hora)
+        tempos.append(perf_counter_ns() - antes)
+        ciclos += sinais.ciclo is not None
+        fan_out += sinais.fan_out >= grafo_config.COMPLIANCE_GRAPH_FAN_OUT
+        fan_in += sinais.fan_in >= grafo_config.COMPLIANCE_GRAPH_FAN_IN
+    total = perf_counter() - start
+
+    micros = np.frombuffer(tempos, dtype=np.int64) / 1000
+    stats = GrafoContrapartes.get_stats()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_inicial
+    print(
+        f"{args.transacoes:,} transacoes, {args.clientes:,} clientes over {args.horas:g}h, "
+        f"window {grafo_config.COMPLIANCE_GRAPH_WINDOW_MINUTES} min, cycles up to {grafo_config.COMPLIANCE_GRAPH_MAX_CYCLE}"
+    )
+    print(f"  {args.transacoes / total:,.0f} transacoes/s including the UUID and datetime handling")
+    print(
+        f"  per transaction: p50 {np.percentile(micros, 50):.1f} us, p99 {np.percentile(micros, 99):.1f} us, "
+        f"max {micros.max():.0f} us"
+    )
+    print(f"  alerts: {ciclos:,} cycles, {fan_out:,} fan-out, {fan_in:,} fan-in")
+    print(f"  held at the end: {stats.nos:,} nodes, {stats.arestas:,} edges, {stats.eventos:,} logged transactions")
+    print(f"  max RSS growth: {rss / 1024:,.0f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transacoes", type=int, default=2000000)
+    parser.add_argument("--clientes", type=int, default=200000)
+    parser.add_argument("--horas", type=float, default=72, help="Time spanned by the transactions.")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
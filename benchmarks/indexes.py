@@ -0,0 +1,117 @@
+"""Per-endpoint latency with and without the declared indexes.
+
+Seeds a Postgres database (configured through the usual DB_* variables) with a
+few million transactions, then times the services behind the read endpoints
+with the indexes dropped and again after building them concurrently.
+
+    python -m benchmarks.indexes --transacoes 3000000 --seed
+"""
+import asyncio
+import argparse
+from time import perf_counter
+from statistics import median, quantiles
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+
+from watchdog.database.database import Database
+from watchdog.database.migrations import MigrationManager
+from watchdog.database.partitions import PartitionManager
+from watchdog.database.indexes import IndexManager
+from watchdog.database.pagination import DEFAULT_LIMIT
+from watchdog.routing.alertas.service import AlertasService
+from watchdog.routing.relatorios.service import RelatorioService
+from watchdog.routing.transacoes.enums import MoedaEnum
+from watchdog.routing.transacoes.service import TransacoesService
+
+SEED_QUERIES = [
+    """
+    INSERT INTO clientes
+    SELECT gen_random_uuid(), 'Cliente ' || g, 'cliente' || g || '@bench.local',
+           CASE WHEN g % 50 = 0 THEN 'Iran' ELSE 'Brasil' END, 'Baixo', 'Aprovado', now()
+    FROM generate_series(1, :clientes) g
+    """,
+    """
+    WITH ids AS (SELECT array_agg(id) AS a FROM clientes)
+    INSERT INTO transacoes
+    SELECT gen_random_uuid(), ids.a[1 + g % cardinality(ids.a)], 'Deposito',
+           round((random() * 2000)::numeric, 2),
+           (ARRAY['BRL', 'USD', 'EUR'])[1 + g % 3], NULL,
+           now() - random() * interval '730 days'
+    FROM generate_series(1, :transacoes) g, ids
+    """,
+    """
+    INSERT INTO alertas
+    SELECT gen_random_uuid(), cliente_id, id, 'Limite Diario', 'Baixa', 'Novo', data_hora
+    FROM transacoes WHERE random() < 0.1
+    """,
+    "ANALYZE",
+]
+
+
+async def seed(clientes: int, transacoes: int) -> None:
+    await MigrationManager.upgrade()
+    # The seeded transactions go back two years.
+    await PartitionManager.ensure(desde=date.today() - timedelta(days=731))
+    async with Database.get_engine().begin() as conn:
+        for query in SEED_QUERIES:
+            await conn.execute(text(query), {"clientes": clientes, "transacoes": transacoes})
+
+
+async def sample_ids() -> tuple[str, str]:
+    row = await Database.fetch_one(text(
+        "SELECT cliente_id, transacao_id FROM alertas TABLESAMPLE SYSTEM (1) LIMIT 1"
+    ))
+    return str(row["cliente_id"]), str(row["transacao_id"])
+
+
+def endpoints(cliente_id: str, transacao_id: str) -> dict:
+    fim = datetime.now()
+    inicio = fim - timedelta(days=30)
+    return {
+        "GET /transacoes/filter (cliente, 30d)": lambda: TransacoesService.get_transactions_page(
+            cliente_id=cliente_id, moeda=None, tipo=None, periodo_inicio=inicio, periodo_fim=fim,
+            limit=DEFAULT_LIMIT, cursor=None
+        ),
+        "GET /transacoes/filter (cliente, moeda, 30d)": lambda: TransacoesService.get_transactions_page(
+            cliente_id=cliente_id, moeda=MoedaEnum.BRL, tipo=None, periodo_inicio=inicio, periodo_fim=fim,
+            limit=DEFAULT_LIMIT, cursor=None
+        ),
+        "GET /alertas/by-transacao-id": lambda: AlertasService.get_alertas_by_transacao_id(transacao_id),
+        "GET /alertas/filter (cliente, 30d)": lambda: AlertasService.get_alertas_page(
+            cliente_id=cliente_id, regra=None, severidade=None, status=None,
+            periodo_inicio=inicio, periodo_fim=fim, limit=DEFAULT_LIMIT, cursor=None
+        ),
+        "GET /relatorios (cliente, 30d)": lambda: RelatorioService.get_report(cliente_id, inicio, fim),
+    }
+
+
+async def measure(label: str, repeat: int) -> None:
+    cliente_id, transacao_id = await sample_ids()
+    print(f"\n{label}")
+    for name, call in endpoints(cliente_id, transacao_id).items():
+        timings = []
+        for _ in range(repeat):
+            start = perf_counter()
+            await call()
+            timings.append((perf_counter() - start) * 1000)
+        p95 = quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+        print(f"  {name:<48} p50 {median(timings):9.2f} ms   p95 {p95:9.2f} ms")
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.seed:
+        await seed(args.clientes, args.transacoes)
+    await IndexManager.drop()
+    await measure("Without indexes", args.repeat)
+    await IndexManager.create_concurrently()
+    await measure("With indexes", args.repeat)
+    await Database.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", action="store_true", help="Seed the database before measuring.")
+    parser.add_argument("--clientes", type=int, default=10000)
+    parser.add_argument("--transacoes", type=int, default=3000000)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
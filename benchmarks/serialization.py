@@ -0,0 +1,112 @@
+"""Rows per second serialized for large list responses, with and without APP_FAST_JSON.
+
+Loads transacoes, alertas and clientes rows into an in-memory SQLite database,
+fetches them back as the services do, then times the two response paths:
+
+* models: build the *Response model of every row, then let FastAPI validate
+  and serialize the page through the route's response_model.
+* fast: render the rows straight to JSON bytes with RowsJSONResponse.
+
+    python -m benchmarks.serialization --rows 10000
+"""
+import os
+import asyncio
+import argparse
+from uuid import uuid4
+from time import perf_counter
+from statistics import median
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DB_BACKEND", "sqlite")
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from watchdog.database.database import Database
+from watchdog.database.migrations import MigrationManager
+from watchdog.database.entities import alertas_table, clientes_table, transacoes_table
+from watchdog.routing.alertas.schemas import AlertaResponse, AlertasPage
+from watchdog.routing.clientes.schemas import ClienteResponse, ClientesPage
+from watchdog.routing.responses import page_response
+from watchdog.routing.transacoes.schemas import TransacaoResponse, TransacoesPage
+
+
+async def seed(rows: int) -> None:
+    await MigrationManager.upgrade()
+    now = datetime.now()
+    clientes = [{
+        "id": uuid4(),
+        "nome": f"Cliente {i}",
+        "email": f"cliente{i}@bench.example.com",
+        "pais": "Brasil",
+        "nivel_risco": "Baixo",
+        "status_kyc": "Aprovado",
+        "data_criacao": now - timedelta(seconds=i)
+    } for i in range(rows)]
+    transacoes = [{
+        "id": uuid4(),
+        "cliente_id": clientes[i % len(clientes)]["id"],
+        "tipo": "Deposito",
+        "valor": round(10 + i * 0.37 % 900, 2),
+        "moeda": "BRL",
+        "contraparte": clientes[(i + 1) % len(clientes)]["id"],
+        "data_hora": now - timedelta(seconds=i)
+    } for i in range(rows)]
+    alertas = [{
+        "id": uuid4(),
+        "cliente_id": transacao["cliente_id"],
+        "transacao_id": transacao["id"],
+        "regra": "Limite Diario",
+        "severidade": "Baixa",
+        "status": "Novo",
+        "data_hora": transacao["data_hora"]
+    } for transacao in transacoes]
+    queries = []
+    for table, values in ((clientes_table, clientes), (transacoes_table, transacoes), (alertas_table, alertas)):
+        queries += [table.insert().values(chunk) for chunk in Database.chunk_rows(values)]
+    await Database.execute_many(queries)
+
+
+async def models_path(rows: list, model, page_model) -> bytes:
+    field = create_model_field(name="Response", type_=page_model, mode="serialization")
+    page = page_model(items=[model(**row) for row in rows], next_cursor=None)
+    content = await serialize_response(field=field, response_content=page)
+    return JSONResponse(content).body
+
+
+async def fast_path(rows: list, model, page_model) -> bytes:
+    return page_response(rows, None).body
+
+
+async def main(args: argparse.Namespace) -> None:
+    await seed(args.rows)
+    cases = {
+        "transacoes": (transacoes_table, TransacaoResponse, TransacoesPage),
+        "alertas": (alertas_table, AlertaResponse, AlertasPage),
+        "clientes": (clientes_table, ClienteResponse, ClientesPage),
+    }
+    print(f"{args.rows} rows per response, median of {args.repeat} runs")
+    for name, (table, model, page_model) in cases.items():
+        rows = await Database.fetch_all(table.select().limit(args.rows))
+        results = {}
+        for label, path in (("models", models_path), ("fast", fast_path)):
+            timings = []
+            for _ in range(args.repeat):
+                start = perf_counter()
+                await path(rows, model, page_model)
+                timings.append(perf_counter() - start)
+            results[label] = median(timings)
+        print(
+            f"  {name:<11} models {len(rows) / results['models']:>12,.0f} rows/s   "
+            f"fast {len(rows) / results['fast']:>12,.0f} rows/s   "
+            f"x{results['models'] / results['fast']:.1f}"
+        )
+    await Database.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
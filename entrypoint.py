@@ -1,12 +1,47 @@
+import logging
 import uvicorn
 
 from watchdog.app.settings import entry_settings
+from watchdog.compliance.config import grafo_config, janela_config
+from watchdog.database.config import database_config
+
+logger = logging.getLogger("entrypoint")
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=entry_settings.APP_LOG_LEVEL)
+    workers = entry_settings.workers
+    if workers > 1 and janela_config.COMPLIANCE_WINDOW_MODE == "rolling":
+        logger.warning(
+            "Rolling compliance windows are kept per process: with %d workers the daily rules "
+            "use the calendar-day totals instead.",
+            workers
+        )
+    if workers > 1:
+        logger.info("The report cache is kept per process: disabled with %d workers", workers)
+    if workers > 1 and grafo_config.COMPLIANCE_GRAPH_ENABLED:
+        logger.warning(
+            "The counterparty graph is kept per process: its rules are disabled with %d workers",
+            workers
+        )
+    pool_size, max_overflow = database_config.pool_limits
+    logger.info(
+        "Starting %d worker(s), database pool %d + %d overflow per worker",
+        workers,
+        pool_size,
+        max_overflow
+    )
     uvicorn.run(
         "watchdog.app.main:app",
         host=entry_settings.APP_HOST,
         port=entry_settings.APP_PORT,
-        reload=entry_settings.APP_RELOAD
+        reload=entry_settings.APP_RELOAD,
+        workers=workers,
+        # "auto" picks uvloop and httptools when they are installed.
+        loop=entry_settings.APP_LOOP,
+        http=entry_settings.APP_HTTP,
+        # Recycle each worker after this many requests, 0 to never recycle.
+        limit_max_requests=entry_settings.APP_LIMIT_MAX_REQUESTS or None,
+        timeout_graceful_shutdown=entry_settings.APP_TIMEOUT_GRACEFUL_SHUTDOWN,
+        timeout_keep_alive=entry_settings.APP_TIMEOUT_KEEP_ALIVE
     )
@@ -1,30 +1,91 @@
+from watchdog.app.startup import startup_timer
+from watchdog.app.settings import entry_settings
+
+startup_timer.mark("settings")
+
+import logging
 from fastapi import FastAPI, status
 from contextlib import asynccontextmanager
 
+from watchdog.compliance.config import fila_config, grafo_config, janela_config
+from watchdog.compliance.graph import GrafoContrapartes
+from watchdog.compliance.window import JanelaDeslizante
+from watchdog.compliance.worker import ComplianceWorker
+from watchdog.database.config import database_config
 from watchdog.database.database import Database
+from watchdog.database.migrations import MigrationManager
+from watchdog.database.partitions import PartitionManager
+from watchdog.metrics.config import profiling_config
+from watchdog.metrics.profiling import ProfilingMiddleware
+from watchdog.metrics.queries import QueryTrackingMiddleware
+from watchdog.metrics.router import metrics_router
 from watchdog.routing.clientes.router import clientes_router
 from watchdog.routing.transacoes.router import transacoes_router
 from watchdog.routing.alertas.router import alertas_router
 from watchdog.routing.relatorios.router import relatorio_router
+from watchdog.routing.diagnostico.router import diagnostico_router
+from watchdog.routing.health.router import health_router
+
+startup_timer.mark("imports")
+
+logging.basicConfig(
+    level=entry_settings.APP_LOG_LEVEL,
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Lifespan context manager for FastAPI application."""
-    await Database.init_models()
+    """Lifespan context manager for FastAPI application.
+
+    The schema is only checked against the expected migration version; apply
+    migrations with 'python -m watchdog.database.migrate upgrade', or set
+    DB_MIGRATE_ON_STARTUP.
+    """
+    Database.get_engine()
+    startup_timer.mark("engine")
+    if database_config.migrate_on_startup:
+        await MigrationManager.upgrade()
+    await MigrationManager.check()
+    startup_timer.mark("schema")
+    if database_config.backend == "postgres":
+        await PartitionManager.run_maintenance()
+        PartitionManager.start()
+        startup_timer.mark("particoes")
+    if janela_config.rolling:
+        await JanelaDeslizante.aquecer()
+        startup_timer.mark("janela")
+    if grafo_config.ativo:
+        await GrafoContrapartes.aquecer()
+        startup_timer.mark("grafo")
+    if fila_config.COMPLIANCE_ASYNC:
+        ComplianceWorker.start()
+    startup_timer.log()
     yield
+    await ComplianceWorker.stop()
+    await PartitionManager.stop()
+    await Database.dispose()
 
 
 app = FastAPI(title="UBS Watchdog - Python", version="0.2.0", lifespan=lifespan)
 
+# The last middleware added runs first: the profiler shares the query counters.
+if profiling_config.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(QueryTrackingMiddleware)
+
 
 @app.get("/", status_code=status.HTTP_200_OK, response_model=dict[str, str])
 async def root() -> dict[str, str]:
     return {"message": "UBS Watchdog - Python is running!"}
 
 
+app.include_router(metrics_router)
+app.include_router(health_router)
+
 prefix = "/api"
 app.include_router(clientes_router, prefix=prefix)
 app.include_router(transacoes_router, prefix=prefix)
 app.include_router(alertas_router, prefix=prefix)
 app.include_router(relatorio_router, prefix=prefix)
+app.include_router(diagnostico_router, prefix=prefix)
@@ -1,3 +1,6 @@
+import os
+from typing import Literal
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
 
@@ -6,15 +9,60 @@ class EntryPointSettings(BaseSettings):
     APP_HOST: str = "127.0.0.1"
     APP_PORT: int = 6000
     APP_RELOAD: bool = False
+    APP_FAST_JSON: bool = True
+    APP_LOG_LEVEL: str = "INFO"
+    APP_WORKERS: int = 1
+    APP_LOOP: Literal["auto", "asyncio", "uvloop"] = "auto"
+    APP_HTTP: Literal["auto", "h11", "httptools"] = "auto"
+    APP_LIMIT_MAX_REQUESTS: int = 0
+    APP_TIMEOUT_GRACEFUL_SHUTDOWN: int = 30
+    APP_TIMEOUT_KEEP_ALIVE: int = 5
+
+    @property
+    def workers(self) -> int:
+        """The number of worker processes, one per CPU when APP_WORKERS is 0.
+
+        Always one with APP_RELOAD, since the reloader runs a single process.
+        """
+        if self.APP_RELOAD:
+            return 1
+        return self.APP_WORKERS or os.cpu_count() or 1
 
 
 class DatabaseSettings(BaseSettings):
 
-    DB_NAME: str
-    DB_USER: str
-    DB_PASSWORD: str
-    DB_HOST: str
-    DB_PORT: int
+    DB_BACKEND: Literal["postgres", "sqlite"] = "postgres"
+    DB_SQLITE_PATH: str = ":memory:"
+    DB_NAME: str | None = None
+    DB_USER: str | None = None
+    DB_PASSWORD: str | None = None
+    DB_HOST: str | None = None
+    DB_PORT: int | None = None
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_MAX_CONNECTIONS: int = 0
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    DB_MIGRATE_ON_STARTUP: bool = False
+    DB_PARTITION_MONTHS_AHEAD: int = 3
+    DB_PARTITION_RETENTION_MONTHS: int = 0
+    DB_QUERY_WARN_COUNT: int = 50
+    DB_QUERY_WARN_REPEATS: int = 10
+    DB_QUERY_RAISE: bool = False
+
+    @model_validator(mode="after")
+    def check_postgres_settings(self) -> "DatabaseSettings":
+        if self.DB_BACKEND == "postgres":
+            missing = [
+                name for name in ("DB_NAME", "DB_USER", "DB_PASSWORD", "DB_HOST", "DB_PORT")
+                if getattr(self, name) is None
+            ]
+            if missing:
+                raise ValueError(f"Missing settings for the postgres backend: {', '.join(missing)}")
+        return self
 
 
 entry_settings = EntryPointSettings()
@@ -0,0 +1,39 @@
+import logging
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Duration of each startup step, logged once the application is ready."""
+
+    def __init__(self) -> None:
+        self._inicio = self._ultimo = perf_counter()
+        self._etapas: dict[str, float] = {}
+
+    def mark(self, etapa: str) -> None:
+        """Record the time spent since the previous step.
+
+        Args:
+            etapa (str): The name of the step that just finished.
+        """
+        now = perf_counter()
+        self._etapas[etapa] = now - self._ultimo
+        self._ultimo = now
+
+    def get_etapas(self) -> dict[str, float]:
+        """Get the recorded steps.
+
+        Returns:
+            dict[str, float]: The seconds spent in each step, in startup order.
+        """
+        return dict(self._etapas)
+
+    def log(self) -> None:
+        """Log the total startup time with the breakdown per step."""
+        etapas = ", ".join(f"{etapa} {segundos:.3f}s" for etapa, segundos in self._etapas.items())
+        logger.info("Started in %.3fs (%s)", self._ultimo - self._inicio, etapas)
+
+
+# Created on the first import of the application, before the heavier modules.
+startup_timer = StartupTimer()
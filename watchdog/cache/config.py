@@ -0,0 +1,14 @@
+from pydantic_settings import BaseSettings
+
+
+class CacheConfig(BaseSettings):
+
+    CLIENTE_CACHE_MAXSIZE: int = 10000
+    CLIENTE_CACHE_TTL: float = 300
+    IDEMPOTENCY_CACHE_MAXSIZE: int = 10000
+    IDEMPOTENCY_CACHE_TTL: float = 300
+    RELATORIO_CACHE_MAXSIZE: int = 1000
+    RELATORIO_CACHE_TTL: float = 30
+
+
+cache_config = CacheConfig()
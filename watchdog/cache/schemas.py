@@ -0,0 +1,20 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class CacheStats(BaseModel):
+
+    maxsize: int
+    ttl: float
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+    hit_ratio: float
+
+
+class RespostaCacheada(BaseModel):
+
+    conteudo: bytes
+    etag: str
+    modificado_em: datetime
@@ -0,0 +1,95 @@
+from time import monotonic
+from typing import Any, Hashable
+from collections import OrderedDict
+
+from watchdog.cache.schemas import CacheStats
+
+
+class TTLCache:
+    """Bounded in-process cache with per-entry TTL and LRU eviction."""
+
+    _registry: dict[str, "TTLCache"] = {}
+
+    def __init__(self, name: str, maxsize: int, ttl: float) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        TTLCache._registry[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value from the cache, refreshing its LRU position.
+
+        Args:
+            key (Hashable): The cache key.
+            default (Any): Value returned when the key is missing or expired.
+
+        Returns:
+            Any: The cached value or the default.
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at < monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry when full.
+
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value to store.
+        """
+        self._data[key] = (monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove a key from the cache, if present.
+
+        Args:
+            key (Hashable): The cache key.
+        """
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        self._data.clear()
+
+    def stats(self) -> CacheStats:
+        """Get the cache counters.
+
+        Returns:
+            CacheStats: The cache size, hit, miss and eviction counters.
+        """
+        lookups = self.hits + self.misses
+        return CacheStats(
+            maxsize=self.maxsize,
+            ttl=self.ttl,
+            size=len(self._data),
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            hit_ratio=self.hits / lookups if lookups else 0
+        )
+
+    @classmethod
+    def get_all_stats(cls) -> dict[str, CacheStats]:
+        """Get the counters of every cache created in the process.
+
+        Returns:
+            dict[str, CacheStats]: The counters keyed by cache name.
+        """
+        return {name: cache.stats() for name, cache in cls._registry.items()}
@@ -0,0 +1,365 @@
+"""Vectorized backtest of the compliance thresholds over the stored transacoes.
+
+The history is read one calendar month at a time, as the transacoes partitions,
+into NumPy columns. Each month's rows are sorted by (cliente, moeda, data_hora),
+and the per-day cumulative sums and low value counts the daily rules compare
+against are computed with group-wise cumulative sums, so every candidate
+threshold set costs a few array operations instead of a replay through
+ComplianceService:
+
+    python -m watchdog.compliance.backtest --desde 2025-01-01 --ate 2025-12-31 \\
+        --cenario LIMIT_AMMOUNT=2000 --cenario MAX_LOW_AMMOUNT=100,MAX_LOW_AMMOUNT_TIMES=4 \\
+        --diff diff.csv
+
+The current values_limit is always evaluated first. The rules use calendar-day
+totals, as with COMPLIANCE_WINDOW_MODE=calendar.
+"""
+import csv
+import asyncio
+import logging
+import argparse
+from time import perf_counter
+from typing import TextIO
+from datetime import date, datetime, time
+import numpy as np
+from pydantic import ValidationError
+from sqlalchemy import Float, cast, func, select
+
+from watchdog.database.database import Database
+from watchdog.database.entities import alertas_table, clientes_table, transacoes_table
+from watchdog.database.partitions import add_meses
+from watchdog.compliance.config import ValuesLimitConfig, janela_config, values_limit
+from watchdog.compliance.schemas import RelatorioBacktest, ResultadoBacktest
+from watchdog.routing.alertas.enums import PAISES_SUSPEITOS, RegrasEnum
+from watchdog.routing.transacoes.enums import MoedaEnum
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 50000
+
+MOEDAS = {moeda.value: indice for indice, moeda in enumerate(MoedaEnum)}
+REGRAS = (RegrasEnum.LIMITE_DIARIO, RegrasEnum.TRANSACOES_REPETIDAS, RegrasEnum.PAISES_SUSPEITOS)
+
+
+class Colunas:
+    """The transacoes of a period as columns, sorted by (cliente, moeda, data_hora).
+
+    Values are held in cents, so the running totals are exact.
+    """
+
+    __slots__ = ("ids", "cliente", "moeda", "dia", "centavos", "contraparte", "inicio_grupo", "grupo")
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        cliente: np.ndarray,
+        moeda: np.ndarray,
+        data_hora: np.ndarray,
+        centavos: np.ndarray,
+        contraparte: np.ndarray
+    ) -> None:
+        # lexsort is stable: transacoes with the same data_hora keep their insertion order.
+        ordem = np.lexsort((data_hora, moeda, cliente))
+        self.ids = ids[ordem]
+        self.cliente = cliente[ordem]
+        self.moeda = moeda[ordem]
+        self.dia = data_hora[ordem].astype("datetime64[D]")
+        self.centavos = centavos[ordem]
+        self.contraparte = contraparte[ordem]
+
+        novo_grupo = np.ones(len(ordem), dtype=bool)
+        novo_grupo[1:] = (
+            (self.cliente[1:] != self.cliente[:-1])
+            | (self.moeda[1:] != self.moeda[:-1])
+            | (self.dia[1:] != self.dia[:-1])
+        )
+        # The first row of each (cliente, moeda, dia), and the group of every row.
+        self.inicio_grupo = np.flatnonzero(novo_grupo)
+        self.grupo = np.cumsum(novo_grupo) - 1
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def acumular(self, valores: np.ndarray) -> np.ndarray:
+        """Cumulative sum of the values within each (cliente, moeda, dia), current row included."""
+        acumulado = np.cumsum(valores)
+        anterior = acumulado[self.inicio_grupo] - valores[self.inicio_grupo]
+        return acumulado - anterior[self.grupo]
+
+
+class BacktestService:
+
+    @classmethod
+    def avaliar(
+        cls,
+        colunas: Colunas,
+        cenario: ValuesLimitConfig,
+        suspeitos: np.ndarray
+    ) -> dict[RegrasEnum, np.ndarray]:
+        """Evaluate the rules over a period of transacoes with a set of thresholds.
+
+        Args:
+            colunas (Colunas): The transacoes of the period.
+            cenario (ValuesLimitConfig): The thresholds.
+            suspeitos (np.ndarray): Whether each cliente, by index, is in a suspicious country.
+
+        Returns:
+            dict[RegrasEnum, np.ndarray]: For each rule, whether it fires on each transacao.
+        """
+        baixo_valor = (colunas.centavos < round(cenario.MAX_LOW_AMMOUNT * 100)).astype(np.int64)
+        com_contraparte = colunas.contraparte >= 0
+        paises = np.zeros(len(colunas), dtype=bool)
+        paises[com_contraparte] = suspeitos[colunas.contraparte[com_contraparte]]
+        return {
+            # The day's total including this transacao exceeds the limit.
+            RegrasEnum.LIMITE_DIARIO: colunas.acumular(colunas.centavos) > round(cenario.LIMIT_AMMOUNT * 100),
+            # Enough low value transacoes earlier in the day, this one excluded.
+            RegrasEnum.TRANSACOES_REPETIDAS: (
+                colunas.acumular(baixo_valor) - baixo_valor >= cenario.MAX_LOW_AMMOUNT_TIMES
+            ),
+            RegrasEnum.PAISES_SUSPEITOS: paises,
+        }
+
+    @classmethod
+    async def run(
+        cls,
+        cenarios: list[ValuesLimitConfig],
+        desde: date | None = None,
+        ate: date | None = None,
+        diff: TextIO | None = None
+    ) -> RelatorioBacktest:
+        """Count the alertas each threshold set would have raised over the history.
+
+        Args:
+            cenarios (list[ValuesLimitConfig]): The threshold sets, the current one first.
+            desde (date | None, optional): The first day. Defaults to the oldest transacao.
+            ate (date | None, optional): The last day. Defaults to the newest transacao.
+            diff (TextIO | None, optional): A file receiving, for each threshold set, the
+                alertas it would add (+) or no longer raise (-) against the stored ones,
+                as CSV. Defaults to None.
+
+        Returns:
+            RelatorioBacktest: The alertas per rule of every threshold set and the stored ones.
+        """
+        if janela_config.rolling:
+            logger.warning("The backtest uses calendar-day totals, not the configured rolling window.")
+        start = perf_counter()
+        indices, suspeitos = await cls.__get_clientes()
+        primeiro, ultimo = await cls.__get_limites(desde, ate)
+
+        writer = csv.writer(diff) if diff else None
+        if writer:
+            writer.writerow(["cenario", "transacao_id", "regra", "mudanca"])
+        resultados = [
+            ResultadoBacktest(
+                cenario=numero,
+                LIMIT_AMMOUNT=cenario.LIMIT_AMMOUNT,
+                MAX_LOW_AMMOUNT=cenario.MAX_LOW_AMMOUNT,
+                MAX_LOW_AMMOUNT_TIMES=cenario.MAX_LOW_AMMOUNT_TIMES,
+                alertas={regra: 0 for regra in REGRAS},
+                novos=0 if writer else None,
+                removidos=0 if writer else None
+            )
+            for numero, cenario in enumerate(cenarios)
+        ]
+        registrados = {regra: 0 for regra in REGRAS}
+        transacoes = 0
+
+        mes = primeiro
+        while primeiro and mes <= ultimo:
+            inicio = datetime.combine(max(mes, desde or mes), time.min)
+            fim = datetime.combine(min(add_meses(mes, 1), add_meses(ultimo, 1)), time.min)
+            if ate:
+                fim = min(fim, datetime.combine(ate, time.max))
+            mes = add_meses(mes, 1)
+
+            colunas = await cls.__load(inicio, fim, indices)
+            if not len(colunas):
+                continue
+            transacoes += len(colunas)
+            existentes = await cls.__get_alertas(inicio, fim, completos=writer is not None)
+            if writer:
+                for regra, transacao_id in existentes:
+                    registrados[regra] += 1
+            else:
+                for regra, quantidade in existentes:
+                    registrados[regra] += quantidade
+
+            for resultado, cenario in zip(resultados, cenarios):
+                disparos = cls.avaliar(colunas, cenario, suspeitos)
+                for regra, mascara in disparos.items():
+                    resultado.alertas[regra] += int(np.count_nonzero(mascara))
+                if writer:
+                    previstos = {
+                        (regra, str(transacao_id))
+                        for regra, mascara in disparos.items()
+                        for transacao_id in colunas.ids[mascara]
+                    }
+                    novos = previstos - existentes
+                    removidos = existentes - previstos
+                    resultado.novos += len(novos)
+                    resultado.removidos += len(removidos)
+                    writer.writerows(
+                        (resultado.cenario, transacao_id, regra.value, mudanca)
+                        for mudanca, alteracoes in (("+", novos), ("-", removidos))
+                        for regra, transacao_id in sorted(alteracoes, key=lambda item: item[1])
+                    )
+            logger.info("Backtested %d transacoes before %s", transacoes, fim)
+
+        return RelatorioBacktest(
+            transacoes=transacoes,
+            registrados=registrados,
+            cenarios=resultados,
+            segundos=perf_counter() - start
+        )
+
+    @classmethod
+    async def __get_clientes(cls) -> tuple[dict, np.ndarray]:
+        """Index every cliente, with whether its country is suspicious."""
+        indices = {}
+        suspeitos = []
+        query = select(clientes_table.c.id, clientes_table.c.pais)
+        async for chunk in Database.stream_chunks(query, CHUNK_SIZE):
+            for cliente_id, pais in chunk:
+                indices[cliente_id] = len(suspeitos)
+                suspeitos.append(pais in PAISES_SUSPEITOS)
+        return indices, np.array(suspeitos, dtype=bool)
+
+    @classmethod
+    async def __get_limites(cls, desde: date | None, ate: date | None) -> tuple[date | None, date | None]:
+        """The first days of the first and last months to read, None without transacoes."""
+        if not (desde and ate):
+            row = await Database.fetch_one(select(
+                func.min(transacoes_table.c.data_hora).label("primeira"),
+                func.max(transacoes_table.c.data_hora).label("ultima")
+            ))
+            if row["primeira"] is None:
+                return None, None
+            desde = desde or row["primeira"].date()
+            ate = ate or row["ultima"].date()
+        return add_meses(desde, 0), add_meses(ate, 0)
+
+    @classmethod
+    async def __load(cls, inicio: datetime, fim: datetime, indices: dict) -> Colunas:
+        """Read the transacoes of a period into columns, CHUNK_SIZE rows at a time."""
+        query = select(
+            transacoes_table.c.id,
+            transacoes_table.c.cliente_id,
+            transacoes_table.c.moeda,
+            transacoes_table.c.data_hora,
+            cast(transacoes_table.c.valor, Float),
+            transacoes_table.c.contraparte
+        ).where(
+            transacoes_table.c.data_hora >= inicio,
+            transacoes_table.c.data_hora <= fim if fim.time() == time.max else transacoes_table.c.data_hora < fim
+        )
+        partes = []
+        async for chunk in Database.stream_chunks(query, CHUNK_SIZE):
+            ids, clientes, moedas, datas, valores, contrapartes = zip(*chunk)
+            tamanho = len(chunk)
+            partes.append((
+                np.array(ids, dtype=object),
+                np.fromiter((indices[cliente] for cliente in clientes), dtype=np.int64, count=tamanho),
+                np.fromiter((MOEDAS[moeda] for moeda in moedas), dtype=np.int8, count=tamanho),
+                np.array(datas, dtype="datetime64[us]"),
+                np.rint(np.array(valores, dtype=np.float64) * 100).astype(np.int64),
+                np.fromiter(
+                    (indices[contraparte] if contraparte else -1 for contraparte in contrapartes),
+                    dtype=np.int64,
+                    count=tamanho
+                )
+            ))
+        if not partes:
+            vazio = np.array([], dtype=np.int64)
+            return Colunas(
+                np.array([], dtype=object), vazio, vazio, np.array([], dtype="datetime64[us]"), vazio, vazio
+            )
+        return Colunas(*(np.concatenate(coluna) for coluna in zip(*partes)))
+
+    @classmethod
+    async def __get_alertas(cls, inicio: datetime, fim: datetime, completos: bool) -> set | list:
+        """The stored alertas of the transacoes of a period.
+
+        Returns (regra, transacao_id) pairs when completos is set, for the diff,
+        and the (regra, quantidade) counts otherwise.
+        """
+        condicoes = (
+            transacoes_table.c.id == alertas_table.c.transacao_id,
+            transacoes_table.c.data_hora >= inicio,
+            transacoes_table.c.data_hora <= fim if fim.time() == time.max else transacoes_table.c.data_hora < fim,
+            # Alertas are never older than their transacao.
+            alertas_table.c.data_hora >= inicio,
+            alertas_table.c.regra.in_([regra.value for regra in REGRAS])
+        )
+        if not completos:
+            rows = await Database.fetch_all(
+                select(alertas_table.c.regra, func.count().label("quantidade"))
+                .where(*condicoes)
+                .group_by(alertas_table.c.regra)
+            )
+            return [(RegrasEnum(row["regra"]), row["quantidade"]) for row in rows]
+        existentes = set()
+        query = select(alertas_table.c.regra, alertas_table.c.transacao_id).where(*condicoes)
+        async for chunk in Database.stream_chunks(query, CHUNK_SIZE):
+            existentes.update((RegrasEnum(regra), str(transacao_id)) for regra, transacao_id in chunk)
+        return existentes
+
+
+def parse_cenario(valor: str) -> ValuesLimitConfig:
+    """Parse a threshold set given as NAME=value pairs, the others taken from values_limit.
+
+    Args:
+        valor (str): The pairs, separated by commas, e.g. LIMIT_AMMOUNT=2000,MAX_LOW_AMMOUNT_TIMES=4.
+
+    Returns:
+        ValuesLimitConfig: The threshold set.
+    """
+    campos = values_limit.model_dump()
+    for par in valor.split(","):
+        nome, _, numero = par.partition("=")
+        if nome.strip() not in campos:
+            raise argparse.ArgumentTypeError(f"Unknown threshold '{nome.strip()}'.")
+        campos[nome.strip()] = numero
+    try:
+        return ValuesLimitConfig(**campos)
+    except ValidationError as error:
+        raise argparse.ArgumentTypeError(f"Invalid threshold set '{valor}'.") from error
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        diff = open(args.diff, "w", newline="") if args.diff else None
+        try:
+            relatorio = await BacktestService.run([values_limit, *args.cenario], args.desde, args.ate, diff)
+        finally:
+            if diff:
+                diff.close()
+    finally:
+        await Database.dispose()
+
+    print(f"{relatorio.transacoes:,} transacoes in {relatorio.segundos:.1f}s")
+    colunas = [regra.value for regra in REGRAS]
+    print(f"{'':<42}" + "".join(f"{coluna:>22}" for coluna in colunas) + ("      +/-" if args.diff else ""))
+    print(f"{'stored alertas':<42}" + "".join(f"{relatorio.registrados[regra]:>22,}" for regra in REGRAS))
+    for resultado in relatorio.cenarios:
+        nome = (
+            f"{'current' if resultado.cenario == 0 else resultado.cenario} "
+            f"({resultado.LIMIT_AMMOUNT:g}, {resultado.MAX_LOW_AMMOUNT:g}, {resultado.MAX_LOW_AMMOUNT_TIMES})"
+        )
+        linha = f"{nome:<42}" + "".join(f"{resultado.alertas[regra]:>22,}" for regra in REGRAS)
+        if args.diff:
+            linha += f"  +{resultado.novos:,}/-{resultado.removidos:,}"
+        print(linha)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Backtest compliance thresholds over the stored transacoes.")
+    parser.add_argument(
+        "--cenario", type=parse_cenario, action="append", default=[],
+        help="A threshold set as NAME=value pairs separated by commas; repeat for several."
+    )
+    parser.add_argument("--desde", type=date.fromisoformat, default=None, help="First day, YYYY-MM-DD.")
+    parser.add_argument("--ate", type=date.fromisoformat, default=None, help="Last day, YYYY-MM-DD.")
+    parser.add_argument("--diff", default=None, help="Write the alertas added/removed per threshold set to this CSV.")
+    asyncio.run(main(parser.parse_args()))
@@ -1,5 +1,8 @@
+from typing import Literal
 from pydantic_settings import BaseSettings
 
+from watchdog.app.settings import entry_settings
+
 
 class ValuesLimitConfig(BaseSettings):
 
@@ -9,3 +12,75 @@ class ValuesLimitConfig(BaseSettings):
 
 
 values_limit = ValuesLimitConfig()
+
+
+class FilaComplianceConfig(BaseSettings):
+
+    COMPLIANCE_ASYNC: bool = False
+    COMPLIANCE_WORKERS: int = 2
+    COMPLIANCE_BATCH_SIZE: int = 500
+    COMPLIANCE_POLL_INTERVAL: float = 1
+    # A failing entry is retried after COMPLIANCE_RETRY_BACKOFF seconds, doubled
+    # on every attempt up to COMPLIANCE_RETRY_BACKOFF_MAX, then dead-lettered.
+    COMPLIANCE_MAX_ATTEMPTS: int = 5
+    COMPLIANCE_RETRY_BACKOFF: float = 5
+    COMPLIANCE_RETRY_BACKOFF_MAX: float = 600
+
+
+fila_config = FilaComplianceConfig()
+
+
+class JanelaConfig(BaseSettings):
+
+    COMPLIANCE_WINDOW_MODE: Literal["calendar", "rolling"] = "calendar"
+    COMPLIANCE_RULE_WINDOW_MINUTES: int = 1440
+    COMPLIANCE_WINDOWS_MINUTES: list[int] = [60, 1440]
+    COMPLIANCE_WINDOW_BUCKET_SECONDS: int = 60
+
+    @property
+    def rolling(self) -> bool:
+        """Whether the daily rules use the rolling window instead of the calendar day.
+
+        The rolling totals live in the memory of each process, so with several
+        worker processes the rules fall back to the calendar day, read from the
+        database, instead of under-counting.
+        """
+        return self.COMPLIANCE_WINDOW_MODE == "rolling" and entry_settings.workers == 1
+
+    @property
+    def janelas(self) -> list[int]:
+        """The window lengths maintained, in minutes, always including the rule window."""
+        return sorted({*self.COMPLIANCE_WINDOWS_MINUTES, self.COMPLIANCE_RULE_WINDOW_MINUTES})
+
+
+janela_config = JanelaConfig()
+
+
+class ClienteLockConfig(BaseSettings):
+
+    COMPLIANCE_LOCK_SHARDS: int = 1024
+
+
+cliente_lock_config = ClienteLockConfig()
+
+
+class GrafoConfig(BaseSettings):
+
+    COMPLIANCE_GRAPH_ENABLED: bool = False
+    COMPLIANCE_GRAPH_WINDOW_MINUTES: int = 1440
+    COMPLIANCE_GRAPH_MAX_CYCLE: int = 3
+    COMPLIANCE_GRAPH_MAX_VISITS: int = 10000
+    COMPLIANCE_GRAPH_FAN_OUT: int = 10
+    COMPLIANCE_GRAPH_FAN_IN: int = 10
+
+    @property
+    def ativo(self) -> bool:
+        """Whether the graph rules run.
+
+        The graph lives in the memory of each process, so with several worker
+        processes no worker holds the whole graph and the rules are turned off.
+        """
+        return self.COMPLIANCE_GRAPH_ENABLED and entry_settings.workers == 1
+
+
+grafo_config = GrafoConfig()
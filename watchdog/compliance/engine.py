@@ -0,0 +1,195 @@
+import asyncio
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+from watchdog.compliance.enums import DependenciaEnum
+from watchdog.compliance.schemas import AvaliacaoStats, ContextoTransacao, RuleEngineStats
+from watchdog.routing.alertas.enums import RegrasEnum, SeveridadeEnum
+
+DependencyProvider = Callable[[ContextoTransacao], Awaitable[Any]]
+
+
+class ComplianceRule:
+    """Base class of the rules registered in the RuleEngine.
+
+    A rule declares the data it needs in DEPENDENCIAS. The engine fetches each
+    dependency once per transaction and passes it to every rule needing it.
+    """
+
+    REGRA: RegrasEnum
+    SEVERIDADE: SeveridadeEnum
+    DEPENDENCIAS: tuple[DependenciaEnum, ...] = ()
+
+    @classmethod
+    async def evaluate(
+        cls,
+        contexto: ContextoTransacao,
+        dependencias: dict[DependenciaEnum, Any]
+    ) -> bool:
+        """Check whether the transaction triggers the rule.
+
+        Args:
+            contexto (ContextoTransacao): The transaction being evaluated.
+            dependencias (dict[DependenciaEnum, Any]): The resolved dependencies.
+
+        Returns:
+            bool: True if the rule is triggered, False otherwise.
+        """
+        raise NotImplementedError
+
+
+class _Timing:
+
+    def __init__(self) -> None:
+        self.avaliacoes = 0
+        self.disparos = 0
+        self.tempo_total = 0.0
+        self.tempo_max = 0.0
+
+    def record(self, elapsed: float, disparo: bool = False) -> None:
+        self.avaliacoes += 1
+        self.disparos += int(disparo)
+        self.tempo_total += elapsed
+        self.tempo_max = max(self.tempo_max, elapsed)
+
+    def stats(self) -> AvaliacaoStats:
+        return AvaliacaoStats(
+            avaliacoes=self.avaliacoes,
+            disparos=self.disparos,
+            tempo_total_ms=self.tempo_total * 1000,
+            tempo_medio_ms=self.tempo_total * 1000 / self.avaliacoes if self.avaliacoes else 0,
+            tempo_max_ms=self.tempo_max * 1000
+        )
+
+
+class RuleEngine:
+
+    _rules: dict[RegrasEnum, type[ComplianceRule]] = {}
+    _providers: dict[DependenciaEnum, DependencyProvider] = {}
+    _rule_timings: dict[RegrasEnum, _Timing] = {}
+    _dependency_timings: dict[DependenciaEnum, _Timing] = {}
+
+    @classmethod
+    def register_rule(cls, rule: type[ComplianceRule]) -> type[ComplianceRule]:
+        """Register a compliance rule, usable as a class decorator.
+
+        Args:
+            rule (type[ComplianceRule]): The rule to register.
+
+        Returns:
+            type[ComplianceRule]: The same rule.
+        """
+        cls._rules[rule.REGRA] = rule
+        cls._rule_timings[rule.REGRA] = _Timing()
+        return rule
+
+    @classmethod
+    def register_dependency(
+        cls,
+        dependencia: DependenciaEnum
+    ) -> Callable[[DependencyProvider], DependencyProvider]:
+        """Register the provider of a dependency, usable as a function decorator.
+
+        Args:
+            dependencia (DependenciaEnum): The dependency the provider resolves.
+
+        Returns:
+            Callable[[DependencyProvider], DependencyProvider]: The decorator.
+        """
+        def decorator(provider: DependencyProvider) -> DependencyProvider:
+            cls._providers[dependencia] = provider
+            cls._dependency_timings[dependencia] = _Timing()
+            return provider
+        return decorator
+
+    @classmethod
+    def get_regras(cls) -> list[RegrasEnum]:
+        """Get the registered rules, in registration order.
+
+        Returns:
+            list[RegrasEnum]: The registered rules.
+        """
+        return list(cls._rules)
+
+    @classmethod
+    def get_severidade(cls, regra: RegrasEnum) -> SeveridadeEnum:
+        """Get the severity declared by a registered rule.
+
+        Args:
+            regra (RegrasEnum): The rule.
+
+        Returns:
+            SeveridadeEnum: The severity of the alertas created by the rule.
+        """
+        return cls._rules[regra].SEVERIDADE
+
+    @classmethod
+    async def evaluate(
+        cls,
+        contexto: ContextoTransacao,
+        dependencias: dict[DependenciaEnum, Any] | None = None
+    ) -> list[RegrasEnum]:
+        """Evaluate every registered rule against a transaction.
+
+        Missing dependencies are fetched concurrently, once each, then the rules
+        run concurrently with the shared results.
+
+        Args:
+            contexto (ContextoTransacao): The transaction being evaluated.
+            dependencias (dict[DependenciaEnum, Any] | None): Dependencies already
+                resolved by the caller, which are not fetched again.
+
+        Returns:
+            list[RegrasEnum]: The triggered rules, in registration order.
+        """
+        dependencias = dict(dependencias or {})
+        missing = list(dict.fromkeys(
+            dependencia
+            for rule in cls._rules.values()
+            for dependencia in rule.DEPENDENCIAS
+            if dependencia not in dependencias
+        ))
+        values = await asyncio.gather(*(cls.__fetch(dependencia, contexto) for dependencia in missing))
+        dependencias.update(zip(missing, values))
+
+        rules = list(cls._rules.values())
+        results = await asyncio.gather(*(cls.__run(rule, contexto, dependencias) for rule in rules))
+        return [rule.REGRA for rule, triggered in zip(rules, results) if triggered]
+
+    @classmethod
+    def get_stats(cls) -> RuleEngineStats:
+        """Get the evaluation counters and latencies of every rule and dependency.
+
+        Returns:
+            RuleEngineStats: The counters keyed by rule and dependency name.
+        """
+        return RuleEngineStats(
+            regras={regra.value: timing.stats() for regra, timing in cls._rule_timings.items()},
+            dependencias={
+                dependencia.value: timing.stats()
+                for dependencia, timing in cls._dependency_timings.items()
+            }
+        )
+
+    @classmethod
+    async def __fetch(cls, dependencia: DependenciaEnum, contexto: ContextoTransacao) -> Any:
+        start = perf_counter()
+        try:
+            return await cls._providers[dependencia](contexto)
+        finally:
+            cls._dependency_timings[dependencia].record(perf_counter() - start)
+
+    @classmethod
+    async def __run(
+        cls,
+        rule: type[ComplianceRule],
+        contexto: ContextoTransacao,
+        dependencias: dict[DependenciaEnum, Any]
+    ) -> bool:
+        start = perf_counter()
+        triggered = False
+        try:
+            triggered = await rule.evaluate(contexto, dependencias)
+            return triggered
+        finally:
+            cls._rule_timings[rule.REGRA].record(perf_counter() - start, triggered)
@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class DependenciaEnum(Enum):
+
+    TOTAIS_DIARIOS = "Totais Diarios"
+    TOTAIS_JANELA = "Totais Janela"
+    PERFIL_CONTRAPARTE = "Perfil Contraparte"
+    SINAIS_GRAFO = "Sinais Grafo"
@@ -0,0 +1,226 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_, select
+
+from watchdog.database.database import Database
+from watchdog.database.entities import fila_compliance_table, transacoes_table
+from watchdog.compliance.locks import ClienteLocks
+from watchdog.compliance.config import fila_config
+from watchdog.compliance.schemas import FilaMorta, FilaStats
+
+
+class FilaComplianceService:
+    """Durable queue of the transactions waiting for compliance evaluation.
+
+    Entries are written in the same database transaction as their transacao
+    and deleted in the same transaction as the alertas they produce, so a
+    transaction is evaluated exactly once even if a worker dies mid-batch.
+    An entry whose evaluation fails is retried with exponential backoff and,
+    after COMPLIANCE_MAX_ATTEMPTS, dead-lettered: marked morta, it is no longer
+    claimed and no longer holds back the later entries of its cliente.
+    """
+
+    _wakeup: asyncio.Event | None = None
+
+    @classmethod
+    def prepare_enqueue_querys(cls, transacao_rows: list[dict]) -> list:
+        """Prepare the insert queries enqueueing newly created transactions.
+
+        Args:
+            transacao_rows (list[dict]): The transacoes rows, with their id and data_hora.
+
+        Returns:
+            list: The multi-row insert queries, empty if there are no transactions.
+        """
+        rows = [{"transacao_id": row["id"], "data_hora": row["data_hora"]} for row in transacao_rows]
+        return [fila_compliance_table.insert().values(chunk) for chunk in Database.chunk_rows(rows)]
+
+    @classmethod
+    async def claim(cls, limit: int, fila_ids: list[int] | None = None) -> list[dict]:
+        """Claim the oldest queued transactions for the current unit of work.
+
+        The entries are locked with FOR UPDATE SKIP LOCKED, so concurrent workers
+        claim disjoint batches. Entries waiting for a retry or dead-lettered are
+        not claimed. An entry is left out, still locked until the unit of work
+        ends, when an earlier entry of its cliente is held by another worker or
+        waiting for a retry, so the transactions of a cliente are evaluated in
+        queue order.
+        The clientes of the batch are then locked through ClienteLocks, like the
+        synchronous path, so they are evaluated against up to date daily totals.
+
+        Args:
+            limit (int): The maximum number of transactions to claim.
+            fila_ids (list[int] | None): Claim only these entries. Defaults to None.
+
+        Returns:
+            list[dict]: The transacoes rows in queue order, with the entry ID as fila_id.
+        """
+        query = select(
+            fila_compliance_table.c.id.label("fila_id"),
+            transacoes_table
+        ).join(
+            transacoes_table,
+            and_(
+                transacoes_table.c.id == fila_compliance_table.c.transacao_id,
+                transacoes_table.c.data_hora == fila_compliance_table.c.data_hora
+            )
+        ).where(
+            ~fila_compliance_table.c.morta,
+            or_(
+                fila_compliance_table.c.proxima_tentativa.is_(None),
+                fila_compliance_table.c.proxima_tentativa <= datetime.now()
+            )
+        ).order_by(
+            fila_compliance_table.c.id
+        ).limit(limit).with_for_update(of=fila_compliance_table, skip_locked=True)
+        if fila_ids is not None:
+            query = query.where(Database.in_values(fila_compliance_table.c.id, fila_ids))
+        rows = await Database.fetch_all(query)
+        if not rows:
+            return rows
+
+        bloqueadas = await cls.__get_bloqueadas(rows)
+        rows = [row for row in rows if row["fila_id"] < bloqueadas.get(row["cliente_id"], row["fila_id"] + 1)]
+        if rows:
+            await ClienteLocks.acquire(row["cliente_id"] for row in rows)
+        return rows
+
+    @classmethod
+    def prepare_delete_query(cls, fila_ids: list[int]):
+        """Prepare the query removing processed entries from the queue.
+
+        Args:
+            fila_ids (list[int]): The IDs of the processed entries.
+
+        Returns:
+            The delete query.
+        """
+        return fila_compliance_table.delete().where(fila_compliance_table.c.id.in_(fila_ids))
+
+    @classmethod
+    async def registrar_falha(cls, fila_id: int, erro: str) -> bool:
+        """Count a failed evaluation of an entry, scheduling its retry or dead-lettering it.
+
+        Args:
+            fila_id (int): The ID of the entry.
+            erro (str): The error, kept in ultimo_erro.
+
+        Returns:
+            bool: True if the entry was dead-lettered.
+        """
+        async with Database.unit_of_work():
+            row = await Database.fetch_one(
+                select(fila_compliance_table.c.tentativas)
+                .where(fila_compliance_table.c.id == fila_id)
+                .with_for_update()
+            )
+            if row is None:
+                return False
+            tentativas = row["tentativas"] + 1
+            espera = min(
+                fila_config.COMPLIANCE_RETRY_BACKOFF * 2 ** (tentativas - 1),
+                fila_config.COMPLIANCE_RETRY_BACKOFF_MAX
+            )
+            morta = tentativas >= fila_config.COMPLIANCE_MAX_ATTEMPTS
+            await Database.execute(
+                fila_compliance_table.update().where(fila_compliance_table.c.id == fila_id).values(
+                    tentativas=tentativas,
+                    proxima_tentativa=datetime.now() + timedelta(seconds=espera),
+                    morta=morta,
+                    ultimo_erro=erro[:500]
+                )
+            )
+        return morta
+
+    @classmethod
+    async def get_mortas(cls, limit: int) -> list[FilaMorta]:
+        """Get the dead-lettered entries, oldest first.
+
+        Args:
+            limit (int): The maximum number of entries.
+
+        Returns:
+            list[FilaMorta]: The entries with their attempts and last error.
+        """
+        rows = await Database.fetch_all(
+            select(
+                fila_compliance_table.c.id.label("fila_id"),
+                fila_compliance_table.c.transacao_id,
+                fila_compliance_table.c.data_hora,
+                fila_compliance_table.c.tentativas,
+                fila_compliance_table.c.ultimo_erro
+            ).where(
+                fila_compliance_table.c.morta
+            ).order_by(fila_compliance_table.c.id).limit(limit)
+        )
+        return [FilaMorta(**row) for row in rows]
+
+    @classmethod
+    async def get_stats(cls) -> FilaStats:
+        """Get the depth of the queue, the age of its oldest entry and the dead-lettered entries.
+
+        Returns:
+            FilaStats: The number of queued transactions, the lag in seconds and
+                the number of dead-lettered entries, not counted in the depth.
+        """
+        viva = ~fila_compliance_table.c.morta
+        row = await Database.fetch_one(select(
+            func.count().filter(viva).label("profundidade"),
+            func.min(fila_compliance_table.c.data_hora).filter(viva).label("mais_antiga"),
+            func.count().filter(fila_compliance_table.c.morta).label("mortas")
+        ))
+        atraso = (datetime.now() - row["mais_antiga"]).total_seconds() if row["mais_antiga"] else 0
+        return FilaStats(profundidade=row["profundidade"], atraso_segundos=max(atraso, 0), mortas=row["mortas"])
+
+    @classmethod
+    def notify(cls) -> None:
+        """Wake the workers of this process after new entries were committed."""
+        cls.__get_wakeup().set()
+
+    @classmethod
+    async def wait(cls, timeout: float) -> None:
+        """Wait for new entries from this process, or until the timeout.
+
+        Entries enqueued by other processes are picked up when the timeout expires.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait.
+        """
+        wakeup = cls.__get_wakeup()
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        wakeup.clear()
+
+    @classmethod
+    async def __get_bloqueadas(cls, rows: list[dict]) -> dict:
+        """Get the first entry of each cliente of the batch held by another worker or waiting for a retry.
+
+        Entries are claimed in ID order skipping the locked ones, so a live entry
+        before the end of the batch that was not claimed is locked elsewhere or
+        not due yet.
+        """
+        fila_ids = [row["fila_id"] for row in rows]
+        query = select(
+            transacoes_table.c.cliente_id,
+            func.min(fila_compliance_table.c.id).label("fila_id")
+        ).join(
+            transacoes_table,
+            and_(
+                transacoes_table.c.id == fila_compliance_table.c.transacao_id,
+                transacoes_table.c.data_hora == fila_compliance_table.c.data_hora
+            )
+        ).where(
+            Database.in_values(transacoes_table.c.cliente_id, {row["cliente_id"] for row in rows}),
+            fila_compliance_table.c.id < fila_ids[-1],
+            ~fila_compliance_table.c.morta,
+            ~Database.in_values(fila_compliance_table.c.id, fila_ids)
+        ).group_by(transacoes_table.c.cliente_id)
+        return {row["cliente_id"]: row["fila_id"] for row in await Database.fetch_all(query)}
+
+    @classmethod
+    def __get_wakeup(cls) -> asyncio.Event:
+        if cls._wakeup is None:
+            cls._wakeup = asyncio.Event()
+        return cls._wakeup
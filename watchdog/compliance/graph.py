@@ -0,0 +1,354 @@
+import logging
+from uuid import UUID
+from array import array
+from time import perf_counter
+from datetime import datetime, timedelta
+from sqlalchemy import exists, select
+
+from watchdog.database.database import Database
+from watchdog.database.entities import fila_compliance_table, transacoes_table
+from watchdog.compliance.config import grafo_config
+from watchdog.compliance.schemas import GrafoStats, SinaisGrafo
+
+logger = logging.getLogger(__name__)
+
+
+def _get_uuid(cliente_id: str | UUID) -> UUID:
+    return cliente_id if isinstance(cliente_id, UUID) else UUID(str(cliente_id))
+
+
+class ArestasPendentes:
+    """Edges of the earlier transactions of a batch, not yet committed to the graph.
+
+    Passed to GrafoContrapartes.get_sinais, so each transaction of a batch sees
+    the ones before it, like the running totals. The batch is evaluated at once,
+    so its edges are not expired.
+    """
+
+    __slots__ = ("saida", "entrada")
+
+    def __init__(self) -> None:
+        self.saida: dict[UUID, set[UUID]] = {}
+        self.entrada: dict[UUID, set[UUID]] = {}
+
+    def adicionar(self, cliente_id: str | UUID, contraparte: str | UUID) -> None:
+        origem = _get_uuid(cliente_id)
+        destino = _get_uuid(contraparte)
+        if origem != destino:
+            self.saida.setdefault(origem, set()).add(destino)
+            self.entrada.setdefault(destino, set()).add(origem)
+
+
+class GrafoContrapartes:
+    """In-process directed graph of the transactions between clients over a time window.
+
+    Every transaction with a counterparty adds an edge from the client to the
+    counterparty. Clients are interned as integers. Each node keeps a dict of
+    its outgoing edges, holding the latest instant of each edge, and a set of
+    the nodes with an edge into it. An edge expires
+    COMPLIANCE_GRAPH_WINDOW_MINUTES after its latest transaction, and a node
+    is released, its integer reused, once its last edge expires, so the memory
+    is bounded by the nodes and edges active in the window.
+
+    The transactions are also appended to a time-ordered log of three int64
+    arrays. Advancing the clock walks that log from its oldest entry and
+    removes the edges that were not seen again, O(1) amortized per
+    transaction. Like JanelaDeslizante, the graph is warmed from the database
+    at startup and then only sees the transactions committed by this process,
+    once their unit of work commits, so its rules only run with a single
+    worker process (see GrafoConfig.ativo). The transactions of a batch see
+    the ones before them through ArestasPendentes.
+    """
+
+    _indices: dict[UUID, int] = {}
+    # The client of each node, None for a released node.
+    _ids: list[UUID | None] = []
+    # Released nodes, reused before growing the lists.
+    _livres: list[int] = []
+    # Outgoing edges of each node, destino -> latest instant, None without edges.
+    _saida: list[dict[int, int] | None] = []
+    # The nodes with an edge into each node, None without edges.
+    _entrada: list[set[int] | None] = []
+    _arestas = 0
+    # Log of the edges added, oldest first, from position _inicio on.
+    _instantes = array("q")
+    _origens = array("q")
+    _destinos = array("q")
+    _inicio = 0
+    # Latest instant seen, in epoch seconds: the log never goes back in time.
+    _relogio = 0
+    _janela = grafo_config.COMPLIANCE_GRAPH_WINDOW_MINUTES * 60
+
+    @classmethod
+    def registrar(cls, cliente_id: str | UUID, contraparte: str | UUID, data_hora: datetime) -> None:
+        """Add a committed transaction to the graph.
+
+        Transactions older than the latest one are added at the latest instant.
+
+        Args:
+            cliente_id (str | UUID): The ID of the client, origin of the edge.
+            contraparte (str | UUID): The ID of the counterparty, destination of the edge.
+            data_hora (datetime): The date and time of the transaction.
+        """
+        origem_id = _get_uuid(cliente_id)
+        destino_id = _get_uuid(contraparte)
+        if origem_id == destino_id:
+            return
+        # Advance first: expiring edges may release the nodes.
+        instante = cls.__advance(data_hora)
+        origem = cls.__get_no(origem_id)
+        destino = cls.__get_no(destino_id)
+
+        saida = cls._saida[origem]
+        if saida is None:
+            saida = cls._saida[origem] = {}
+        if destino not in saida:
+            cls._arestas += 1
+        saida[destino] = instante
+        entrada = cls._entrada[destino]
+        if entrada is None:
+            entrada = cls._entrada[destino] = set()
+        entrada.add(origem)
+
+        cls._instantes.append(instante)
+        cls._origens.append(origem)
+        cls._destinos.append(destino)
+
+    @classmethod
+    def get_sinais(
+        cls,
+        cliente_id: str | UUID,
+        contraparte: str | UUID,
+        data_hora: datetime,
+        pendentes: ArestasPendentes | None = None
+    ) -> SinaisGrafo:
+        """Get what a new transaction would add to the graph, without adding it.
+
+        Args:
+            cliente_id (str | UUID): The ID of the client, origin of the edge.
+            contraparte (str | UUID): The ID of the counterparty, destination of the edge.
+            data_hora (datetime): The date and time of the transaction.
+            pendentes (ArestasPendentes | None): The edges of the earlier
+                transactions of the same batch. Defaults to None.
+
+        Returns:
+            SinaisGrafo: The length of the shortest cycle the edge would close,
+                up to COMPLIANCE_GRAPH_MAX_CYCLE edges, and the distinct
+                counterparties of the client and senders to the counterparty in
+                the window, this transaction included.
+        """
+        cls.__advance(data_hora)
+        if pendentes is not None and pendentes.saida:
+            return cls.__get_sinais_pendentes(_get_uuid(cliente_id), _get_uuid(contraparte), pendentes)
+        origem = cls._indices.get(_get_uuid(cliente_id))
+        destino = cls._indices.get(_get_uuid(contraparte))
+        if origem is not None and origem == destino:
+            return SinaisGrafo()
+        saida = cls._saida[origem] if origem is not None else None
+        entrada = cls._entrada[destino] if destino is not None else None
+        return SinaisGrafo(
+            ciclo=cls.__get_ciclo(origem, destino),
+            fan_out=len(saida or ()) + (saida is None or destino not in saida),
+            fan_in=len(entrada or ()) + (entrada is None or origem not in entrada)
+        )
+
+    @classmethod
+    async def aquecer(cls) -> int:
+        """Load the transactions with a counterparty of the window from the database.
+
+        Transactions still waiting in the compliance queue are left out, since
+        the workers register them once evaluated.
+
+        Returns:
+            int: The number of transactions loaded.
+        """
+        start = perf_counter()
+        cls.__reset()
+        inicio = datetime.now() - timedelta(seconds=cls._janela)
+        query = select(
+            transacoes_table.c.cliente_id,
+            transacoes_table.c.contraparte,
+            transacoes_table.c.data_hora
+        ).where(
+            transacoes_table.c.data_hora >= inicio,
+            transacoes_table.c.contraparte.is_not(None),
+            ~exists().where(fila_compliance_table.c.transacao_id == transacoes_table.c.id)
+        ).order_by(transacoes_table.c.data_hora)
+
+        total = 0
+        async for chunk in Database.stream_chunks(query, partition_size=10000):
+            for cliente_id, contraparte, data_hora in chunk:
+                cls.registrar(cliente_id, contraparte, data_hora)
+            total += len(chunk)
+        logger.info(
+            "Warmed the counterparty graph with %d transactions, %d edges, in %.2fs",
+            total,
+            cls._arestas,
+            perf_counter() - start
+        )
+        return total
+
+    @classmethod
+    def get_stats(cls) -> GrafoStats:
+        """Get the size of the in-memory graph.
+
+        Returns:
+            GrafoStats: The window and the number of nodes, active edges and logged transactions.
+        """
+        return GrafoStats(
+            janela_minutos=grafo_config.COMPLIANCE_GRAPH_WINDOW_MINUTES,
+            nos=len(cls._indices),
+            arestas=cls._arestas,
+            eventos=len(cls._instantes) - cls._inicio
+        )
+
+    @classmethod
+    def __get_ciclo(cls, origem: int | None, destino: int | None) -> int | None:
+        """Search a path from destino back to origem, breadth first, up to COMPLIANCE_GRAPH_MAX_CYCLE edges."""
+        if origem is None or destino is None:
+            return None
+        anteriores = cls._entrada[origem]
+        if not anteriores:
+            return None
+        fronteira = [destino]
+        visitados = {destino, origem}
+        for comprimento in range(2, grafo_config.COMPLIANCE_GRAPH_MAX_CYCLE + 1):
+            if any(no in anteriores for no in fronteira):
+                return comprimento
+            if comprimento == grafo_config.COMPLIANCE_GRAPH_MAX_CYCLE:
+                return None
+            proxima = []
+            for no in fronteira:
+                for vizinho in cls._saida[no] or ():
+                    if vizinho not in visitados:
+                        visitados.add(vizinho)
+                        proxima.append(vizinho)
+                # Bound the search around hubs; the cycle, if any, is left undetected.
+                if len(visitados) > grafo_config.COMPLIANCE_GRAPH_MAX_VISITS:
+                    return None
+            if not proxima:
+                return None
+            fronteira = proxima
+        return None
+
+    @classmethod
+    def __get_sinais_pendentes(cls, origem: UUID, destino: UUID, pendentes: ArestasPendentes) -> SinaisGrafo:
+        """Get the signals over the graph plus the pending edges, with the clients as UUIDs."""
+        if origem == destino:
+            return SinaisGrafo()
+        return SinaisGrafo(
+            ciclo=cls.__get_ciclo_pendente(origem, destino, pendentes),
+            fan_out=len(cls.__get_vizinhos(origem, cls._saida, pendentes.saida) | {destino}),
+            fan_in=len(cls.__get_vizinhos(destino, cls._entrada, pendentes.entrada) | {origem})
+        )
+
+    @classmethod
+    def __get_vizinhos(
+        cls,
+        cliente_id: UUID,
+        arestas: list,
+        pendentes: dict[UUID, set[UUID]]
+    ) -> set[UUID]:
+        no = cls._indices.get(cliente_id)
+        vizinhos = {cls._ids[vizinho] for vizinho in arestas[no] or ()} if no is not None else set()
+        return vizinhos | pendentes.get(cliente_id, set())
+
+    @classmethod
+    def __get_ciclo_pendente(cls, origem: UUID, destino: UUID, pendentes: ArestasPendentes) -> int | None:
+        """Search a path from destino back to origem like __get_ciclo, also over the pending edges."""
+        anteriores = cls.__get_vizinhos(origem, cls._entrada, pendentes.entrada)
+        if not anteriores:
+            return None
+        fronteira = [destino]
+        visitados = {destino, origem}
+        for comprimento in range(2, grafo_config.COMPLIANCE_GRAPH_MAX_CYCLE + 1):
+            if any(no in anteriores for no in fronteira):
+                return comprimento
+            if comprimento == grafo_config.COMPLIANCE_GRAPH_MAX_CYCLE:
+                return None
+            proxima = []
+            for no in fronteira:
+                for vizinho in cls.__get_vizinhos(no, cls._saida, pendentes.saida):
+                    if vizinho not in visitados:
+                        visitados.add(vizinho)
+                        proxima.append(vizinho)
+                if len(visitados) > grafo_config.COMPLIANCE_GRAPH_MAX_VISITS:
+                    return None
+            if not proxima:
+                return None
+            fronteira = proxima
+        return None
+
+    @classmethod
+    def __advance(cls, data_hora: datetime) -> int:
+        """Move the clock to data_hora, if later, and expire the edges leaving the window."""
+        instante = max(int(data_hora.timestamp()), cls._relogio)
+        cls._relogio = instante
+        limite = instante - cls._janela
+        inicio = cls._inicio
+        fim = len(cls._instantes)
+        while inicio < fim and cls._instantes[inicio] <= limite:
+            origem = cls._origens[inicio]
+            destino = cls._destinos[inicio]
+            saida = cls._saida[origem]
+            # Only the latest transaction of an edge expires it.
+            if saida is not None and saida.get(destino) == cls._instantes[inicio]:
+                del saida[destino]
+                cls._arestas -= 1
+                if not saida:
+                    cls._saida[origem] = None
+                entrada = cls._entrada[destino]
+                entrada.discard(origem)
+                if not entrada:
+                    cls._entrada[destino] = None
+                cls.__release(origem)
+                cls.__release(destino)
+            inicio += 1
+        if inicio and inicio * 2 >= fim:
+            del cls._instantes[:inicio]
+            del cls._origens[:inicio]
+            del cls._destinos[:inicio]
+            inicio = 0
+        cls._inicio = inicio
+        return instante
+
+    @classmethod
+    def __get_no(cls, key: UUID) -> int:
+        no = cls._indices.get(key)
+        if no is None:
+            if cls._livres:
+                no = cls._livres.pop()
+                cls._ids[no] = key
+            else:
+                no = len(cls._ids)
+                cls._ids.append(key)
+                cls._saida.append(None)
+                cls._entrada.append(None)
+            cls._indices[key] = no
+        return no
+
+    @classmethod
+    def __release(cls, no: int) -> None:
+        """Release a node left without edges, so its integer can be reused.
+
+        The log holds no live entry of the node: the latest transaction of each
+        of its edges has expired.
+        """
+        if cls._saida[no] is None and cls._entrada[no] is None:
+            del cls._indices[cls._ids[no]]
+            cls._ids[no] = None
+            cls._livres.append(no)
+
+    @classmethod
+    def __reset(cls) -> None:
+        cls._indices = {}
+        cls._ids = []
+        cls._livres = []
+        cls._saida = []
+        cls._entrada = []
+        cls._arestas = 0
+        cls._instantes = array("q")
+        cls._origens = array("q")
+        cls._destinos = array("q")
+        cls._inicio = 0
+        cls._relogio = 0
@@ -0,0 +1,56 @@
+import asyncio
+from uuid import UUID
+from typing import AsyncIterator, Iterable
+from contextlib import AsyncExitStack, asynccontextmanager
+from sqlalchemy import text
+
+from watchdog.database.config import database_config
+from watchdog.database.database import Database
+from watchdog.compliance.config import cliente_lock_config
+
+
+class ClienteLocks:
+    """Serialize the read-evaluate-insert section of each cliente.
+
+    Within a process, clientes are mapped to a fixed set of asyncio locks, so
+    memory stays bounded and different clientes rarely wait on each other. On
+    Postgres a transaction-level advisory lock per cliente extends this to every
+    worker process. Both are held until the unit of work commits or rolls back.
+    """
+
+    _shards: list[asyncio.Lock] = [asyncio.Lock() for _ in range(cliente_lock_config.COMPLIANCE_LOCK_SHARDS)]
+
+    @classmethod
+    async def acquire(cls, cliente_ids: Iterable[str | UUID]) -> None:
+        """Lock the given clientes until the current unit of work ends.
+
+        Locks are taken in a fixed order, so requests locking several clientes
+        cannot deadlock each other.
+
+        Args:
+            cliente_ids (Iterable[str | UUID]): The clientes whose totals are read and updated.
+
+        Raises:
+            RuntimeError: If there is no unit of work open.
+        """
+        ids = sorted({cliente_id if isinstance(cliente_id, UUID) else UUID(cliente_id) for cliente_id in cliente_ids})
+        await Database.enter_context(cls.__hold(ids))
+
+    @classmethod
+    @asynccontextmanager
+    async def __hold(cls, cliente_ids: list[UUID]) -> AsyncIterator[None]:
+        shards = sorted({cliente_id.int % len(cls._shards) for cliente_id in cliente_ids})
+        async with AsyncExitStack() as stack:
+            for shard in shards:
+                await stack.enter_async_context(cls._shards[shard])
+            if database_config.backend == "postgres":
+                # One round-trip for the whole batch. Postgres evaluates the volatile
+                # lock calls after sorting, so every batch locks in the same order.
+                # Released by Postgres when the transaction ends.
+                await Database.execute(
+                    text(
+                        "SELECT pg_advisory_xact_lock(hashtextextended(id, 0)) "
+                        "FROM unnest(CAST(:cliente_ids AS text[])) AS id ORDER BY id"
+                    ).bindparams(cliente_ids=[str(cliente_id) for cliente_id in cliente_ids])
+                )
+            yield
@@ -0,0 +1,187 @@
+from typing import Any
+
+from watchdog.compliance.config import grafo_config, janela_config, values_limit
+from watchdog.compliance.engine import ComplianceRule, RuleEngine
+from watchdog.compliance.enums import DependenciaEnum
+from watchdog.compliance.graph import GrafoContrapartes
+from watchdog.compliance.schemas import ContextoTransacao, SinaisGrafo, TotaisDiarios
+from watchdog.compliance.totais import TotaisDiariosService
+from watchdog.compliance.window import JanelaDeslizante
+from watchdog.routing.alertas.enums import PAISES_SUSPEITOS, RegrasEnum, SeveridadeEnum
+from watchdog.routing.clientes.schemas import ClientePerfil
+from watchdog.routing.clientes.service import ClientesService
+
+# The totals the daily rules compare against: the calendar day or the rolling window.
+TOTAIS = DependenciaEnum.TOTAIS_JANELA if janela_config.rolling else DependenciaEnum.TOTAIS_DIARIOS
+
+
+@RuleEngine.register_dependency(DependenciaEnum.TOTAIS_DIARIOS)
+async def get_totais_diarios(contexto: ContextoTransacao) -> TotaisDiarios:
+    """Get the client's totals for the day before this transaction."""
+    return await TotaisDiariosService.get_totais_diarios(
+        cliente_id=contexto.cliente_id,
+        moeda=contexto.moeda,
+        dia=contexto.data_hora.date()
+    )
+
+
+@RuleEngine.register_dependency(DependenciaEnum.TOTAIS_JANELA)
+async def get_totais_janela(contexto: ContextoTransacao) -> TotaisDiarios:
+    """Get the client's totals over the rolling rule window before this transaction."""
+    return JanelaDeslizante.get_totais(
+        cliente_id=contexto.cliente_id,
+        moeda=contexto.moeda,
+        data_hora=contexto.data_hora,
+        minutos=janela_config.COMPLIANCE_RULE_WINDOW_MINUTES
+    )
+
+
+@RuleEngine.register_dependency(DependenciaEnum.PERFIL_CONTRAPARTE)
+async def get_perfil_contraparte(contexto: ContextoTransacao) -> ClientePerfil | None:
+    """Get the counterparty country and risk level, if there is a counterparty."""
+    if contexto.contraparte:
+        return await ClientesService.get_cliente_perfil(contexto.contraparte)
+    return None
+
+
+@RuleEngine.register_dependency(DependenciaEnum.SINAIS_GRAFO)
+async def get_sinais_grafo(contexto: ContextoTransacao) -> SinaisGrafo | None:
+    """Get the cycle and fan-out/fan-in this transaction adds to the counterparty graph."""
+    if contexto.contraparte:
+        return GrafoContrapartes.get_sinais(contexto.cliente_id, contexto.contraparte, contexto.data_hora)
+    return None
+
+
+@RuleEngine.register_rule
+class LimiteDiarioRule(ComplianceRule):
+
+    REGRA = RegrasEnum.LIMITE_DIARIO
+    SEVERIDADE = SeveridadeEnum.BAIXA
+    DEPENDENCIAS = (TOTAIS,)
+
+    @classmethod
+    async def evaluate(cls, contexto: ContextoTransacao, dependencias: dict[DependenciaEnum, Any]) -> bool:
+        """Check if the client has exceeded the maximum transaction amount.
+
+        Args:
+            contexto (ContextoTransacao): The transaction being evaluated.
+            dependencias (dict[DependenciaEnum, Any]): The resolved dependencies.
+
+        Returns:
+            bool: True if the maximum amount is exceeded, False otherwise.
+        """
+        totais = dependencias[TOTAIS]
+        return totais.valor_total + contexto.valor > values_limit.LIMIT_AMMOUNT
+
+
+@RuleEngine.register_rule
+class TransacoesRepetidasRule(ComplianceRule):
+
+    REGRA = RegrasEnum.TRANSACOES_REPETIDAS
+    SEVERIDADE = SeveridadeEnum.MEDIA
+    DEPENDENCIAS = (TOTAIS,)
+
+    @classmethod
+    async def evaluate(cls, contexto: ContextoTransacao, dependencias: dict[DependenciaEnum, Any]) -> bool:
+        """Check if the client has made frequent transactions.
+
+        Args:
+            contexto (ContextoTransacao): The transaction being evaluated.
+            dependencias (dict[DependenciaEnum, Any]): The resolved dependencies.
+
+        Returns:
+            bool: True if frequent transactions are detected, False otherwise.
+        """
+        totais = dependencias[TOTAIS]
+        return totais.quantidade_baixo_valor >= values_limit.MAX_LOW_AMMOUNT_TIMES
+
+
+@RuleEngine.register_rule
+class PaisesSuspeitosRule(ComplianceRule):
+
+    REGRA = RegrasEnum.PAISES_SUSPEITOS
+    SEVERIDADE = SeveridadeEnum.ALTA
+    DEPENDENCIAS = (DependenciaEnum.PERFIL_CONTRAPARTE,)
+
+    @classmethod
+    async def evaluate(cls, contexto: ContextoTransacao, dependencias: dict[DependenciaEnum, Any]) -> bool:
+        """Check if the counterparty country is considered high-risk.
+
+        Args:
+            contexto (ContextoTransacao): The transaction being evaluated.
+            dependencias (dict[DependenciaEnum, Any]): The resolved dependencies.
+
+        Returns:
+            bool: True if the country is high-risk, False otherwise.
+        """
+        contraparte = dependencias[DependenciaEnum.PERFIL_CONTRAPARTE]
+        return contraparte is not None and contraparte.pais in PAISES_SUSPEITOS
+
+
+class CicloTransacoesRule(ComplianceRule):
+
+    REGRA = RegrasEnum.CICLO_TRANSACOES
+    SEVERIDADE = SeveridadeEnum.ALTA
+    DEPENDENCIAS = (DependenciaEnum.SINAIS_GRAFO,)
+
+    @classmethod
+    async def evaluate(cls, contexto: ContextoTransacao, dependencias: dict[DependenciaEnum, Any]) -> bool:
+        """Check if the transaction closes a short cycle of transfers back to the client.
+
+        Args:
+            contexto (ContextoTransacao): The transaction being evaluated.
+            dependencias (dict[DependenciaEnum, Any]): The resolved dependencies.
+
+        Returns:
+            bool: True if the money returns to the client within the window, False otherwise.
+        """
+        sinais = dependencias[DependenciaEnum.SINAIS_GRAFO]
+        return sinais is not None and sinais.ciclo is not None
+
+
+class FanOutRule(ComplianceRule):
+
+    REGRA = RegrasEnum.FAN_OUT
+    SEVERIDADE = SeveridadeEnum.MEDIA
+    DEPENDENCIAS = (DependenciaEnum.SINAIS_GRAFO,)
+
+    @classmethod
+    async def evaluate(cls, contexto: ContextoTransacao, dependencias: dict[DependenciaEnum, Any]) -> bool:
+        """Check if the client has sent to many distinct counterparties.
+
+        Args:
+            contexto (ContextoTransacao): The transaction being evaluated.
+            dependencias (dict[DependenciaEnum, Any]): The resolved dependencies.
+
+        Returns:
+            bool: True if the counterparties reach COMPLIANCE_GRAPH_FAN_OUT, False otherwise.
+        """
+        sinais = dependencias[DependenciaEnum.SINAIS_GRAFO]
+        return sinais is not None and sinais.fan_out >= grafo_config.COMPLIANCE_GRAPH_FAN_OUT
+
+
+class FanInRule(ComplianceRule):
+
+    REGRA = RegrasEnum.FAN_IN
+    SEVERIDADE = SeveridadeEnum.MEDIA
+    DEPENDENCIAS = (DependenciaEnum.SINAIS_GRAFO,)
+
+    @classmethod
+    async def evaluate(cls, contexto: ContextoTransacao, dependencias: dict[DependenciaEnum, Any]) -> bool:
+        """Check if the counterparty has received from many distinct clients.
+
+        Args:
+            contexto (ContextoTransacao): The transaction being evaluated.
+            dependencias (dict[DependenciaEnum, Any]): The resolved dependencies.
+
+        Returns:
+            bool: True if the senders reach COMPLIANCE_GRAPH_FAN_IN, False otherwise.
+        """
+        sinais = dependencias[DependenciaEnum.SINAIS_GRAFO]
+        return sinais is not None and sinais.fan_in >= grafo_config.COMPLIANCE_GRAPH_FAN_IN
+
+
+# The graph rules need the in-memory graph, warmed at startup.
+if grafo_config.ativo:
+    for rule in (CicloTransacoesRule, FanOutRule, FanInRule):
+        RuleEngine.register_rule(rule)
@@ -0,0 +1,98 @@
+from uuid import UUID
+from datetime import datetime
+from pydantic import BaseModel
+
+from watchdog.routing.alertas.enums import RegrasEnum
+from watchdog.routing.transacoes.enums import MoedaEnum
+
+
+class TotaisDiarios(BaseModel):
+
+    quantidade: int = 0
+    quantidade_baixo_valor: int = 0
+    valor_total: float = 0
+
+
+class ContextoTransacao(BaseModel):
+
+    cliente_id: str
+    contraparte: str | None
+    valor: float
+    moeda: MoedaEnum
+    data_hora: datetime
+
+
+class AvaliacaoStats(BaseModel):
+
+    avaliacoes: int
+    disparos: int
+    tempo_total_ms: float
+    tempo_medio_ms: float
+    tempo_max_ms: float
+
+
+class RuleEngineStats(BaseModel):
+
+    regras: dict[str, AvaliacaoStats]
+    dependencias: dict[str, AvaliacaoStats]
+
+
+class FilaStats(BaseModel):
+
+    profundidade: int
+    atraso_segundos: float
+    mortas: int = 0
+    workers: int = 0
+    processadas: int = 0
+    falhas: int = 0
+
+
+class FilaMorta(BaseModel):
+
+    fila_id: int
+    transacao_id: UUID
+    data_hora: datetime
+    tentativas: int
+    ultimo_erro: str | None
+
+
+class JanelaStats(BaseModel):
+
+    janelas_minutos: list[int]
+    bucket_segundos: int
+    series: int
+    buckets: int
+
+
+class SinaisGrafo(BaseModel):
+
+    ciclo: int | None = None
+    fan_out: int = 0
+    fan_in: int = 0
+
+
+class GrafoStats(BaseModel):
+
+    janela_minutos: int
+    nos: int
+    arestas: int
+    eventos: int
+
+
+class ResultadoBacktest(BaseModel):
+
+    cenario: int
+    LIMIT_AMMOUNT: float
+    MAX_LOW_AMMOUNT: float
+    MAX_LOW_AMMOUNT_TIMES: int
+    alertas: dict[RegrasEnum, int]
+    novos: int | None = None
+    removidos: int | None = None
+
+
+class RelatorioBacktest(BaseModel):
+
+    transacoes: int
+    registrados: dict[RegrasEnum, int]
+    cenarios: list[ResultadoBacktest]
+    segundos: float
@@ -1,96 +1,151 @@
-from watchdog.routing.clientes.service import ClientesService
-from watchdog.routing.transacoes.schemas import TransacaoResponse
-from watchdog.routing.alertas.enums import RegrasEnum, PaisesSuspeitosEnum
-from watchdog.compliance.config import values_limit
+from typing import Any
+from functools import partial
+
+import watchdog.compliance.rules  # noqa: F401  (registers the built-in rules)
+from watchdog.database.database import Database
+from watchdog.compliance.config import grafo_config, janela_config
+from watchdog.compliance.engine import RuleEngine
+from watchdog.compliance.graph import ArestasPendentes, GrafoContrapartes
+from watchdog.compliance.enums import DependenciaEnum
+from watchdog.compliance.schemas import ContextoTransacao, RuleEngineStats, TotaisDiarios
+from watchdog.compliance.totais import TotaisDiariosService, TotaisKey
+from watchdog.compliance.window import JanelaDeslizante
+from watchdog.routing.alertas.enums import RegrasEnum, SeveridadeEnum
+from watchdog.routing.clientes.schemas import ClientePerfil
 
 
 class ComplianceService:
 
     @classmethod
     async def get_trigged_rules(
-        cls, 
-        contraparte: str | None,
-        valor: float,
-        transacoes: list[TransacaoResponse]
+        cls,
+        contexto: ContextoTransacao,
+        dependencias: dict[DependenciaEnum, Any] | None = None
     ) -> list[RegrasEnum]:
         """Verify if a transaction triggers any compliance rules.
 
+        In rolling mode the transaction is added to the rolling windows, and with
+        the graph rules to the counterparty graph, once the current unit of work
+        commits.
+
         Args:
-            contraparte (str | None): The ID of the counterparty involved in the transaction.
-            valor (float): The amount of the transaction.
-            transacoes (list[TransacaoResponse]): List of previous transactions for the client.
+            contexto (ContextoTransacao): The transaction being evaluated.
+            dependencias (dict[DependenciaEnum, Any] | None): Rule dependencies
+                already resolved by the caller, such as batch running totals.
 
         Returns:
-            list[RegrasEnum] | None: A list of triggered rules or None if no rules are triggered.
+            list[RegrasEnum]: The triggered rules, empty if no rules are triggered.
         """
-        triggered_rules = []
-
-        if await cls.verify_max_transaction_amount(valor, transacoes):
-            triggered_rules.append(RegrasEnum.LIMITE_DIARIO)
-        if await cls.verify_frequent_transactions(transacoes):
-            triggered_rules.append(RegrasEnum.TRANSACOES_REPETIDAS)
-        if await cls.verify_paises_de_risco(contraparte):
-            triggered_rules.append(RegrasEnum.PAISES_SUSPEITOS)
-
+        triggered_rules = await RuleEngine.evaluate(contexto, dependencias)
+        if janela_config.rolling:
+            Database.after_commit(partial(
+                JanelaDeslizante.registrar,
+                contexto.cliente_id,
+                contexto.moeda,
+                contexto.valor,
+                contexto.data_hora
+            ))
+        if grafo_config.ativo and contexto.contraparte:
+            Database.after_commit(partial(
+                GrafoContrapartes.registrar,
+                contexto.cliente_id,
+                contexto.contraparte,
+                contexto.data_hora
+            ))
         return triggered_rules
 
     @classmethod
-    async def verify_max_transaction_amount(
+    async def get_trigged_rules_in_order(
         cls,
-        valor: float,
-        transacoes: list[TransacaoResponse]
-    ) -> bool:
-        """Check if the client has exceeded the maximum transaction amount.
+        contextos: list[ContextoTransacao],
+        perfis: dict[str, ClientePerfil]
+    ) -> tuple[list[list[RegrasEnum]], dict[TotaisKey, TotaisDiarios]]:
+        """Evaluate transactions in order against running daily totals.
+
+        The daily totals of every (cliente, moeda, dia) involved are read in one
+        query and advanced after each transaction, so each one sees the ones
+        before it. In rolling mode the rules see running rolling-window totals
+        instead, while the daily totals are still returned for the upsert. With
+        the graph rules, each transaction also sees the counterparty edges of the
+        ones before it.
 
         Args:
-            valor (float): The amount of the transaction.
-            transacoes (list[TransacaoResponse]): List of previous transactions for the client.
+            contextos (list[ContextoTransacao]): The transactions, in processing order.
+            perfis (dict[str, ClientePerfil]): The clientes and counterparties of the
+                transactions, keyed by the ID used in the contextos.
 
         Returns:
-            bool: True if the maximum amount is exceeded, False otherwise.
+            tuple[list[list[RegrasEnum]], dict[TotaisKey, TotaisDiarios]]: The triggered
+                rules of each transaction, and the totals to add for each key.
         """
-        valor_total = 0
-        for transacao in transacoes:
-            valor_total += transacao.valor
-
-        if valor_total + valor > values_limit.LIMIT_AMMOUNT:
-            return True
-        return False
+        keys = [
+            (perfis[contexto.cliente_id].id, contexto.moeda, contexto.data_hora.date())
+            for contexto in contextos
+        ]
+        if janela_config.rolling:
+            dependencia = DependenciaEnum.TOTAIS_JANELA
+            series = [(perfis[contexto.cliente_id].id, contexto.moeda) for contexto in contextos]
+            totais = {}
+            for contexto, serie in zip(contextos, series):
+                if serie not in totais:
+                    totais[serie] = JanelaDeslizante.get_totais(
+                        cliente_id=serie[0],
+                        moeda=serie[1],
+                        data_hora=contexto.data_hora,
+                        minutos=janela_config.COMPLIANCE_RULE_WINDOW_MINUTES
+                    )
+        else:
+            dependencia = DependenciaEnum.TOTAIS_DIARIOS
+            series = keys
+            totais = await TotaisDiariosService.get_totais_diarios_many(set(keys))
+        deltas = {}
+        triggered = []
+        pendentes = ArestasPendentes()
+        for contexto, key, serie in zip(contextos, keys, series):
+            dependencias = {
+                dependencia: totais[serie],
+                DependenciaEnum.PERFIL_CONTRAPARTE: perfis.get(contexto.contraparte)
+            }
+            if grafo_config.ativo:
+                dependencias[DependenciaEnum.SINAIS_GRAFO] = GrafoContrapartes.get_sinais(
+                    contexto.cliente_id,
+                    contexto.contraparte,
+                    contexto.data_hora,
+                    pendentes
+                ) if contexto.contraparte else None
+            triggered.append(await cls.get_trigged_rules(contexto, dependencias=dependencias))
+            if grafo_config.ativo and contexto.contraparte:
+                pendentes.adicionar(contexto.cliente_id, contexto.contraparte)
+            TotaisDiariosService.add_transacao(totais[serie], contexto.valor)
+            TotaisDiariosService.add_transacao(deltas.setdefault(key, TotaisDiarios()), contexto.valor)
+        return triggered, deltas
 
     @classmethod
-    async def verify_frequent_transactions(
-        cls,
-        transacoes: list[TransacaoResponse]
-    ) -> bool:
-        """Check if the client has made frequent transactions.
+    def get_regras(cls) -> list[RegrasEnum]:
+        """Get the registered compliance rules.
 
-        Args:
-            transacoes (list[TransacaoResponse]): List of previous transactions for the client.
+        Returns:
+            list[RegrasEnum]: The registered rules, in evaluation order.
+        """
+        return RuleEngine.get_regras()
+
+    @classmethod
+    def get_stats(cls) -> RuleEngineStats:
+        """Get the per-rule and per-dependency evaluation latencies.
 
         Returns:
-            bool: True if frequent transactions are detected, False otherwise.
+            RuleEngineStats: The evaluation counters and latencies.
         """
-        count = 0
-        for transacao in transacoes:
-            if transacao.valor < values_limit.MAX_LOW_AMMOUNT:
-                count += 1
-        if count < values_limit.MAX_LOW_AMMOUNT_TIMES:
-            return False
-        return True
+        return RuleEngine.get_stats()
 
     @classmethod
-    async def verify_paises_de_risco(cls, contraparte: str | None) -> bool:
-        """Check if a country is considered high-risk.
+    def get_severidade(cls, regra: RegrasEnum) -> SeveridadeEnum:
+        """Get the severity of the alertas created by a rule.
 
         Args:
-            contraparte (str | None): The ID of the counterparty involved in the transaction.
+            regra (RegrasEnum): The triggered rule.
 
         Returns:
-            bool: True if the country is high-risk, False otherwise.
+            SeveridadeEnum: The severity declared by the rule.
         """
-        if contraparte:
-            contrapar = await ClientesService.get_cliente_by_id(contraparte)
-            for pais in PaisesSuspeitosEnum:
-                if contrapar.pais == pais.value:
-                    return True
-        return False
+        return RuleEngine.get_severidade(regra)
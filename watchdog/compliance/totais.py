@@ -0,0 +1,236 @@
+"""Per-cliente daily totals read by the daily compliance rules.
+
+transacoes_diarias is maintained by the write paths, and was backfilled from
+the raw rows by the migrations. rollups_cobertura holds the first day it covers;
+the totals of the days before it are read from the raw rows, so the daily rules
+never under-count a day the table does not hold.
+"""
+from uuid import UUID
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import case, func, select
+
+from watchdog.database.database import Database
+from watchdog.database.entities import (
+    fila_compliance_table,
+    rollups_cobertura_table,
+    transacoes_diarias_table,
+    transacoes_table
+)
+from watchdog.compliance.config import values_limit
+from watchdog.compliance.schemas import TotaisDiarios
+from watchdog.routing.transacoes.enums import MoedaEnum
+
+TotaisKey = tuple[UUID, MoedaEnum, date]
+
+
+class TotaisDiariosService:
+
+    # The coverage only extends back, so once it holds every day it keeps doing so.
+    _cobre_tudo = False
+
+    @classmethod
+    async def get_totais_diarios(
+        cls,
+        cliente_id: str,
+        moeda: MoedaEnum,
+        dia: date
+    ) -> TotaisDiarios:
+        """Get the running totals of a client for the given currency and day.
+
+        Args:
+            cliente_id (str): The ID of the client.
+            moeda (MoedaEnum): The currency of the totals.
+            dia (date): The day of the totals.
+
+        Returns:
+            TotaisDiarios: The totals, zeroed if the client has no transactions that day.
+        """
+        cobertura = await cls.get_cobertura()
+        if cobertura and dia < cobertura:
+            brutos = await cls.__get_totais_brutos(dia, {UUID(str(cliente_id))})
+            return brutos.get((UUID(str(cliente_id)), moeda), TotaisDiarios())
+        query = transacoes_diarias_table.select().where(
+            transacoes_diarias_table.c.cliente_id == cliente_id,
+            transacoes_diarias_table.c.moeda == moeda.value,
+            transacoes_diarias_table.c.dia == dia
+        )
+        row = await Database.fetch_one(query)
+        return TotaisDiarios(**row) if row else TotaisDiarios()
+
+    @classmethod
+    async def get_totais_diarios_many(cls, keys: set[TotaisKey]) -> dict[TotaisKey, TotaisDiarios]:
+        """Get the running totals for several (client, currency, day) keys in one query.
+
+        Args:
+            keys (set[TotaisKey]): The (cliente_id, moeda, dia) keys to retrieve.
+
+        Returns:
+            dict[TotaisKey, TotaisDiarios]: The totals for every key, zeroed when missing.
+        """
+        totais = {key: TotaisDiarios() for key in keys}
+        if not keys:
+            return totais
+
+        cobertura = await cls.get_cobertura()
+        descobertas = {key for key in keys if cobertura and key[2] < cobertura}
+        for dia in {key[2] for key in descobertas}:
+            brutos = await cls.__get_totais_brutos(dia, {key[0] for key in descobertas if key[2] == dia})
+            for (cliente_id, moeda), total in brutos.items():
+                if (cliente_id, moeda, dia) in totais:
+                    totais[(cliente_id, moeda, dia)] = total
+        if len(descobertas) == len(keys):
+            return totais
+
+        query = transacoes_diarias_table.select().where(
+            transacoes_diarias_table.c.cliente_id.in_(list({key[0] for key in keys - descobertas})),
+            transacoes_diarias_table.c.dia.in_(list({key[2] for key in keys - descobertas}))
+        )
+        rows = await Database.fetch_all(query)
+        for row in rows:
+            key = (row["cliente_id"], MoedaEnum(row["moeda"]), row["dia"])
+            if key in totais and key not in descobertas:
+                totais[key] = TotaisDiarios(**row)
+        return totais
+
+    @classmethod
+    async def get_cobertura(cls) -> date | None:
+        """Get the first day transacoes_diarias holds for every client.
+
+        Returns:
+            date | None: The first day covered, None if it covers every day.
+        """
+        if cls._cobre_tudo:
+            return None
+        row = await Database.fetch_one(
+            select(rollups_cobertura_table.c.inicio).where(
+                rollups_cobertura_table.c.tabela == transacoes_diarias_table.name
+            )
+        )
+        inicio = row["inicio"] if row else None
+        cls._cobre_tudo = inicio is None
+        return inicio
+
+    @classmethod
+    async def __get_totais_brutos(
+        cls,
+        dia: date,
+        cliente_ids: set[UUID]
+    ) -> dict[tuple[UUID, MoedaEnum], TotaisDiarios]:
+        """Compute the totals of some clients for a day from the raw transactions.
+
+        Transactions still in the compliance queue are left out, as they are
+        from transacoes_diarias until evaluated.
+
+        Args:
+            dia (date): The day of the totals.
+            cliente_ids (set[UUID]): The IDs of the clients.
+
+        Returns:
+            dict[tuple[UUID, MoedaEnum], TotaisDiarios]: The totals of each client
+                and currency with transactions that day.
+        """
+        inicio = datetime.combine(dia, time.min)
+        query = select(
+            transacoes_table.c.cliente_id,
+            transacoes_table.c.moeda,
+            func.count().label("quantidade"),
+            func.sum(case((transacoes_table.c.valor < values_limit.MAX_LOW_AMMOUNT, 1), else_=0)).label(
+                "quantidade_baixo_valor"
+            ),
+            func.sum(transacoes_table.c.valor).label("valor_total")
+        ).where(
+            Database.in_values(transacoes_table.c.cliente_id, cliente_ids),
+            transacoes_table.c.data_hora >= inicio,
+            transacoes_table.c.data_hora < inicio + timedelta(days=1),
+            transacoes_table.c.id.not_in(select(fila_compliance_table.c.transacao_id))
+        ).group_by(transacoes_table.c.cliente_id, transacoes_table.c.moeda)
+        rows = await Database.fetch_all(query)
+        return {(row["cliente_id"], MoedaEnum(row["moeda"])): TotaisDiarios(**row) for row in rows}
+
+    @classmethod
+    def add_transacao(cls, totais: TotaisDiarios, valor: float) -> None:
+        """Add a transaction to in-memory totals.
+
+        Args:
+            totais (TotaisDiarios): The totals to update.
+            valor (float): The amount of the transaction.
+        """
+        totais.quantidade += 1
+        totais.quantidade_baixo_valor += int(valor < values_limit.MAX_LOW_AMMOUNT)
+        totais.valor_total += valor
+
+    @classmethod
+    async def prepare_upsert_query(
+        cls,
+        cliente_id: str,
+        moeda: MoedaEnum,
+        dia: date,
+        valor: float
+    ):
+        """Prepare the query adding a transaction to the client's daily totals.
+
+        Args:
+            cliente_id (str): The ID of the client.
+            moeda (MoedaEnum): The currency of the transaction.
+            dia (date): The day of the transaction.
+            valor (float): The amount of the transaction.
+
+        Returns:
+            The upsert query to be executed with the transaction insert.
+        """
+        return cls.__build_upsert_query([{
+            "cliente_id": cliente_id,
+            "moeda": moeda.value,
+            "dia": dia,
+            "quantidade": 1,
+            "quantidade_baixo_valor": int(valor < values_limit.MAX_LOW_AMMOUNT),
+            "valor_total": valor
+        }])
+
+    @classmethod
+    async def prepare_bulk_upsert_querys(cls, deltas: dict[TotaisKey, TotaisDiarios]) -> list:
+        """Prepare the queries adding a batch of transactions to the daily totals.
+
+        Args:
+            deltas (dict[TotaisKey, TotaisDiarios]): The totals of the batch for each key.
+
+        Returns:
+            list: The upsert queries to be executed with the transaction inserts.
+        """
+        rows = [
+            {
+                "cliente_id": cliente_id,
+                "moeda": moeda.value,
+                "dia": dia,
+                **delta.model_dump()
+            }
+            for (cliente_id, moeda, dia), delta in deltas.items()
+        ]
+        return [cls.__build_upsert_query(chunk) for chunk in Database.chunk_rows(rows)]
+
+    @classmethod
+    def __build_upsert_query(cls, rows: list[dict]):
+        """Build the multi-row upsert adding the given rows to the stored totals.
+
+        Args:
+            rows (list[dict]): The totals rows to add.
+
+        Returns:
+            The upsert query.
+        """
+        query = Database.insert(transacoes_diarias_table).values(rows)
+        return query.on_conflict_do_update(
+            index_elements=[
+                transacoes_diarias_table.c.cliente_id,
+                transacoes_diarias_table.c.moeda,
+                transacoes_diarias_table.c.dia
+            ],
+            set_={
+                "quantidade": transacoes_diarias_table.c.quantidade + query.excluded.quantidade,
+                "quantidade_baixo_valor": (
+                    transacoes_diarias_table.c.quantidade_baixo_valor
+                    + query.excluded.quantidade_baixo_valor
+                ),
+                "valor_total": transacoes_diarias_table.c.valor_total + query.excluded.valor_total
+            }
+        )
@@ -0,0 +1,248 @@
+import logging
+from uuid import UUID
+from time import perf_counter
+from datetime import datetime, timedelta
+from sqlalchemy import exists, select
+
+from watchdog.database.database import Database
+from watchdog.database.entities import fila_compliance_table, transacoes_table
+from watchdog.compliance.config import janela_config, values_limit
+from watchdog.compliance.schemas import JanelaStats, TotaisDiarios
+from watchdog.routing.transacoes.enums import MoedaEnum
+
+logger = logging.getLogger(__name__)
+
+SerieKey = tuple[UUID, MoedaEnum]
+
+
+class _Serie:
+    """Time buckets of one (cliente, moeda), with a running total per window.
+
+    Only non-empty buckets are stored, oldest first. Each window keeps the
+    position of the oldest bucket it still counts; advancing the clock
+    subtracts the buckets leaving the window, so every bucket is added and
+    removed once per window: O(1) amortized per transaction.
+    """
+
+    __slots__ = ("buckets", "base", "inicio", "totais")
+
+    def __init__(self, janelas: int) -> None:
+        # [indice, quantidade, quantidade_baixo_valor, valor_total]
+        self.buckets: list[list] = []
+        # Absolute position of buckets[0], so positions survive compaction.
+        self.base = 0
+        self.inicio = [0] * janelas
+        self.totais = [[0, 0, 0.0] for _ in range(janelas)]
+
+    @property
+    def ultimo_indice(self) -> int:
+        return self.buckets[-1][0] if self.buckets else 0
+
+    @property
+    def vazia(self) -> bool:
+        # Every window is past the last bucket.
+        return min(self.inicio) == self.base + len(self.buckets)
+
+    def avancar(self, indice: int, tamanhos: list[int]) -> None:
+        fim = self.base + len(self.buckets)
+        for janela, tamanho in enumerate(tamanhos):
+            limite = indice - tamanho
+            totais = self.totais[janela]
+            posicao = self.inicio[janela]
+            while posicao < fim and self.buckets[posicao - self.base][0] <= limite:
+                _, quantidade, quantidade_baixo_valor, valor_total = self.buckets[posicao - self.base]
+                totais[0] -= quantidade
+                totais[1] -= quantidade_baixo_valor
+                totais[2] -= valor_total
+                posicao += 1
+            if posicao == fim:
+                # Reset instead of accumulating float subtraction errors.
+                totais[:] = [0, 0, 0.0]
+            self.inicio[janela] = posicao
+
+        descartar = min(self.inicio) - self.base
+        if descartar and descartar * 2 >= len(self.buckets):
+            del self.buckets[:descartar]
+            self.base += descartar
+
+    def adicionar(self, indice: int, valor: float, baixo_valor: int) -> None:
+        if self.buckets and self.buckets[-1][0] == indice:
+            bucket = self.buckets[-1]
+            bucket[1] += 1
+            bucket[2] += baixo_valor
+            bucket[3] += valor
+        else:
+            self.buckets.append([indice, 1, baixo_valor, valor])
+        for totais in self.totais:
+            totais[0] += 1
+            totais[1] += baixo_valor
+            totais[2] += valor
+
+
+class JanelaDeslizante:
+    """In-process rolling totals of every (cliente, moeda) over the configured windows.
+
+    Windows are COMPLIANCE_WINDOWS_MINUTES long, with the resolution of
+    COMPLIANCE_WINDOW_BUCKET_SECONDS. The state lives in the memory of each
+    process: it is warmed from the database at startup and then only sees the
+    transactions committed by this process, so the rolling mode is only used
+    with a single worker process (see JanelaConfig.rolling).
+
+    Reads never create a series, and a series is dropped once its transactions
+    left every window. Series nobody reads are swept every longest window, so
+    the memory is bounded by the clients active in the window.
+    """
+
+    _series: dict[SerieKey, _Serie] = {}
+    # Bucket index of the next sweep of the idle series.
+    _proxima_limpeza = 0
+    _janelas: list[int] = janela_config.janelas
+    _tamanhos: list[int] = [
+        max(1, minutos * 60 // janela_config.COMPLIANCE_WINDOW_BUCKET_SECONDS)
+        for minutos in janela_config.janelas
+    ]
+
+    @classmethod
+    def registrar(cls, cliente_id: str | UUID, moeda: MoedaEnum, valor: float, data_hora: datetime) -> None:
+        """Add a committed transaction to the rolling totals.
+
+        Transactions older than the latest one of their series are counted in
+        the latest bucket instead.
+
+        Args:
+            cliente_id (str | UUID): The ID of the client.
+            moeda (MoedaEnum): The currency of the transaction.
+            valor (float): The amount of the transaction.
+            data_hora (datetime): The date and time of the transaction.
+        """
+        key = cls.__get_key(cliente_id, moeda)
+        serie = cls._series.get(key)
+        if serie is None:
+            serie = cls._series[key] = _Serie(len(cls._tamanhos))
+        indice = cls.__advance(serie, data_hora)
+        serie.adicionar(indice, float(valor), int(valor < values_limit.MAX_LOW_AMMOUNT))
+        if indice >= cls._proxima_limpeza:
+            cls.__limpar(data_hora)
+            cls._proxima_limpeza = indice + max(cls._tamanhos)
+
+    @classmethod
+    def get_totais(
+        cls,
+        cliente_id: str | UUID,
+        moeda: MoedaEnum,
+        data_hora: datetime,
+        minutos: int
+    ) -> TotaisDiarios:
+        """Get the totals of a client over the last minutos before data_hora.
+
+        Args:
+            cliente_id (str | UUID): The ID of the client.
+            moeda (MoedaEnum): The currency of the totals.
+            data_hora (datetime): The end of the window.
+            minutos (int): The window length, one of the configured windows.
+
+        Returns:
+            TotaisDiarios: The totals over the window, shaped like the daily totals.
+
+        Raises:
+            ValueError: If the window length is not configured.
+        """
+        janela = cls._janelas.index(minutos)
+        key = cls.__get_key(cliente_id, moeda)
+        serie = cls._series.get(key)
+        if serie is None:
+            return TotaisDiarios()
+        cls.__advance(serie, data_hora)
+        if serie.vazia:
+            del cls._series[key]
+            return TotaisDiarios()
+        quantidade, quantidade_baixo_valor, valor_total = serie.totais[janela]
+        return TotaisDiarios(
+            quantidade=quantidade,
+            quantidade_baixo_valor=quantidade_baixo_valor,
+            valor_total=valor_total
+        )
+
+    @classmethod
+    def get_todos_totais(cls, cliente_id: str | UUID, moeda: MoedaEnum) -> dict[int, TotaisDiarios]:
+        """Get the current totals of a client over every configured window.
+
+        Args:
+            cliente_id (str | UUID): The ID of the client.
+            moeda (MoedaEnum): The currency of the totals.
+
+        Returns:
+            dict[int, TotaisDiarios]: The totals keyed by window length in minutes.
+        """
+        agora = datetime.now()
+        return {minutos: cls.get_totais(cliente_id, moeda, agora, minutos) for minutos in cls._janelas}
+
+    @classmethod
+    async def aquecer(cls) -> int:
+        """Load the transactions of the longest window from the database.
+
+        Transactions still waiting in the compliance queue are left out, since
+        the workers register them once evaluated.
+
+        Returns:
+            int: The number of transactions loaded.
+        """
+        start = perf_counter()
+        cls._series = {}
+        cls._proxima_limpeza = 0
+        inicio = datetime.now() - timedelta(minutes=max(cls._janelas))
+        query = select(
+            transacoes_table.c.cliente_id,
+            transacoes_table.c.moeda,
+            transacoes_table.c.valor,
+            transacoes_table.c.data_hora
+        ).where(
+            transacoes_table.c.data_hora >= inicio,
+            ~exists().where(fila_compliance_table.c.transacao_id == transacoes_table.c.id)
+        ).order_by(transacoes_table.c.data_hora)
+
+        total = 0
+        async for row in Database.stream(query, partition_size=10000):
+            cls.registrar(row["cliente_id"], MoedaEnum(row["moeda"]), row["valor"], row["data_hora"])
+            total += 1
+        logger.info(
+            "Warmed the rolling windows with %d transactions in %.2fs",
+            total,
+            perf_counter() - start
+        )
+        return total
+
+    @classmethod
+    def get_stats(cls) -> JanelaStats:
+        """Get the size of the in-memory state.
+
+        Returns:
+            JanelaStats: The configured windows and the number of series and buckets held.
+        """
+        return JanelaStats(
+            janelas_minutos=cls._janelas,
+            bucket_segundos=janela_config.COMPLIANCE_WINDOW_BUCKET_SECONDS,
+            series=len(cls._series),
+            buckets=sum(len(serie.buckets) for serie in cls._series.values())
+        )
+
+    @classmethod
+    def __advance(cls, serie: _Serie, data_hora: datetime) -> int:
+        indice = max(
+            int(data_hora.timestamp()) // janela_config.COMPLIANCE_WINDOW_BUCKET_SECONDS,
+            serie.ultimo_indice
+        )
+        serie.avancar(indice, cls._tamanhos)
+        return indice
+
+    @classmethod
+    def __limpar(cls, data_hora: datetime) -> None:
+        """Advance every series to data_hora and drop the empty ones."""
+        for key, serie in list(cls._series.items()):
+            cls.__advance(serie, data_hora)
+            if serie.vazia:
+                del cls._series[key]
+
+    @staticmethod
+    def __get_key(cliente_id: str | UUID, moeda: MoedaEnum) -> SerieKey:
+        return cliente_id if isinstance(cliente_id, UUID) else UUID(cliente_id), moeda
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+from time import perf_counter
+from contextlib import nullcontext
+
+from watchdog.database.config import database_config
+from watchdog.database.database import Database
+from watchdog.metrics.registry import Gauge, Metric, MetricsRegistry
+from watchdog.compliance.config import fila_config
+from watchdog.compliance.fila import FilaComplianceService
+from watchdog.compliance.schemas import ContextoTransacao, FilaStats
+from watchdog.compliance.service import ComplianceService
+from watchdog.compliance.totais import TotaisDiariosService
+from watchdog.routing.alertas.service import AlertasService
+from watchdog.routing.clientes.service import ClientesService
+from watchdog.routing.relatorios.cache import RelatorioCache
+from watchdog.routing.transacoes.enums import MoedaEnum
+from watchdog.routing.transacoes.service import TransacoesService
+
+logger = logging.getLogger(__name__)
+
+processadas = MetricsRegistry.counter(
+    "watchdog_fila_compliance_processadas_total",
+    "Queued transactions evaluated by the compliance workers."
+)
+falhas = MetricsRegistry.counter(
+    "watchdog_fila_compliance_falhas_total",
+    "Compliance worker batches rolled back after an error."
+)
+lote_duracao = MetricsRegistry.histogram(
+    "watchdog_fila_compliance_lote_seconds",
+    "Time to claim, evaluate and commit one batch of queued transactions."
+)
+
+
+class ComplianceWorker:
+    """Background tasks draining the compliance queue when COMPLIANCE_ASYNC is set.
+
+    Each batch is claimed, evaluated and deleted inside one unit of work, so a
+    failed batch is rolled back. Its entries are then retried one at a time, so
+    only the failing ones count an attempt, and are retried with backoff or
+    dead-lettered by FilaComplianceService.registrar_falha.
+    """
+
+    _tasks: list[asyncio.Task] = []
+    # SQLite has no row locks: batches of one process are processed one at a time.
+    _lock = asyncio.Lock() if database_config.backend == "sqlite" else nullcontext()
+
+    @classmethod
+    def start(cls) -> None:
+        """Start COMPLIANCE_WORKERS tasks on the running event loop."""
+        cls._tasks = [
+            asyncio.create_task(cls.run(), name=f"compliance-worker-{numero}")
+            for numero in range(fila_config.COMPLIANCE_WORKERS)
+        ]
+        logger.info("Started %d compliance workers", len(cls._tasks))
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Cancel the workers, rolling back the batches in progress."""
+        for task in cls._tasks:
+            task.cancel()
+        await asyncio.gather(*cls._tasks, return_exceptions=True)
+        cls._tasks = []
+
+    @classmethod
+    async def run(cls) -> None:
+        """Process batches until cancelled, waiting for new entries when the queue is drained."""
+        while True:
+            try:
+                processed = await cls.process_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Compliance worker failed to process a batch")
+                falhas.inc()
+                processed = 0
+            if processed < fila_config.COMPLIANCE_BATCH_SIZE:
+                await FilaComplianceService.wait(fila_config.COMPLIANCE_POLL_INTERVAL)
+
+    @classmethod
+    async def process_batch(cls, fila_ids: list[int] | None = None) -> int:
+        """Evaluate one batch of queued transactions and create their alertas.
+
+        Args:
+            fila_ids (list[int] | None): Process only these entries. Defaults to None.
+
+        Returns:
+            int: The number of transactions processed, 0 if the queue was empty.
+
+        Raises:
+            Exception: If the batch fails before any entry is claimed.
+        """
+        start = perf_counter()
+        claimed = []
+        try:
+            rows = await cls.__evaluate(fila_ids, claimed)
+        except Exception as error:
+            if not claimed:
+                raise
+            falhas.inc()
+            logger.exception("Compliance evaluation of queue entries %s failed", claimed)
+            erro = repr(error)
+        else:
+            if rows:
+                processadas.inc(amount=len(rows))
+                lote_duracao.observe(value=perf_counter() - start)
+            return len(rows)
+
+        if len(claimed) > 1:
+            # Find the failing entries, one unit of work each.
+            return sum([await cls.process_batch([fila_id]) for fila_id in claimed])
+        async with cls._lock:
+            morta = await FilaComplianceService.registrar_falha(claimed[0], erro)
+        if morta:
+            logger.error(
+                "Compliance queue entry %d dead-lettered after %d attempts",
+                claimed[0],
+                fila_config.COMPLIANCE_MAX_ATTEMPTS
+            )
+        return 0
+
+    @classmethod
+    async def __evaluate(cls, fila_ids: list[int] | None, claimed: list[int]) -> list[dict]:
+        """Claim, evaluate and delete one batch in a unit of work, filling claimed with its entry IDs."""
+        async with cls._lock, Database.unit_of_work():
+            rows = await FilaComplianceService.claim(fila_config.COMPLIANCE_BATCH_SIZE, fila_ids)
+            claimed.extend(row["fila_id"] for row in rows)
+            if not rows:
+                return rows
+
+            contextos = [
+                ContextoTransacao(
+                    cliente_id=str(row["cliente_id"]),
+                    contraparte=str(row["contraparte"]) if row["contraparte"] else None,
+                    valor=row["valor"],
+                    moeda=MoedaEnum(row["moeda"]),
+                    data_hora=row["data_hora"]
+                )
+                for row in rows
+            ]
+            cliente_ids = {contexto.cliente_id for contexto in contextos}
+            cliente_ids |= {contexto.contraparte for contexto in contextos if contexto.contraparte}
+            perfis = await ClientesService.get_clientes_perfis(cliente_ids)
+            triggered, deltas = await ComplianceService.get_trigged_rules_in_order(contextos, perfis)
+
+            alertas = []
+            for row, contexto, triggered_rules in zip(rows, contextos, triggered):
+                alertas.extend(await TransacoesService.prepare_alertas(
+                    transacao_id=str(row["id"]),
+                    cliente_id=contexto.cliente_id,
+                    triggered_rules=triggered_rules
+                ))
+            query_list = await TotaisDiariosService.prepare_bulk_upsert_querys(deltas)
+            query_list += await AlertasService.prepare_bulk_insert_querys(alertas)
+            query_list.append(FilaComplianceService.prepare_delete_query([row["fila_id"] for row in rows]))
+            await Database.execute_many(query_list)
+            RelatorioCache.invalidate_after_commit(contexto.cliente_id for contexto in contextos)
+        return rows
+
+    @classmethod
+    async def get_stats(cls) -> FilaStats:
+        """Get the queue depth and lag with the counters of this process's workers.
+
+        Returns:
+            FilaStats: The queue and worker counters.
+        """
+        stats = await FilaComplianceService.get_stats()
+        stats.workers = sum(not task.done() for task in cls._tasks)
+        stats.processadas = int(processadas.get())
+        stats.falhas = int(falhas.get())
+        return stats
+
+
+@MetricsRegistry.register_collector
+async def collect_fila_metrics() -> list[Metric]:
+    """Expose the depth, lag and dead-lettered entries of the compliance queue."""
+    stats = await FilaComplianceService.get_stats()
+    profundidade = Gauge("watchdog_fila_compliance_profundidade", "Transactions waiting for compliance.")
+    atraso = Gauge("watchdog_fila_compliance_atraso_seconds", "Age of the oldest queued transaction.")
+    mortas = Gauge("watchdog_fila_compliance_mortas", "Queued transactions dead-lettered after failing every attempt.")
+    profundidade.set(value=stats.profundidade)
+    atraso.set(value=stats.atraso_segundos)
+    mortas.set(value=stats.mortas)
+    return [profundidade, atraso, mortas]
@@ -1,12 +1,70 @@
-from watchdog.app.settings import database_settings
+from sqlalchemy.pool import StaticPool
+
+from watchdog.app.settings import database_settings, entry_settings
 
 
 class DatabaseConfig:
 
-    db_url = (
-        f"postgresql+asyncpg://{database_settings.DB_USER}:{database_settings.DB_PASSWORD}@"
-        f"{database_settings.DB_HOST}:{database_settings.DB_PORT}/{database_settings.DB_NAME}"
-    )
+    backend = database_settings.DB_BACKEND
+
+    @property
+    def db_url(self) -> str:
+        if self.backend == "sqlite":
+            return f"sqlite+aiosqlite:///{database_settings.DB_SQLITE_PATH}"
+        return (
+            f"postgresql+asyncpg://{database_settings.DB_USER}:{database_settings.DB_PASSWORD}@"
+            f"{database_settings.DB_HOST}:{database_settings.DB_PORT}/{database_settings.DB_NAME}"
+            f"?prepared_statement_cache_size={database_settings.DB_PREPARED_STATEMENT_CACHE_SIZE}"
+        )
+
+    @property
+    def migrate_on_startup(self) -> bool:
+        # An in-memory database is always empty at startup.
+        return database_settings.DB_MIGRATE_ON_STARTUP or (
+            self.backend == "sqlite" and database_settings.DB_SQLITE_PATH == ":memory:"
+        )
+
+    @property
+    def pool_limits(self) -> tuple[int, int]:
+        """The pool_size and max_overflow of each worker process.
+
+        With DB_MAX_CONNECTIONS set, the budget is split evenly between the
+        APP_WORKERS processes, so workers x (pool_size + max_overflow) never
+        exceeds it. The configured sizes still apply when they are lower.
+
+        Raises:
+            ValueError: If DB_MAX_CONNECTIONS leaves a worker without a connection.
+        """
+        pool_size = database_settings.DB_POOL_SIZE
+        max_overflow = database_settings.DB_MAX_OVERFLOW
+        if database_settings.DB_MAX_CONNECTIONS:
+            workers = entry_settings.workers
+            if database_settings.DB_MAX_CONNECTIONS < workers:
+                raise ValueError(
+                    f"DB_MAX_CONNECTIONS={database_settings.DB_MAX_CONNECTIONS} is lower than the "
+                    f"{workers} worker processes, each one needs at least one connection"
+                )
+            por_worker = database_settings.DB_MAX_CONNECTIONS // workers
+            pool_size = min(pool_size, por_worker)
+            max_overflow = min(max_overflow, por_worker - pool_size)
+        return pool_size, max_overflow
+
+    @property
+    def engine_options(self) -> dict:
+        if self.backend == "sqlite" and database_settings.DB_SQLITE_PATH == ":memory:":
+            # Every connection must share the single in-memory database.
+            return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+        pool_size, max_overflow = self.pool_limits
+        options = {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": database_settings.DB_POOL_TIMEOUT,
+            "pool_recycle": database_settings.DB_POOL_RECYCLE,
+            "pool_pre_ping": database_settings.DB_POOL_PRE_PING,
+        }
+        if self.backend == "postgres":
+            options["connect_args"] = {"statement_cache_size": database_settings.DB_STATEMENT_CACHE_SIZE}
+        return options
 
 
 database_config = DatabaseConfig()
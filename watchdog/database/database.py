@@ -1,41 +1,305 @@
-from sqlalchemy import MetaData
+import asyncio
+from time import perf_counter
+from contextvars import ContextVar
+from contextlib import AbstractAsyncContextManager, AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Callable, Iterable, Iterator, TypeVar
+from sqlalchemy import ColumnElement, MetaData, Table, any_, bindparam
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
 
 from watchdog.database.config import database_config
+from watchdog.database.instrumentation import (
+    collect_pool_metrics,
+    instrument_engine,
+    pool_timeouts,
+    pool_wait
+)
+from watchdog.metrics.registry import MetricsRegistry
 
 Base = declarative_base(metadata=MetaData())
-engine = create_async_engine(database_config.db_url)
+
+# asyncpg accepts at most 32767 bind parameters per statement.
+MAX_BIND_PARAMS = 30000
+
+T = TypeVar("T")
+
+
+class _UnitOfWork:
+
+    def __init__(self, conn: AsyncConnection, exit_stack: AsyncExitStack) -> None:
+        self.conn = conn
+        self.exit_stack = exit_stack
+        # A connection runs one statement at a time, but a request may gather queries.
+        self.lock = asyncio.Lock()
+        self.after_commit: list[Callable[[], None]] = []
+
+
+_current_unit_of_work: ContextVar[_UnitOfWork | None] = ContextVar("unit_of_work", default=None)
 
 
 class Database:
 
+    _engine: AsyncEngine | None = None
+
+    @classmethod
+    def get_engine(cls) -> AsyncEngine:
+        """Get the engine of the configured backend, creating it on first use.
+
+        Returns:
+            AsyncEngine: The process-wide engine.
+        """
+        if cls._engine is None:
+            cls._engine = instrument_engine(create_async_engine(
+                database_config.db_url,
+                **database_config.engine_options
+            ))
+        return cls._engine
+
+    @staticmethod
+    @asynccontextmanager
+    async def connect() -> AsyncIterator[AsyncConnection]:
+        """Check a connection out of the pool, recording how long it took.
+
+        Yields:
+            AsyncConnection: The connection, returned to the pool on exit.
+        """
+        conn = Database.get_engine().connect()
+        start = perf_counter()
+        try:
+            await conn.start()
+        except PoolTimeoutError:
+            pool_timeouts.inc()
+            raise
+        finally:
+            pool_wait.observe(value=perf_counter() - start)
+        try:
+            yield conn
+        finally:
+            # Like AsyncConnection.__aexit__, do not let a cancelled request leak the connection.
+            await asyncio.shield(asyncio.create_task(conn.close()))
+
+    @staticmethod
+    @asynccontextmanager
+    async def begin() -> AsyncIterator[AsyncConnection]:
+        """Check a connection out of the pool and open a transaction on it.
+
+        Yields:
+            AsyncConnection: The connection, committed on success and rolled back on error.
+        """
+        async with Database.connect() as conn, conn.begin():
+            yield conn
+
+    @staticmethod
+    @asynccontextmanager
+    async def unit_of_work() -> AsyncIterator[AsyncConnection]:
+        """Run every query of the current context on one connection and transaction.
+
+        While the unit of work is open, fetch_one, fetch_all, execute and
+        execute_many reuse its connection instead of checking out their own, and
+        the reads see the same transaction as the writes. It commits once on exit
+        and rolls everything back on error. Nested calls join the outer unit.
+
+        Yields:
+            AsyncConnection: The connection shared by the unit of work.
+        """
+        current = _current_unit_of_work.get()
+        if current is not None:
+            yield current.conn
+            return
+        async with AsyncExitStack() as exit_stack:
+            async with Database.begin() as conn:
+                unit = _UnitOfWork(conn, exit_stack)
+                token = _current_unit_of_work.set(unit)
+                try:
+                    yield conn
+                finally:
+                    _current_unit_of_work.reset(token)
+            for callback in unit.after_commit:
+                callback()
+
+    @staticmethod
+    def after_commit(callback: Callable[[], None]) -> None:
+        """Run a callback once the current unit of work commits.
+
+        Outside a unit of work every write has already committed when the
+        Database call returns, so the callback runs right away.
+
+        Args:
+            callback (Callable[[], None]): The function to call, dropped on rollback.
+        """
+        current = _current_unit_of_work.get()
+        if current is None:
+            callback()
+        else:
+            current.after_commit.append(callback)
+
+    @staticmethod
+    async def enter_context(context: AbstractAsyncContextManager[T]) -> T:
+        """Enter an async context manager until the current unit of work ends.
+
+        The context is exited once the transaction has committed, after the
+        after_commit callbacks, or rolled back, so a lock taken here covers the
+        commit.
+
+        Args:
+            context (AbstractAsyncContextManager[T]): The context manager to enter.
+
+        Returns:
+            T: The value of the entered context.
+
+        Raises:
+            RuntimeError: If there is no unit of work open.
+        """
+        current = _current_unit_of_work.get()
+        if current is None:
+            raise RuntimeError("Database.enter_context needs an open unit of work.")
+        return await current.exit_stack.enter_async_context(context)
+
+    @staticmethod
+    @asynccontextmanager
+    async def _connection() -> AsyncIterator[AsyncConnection]:
+        current = _current_unit_of_work.get()
+        if current is None:
+            async with Database.connect() as conn:
+                yield conn
+        else:
+            async with current.lock:
+                yield current.conn
+
+    @staticmethod
+    @asynccontextmanager
+    async def _transaction() -> AsyncIterator[AsyncConnection]:
+        current = _current_unit_of_work.get()
+        if current is None:
+            async with Database.begin() as conn:
+                yield conn
+        else:
+            async with current.lock:
+                yield current.conn
+
+    @classmethod
+    async def dispose(cls) -> None:
+        """Close every pooled connection and drop the engine."""
+        if cls._engine is not None:
+            await cls._engine.dispose()
+            cls._engine = None
+
+    @staticmethod
+    def insert(table: Table):
+        """Get an INSERT supporting on_conflict_do_update for the configured backend.
+
+        Args:
+            table (Table): The table to insert into.
+
+        Returns:
+            The dialect specific insert construct.
+        """
+        if database_config.backend == "sqlite":
+            return sqlite.insert(table)
+        return postgresql.insert(table)
+
+    @staticmethod
+    def in_values(column: ColumnElement, values: Iterable) -> ColumnElement[bool]:
+        """Match a column against a list of values.
+
+        On Postgres the values are sent as one array parameter, = ANY(:values), so
+        the statement, and its prepared statement, is the same for any number of
+        values instead of one IN (...) variant per list length.
+
+        Args:
+            column (ColumnElement): The column to match.
+            values (Iterable): The accepted values.
+
+        Returns:
+            ColumnElement[bool]: The condition.
+        """
+        if database_config.backend == "sqlite":
+            return column.in_(list(values))
+        return column == any_(bindparam(None, list(values), type_=postgresql.ARRAY(column.type)))
+
     @staticmethod
     async def fetch_one(query) -> dict | None:
-        async with engine.connect() as conn:
+        async with Database._connection() as conn:
             cursor = await conn.execute(query)
             row = cursor.fetchone()
-            return (row._mapping) if row else None
+            return dict(zip(cursor.keys(), row)) if row else None
 
     @staticmethod
     async def fetch_all(query) -> list[dict] | None:
-        async with engine.connect() as conn:
+        async with Database._connection() as conn:
             cursor = await conn.execute(query)
-            rows = cursor.fetchall()
-            return [(row._mapping) for row in rows]
+            # Zipping plain tuples with the keys is several times cheaper than RowMapping.
+            keys = list(cursor.keys())
+            return [dict(zip(keys, row)) for row in cursor.fetchall()]
 
     @staticmethod
-    async def execute(query) -> None:
-        async with engine.begin() as conn:
-            await conn.execute(query)
+    async def stream(query, partition_size: int = 1000) -> AsyncIterator[dict]:
+        """Iterate over the rows of a query through a server-side cursor.
+
+        Args:
+            query: The query to run.
+            partition_size (int): The number of rows fetched per round-trip.
+
+        The cursor always gets its own connection, even inside a unit of work,
+        since it stays open while the caller consumes the rows.
+
+        Yields:
+            dict: The rows, one at a time, without loading the whole result.
+        """
+        async with Database.connect() as conn:
+            result = await conn.stream(query.execution_options(yield_per=partition_size))
+            keys = list(result.keys())
+            async for row in result:
+                yield dict(zip(keys, row))
+
+    @staticmethod
+    async def stream_chunks(query, partition_size: int = 1000) -> AsyncIterator[list[tuple]]:
+        """Iterate over the rows of a query through a server-side cursor, a batch at a time.
+
+        Like stream, but without building a dict per row, for callers that
+        turn whole batches into columns.
+
+        Args:
+            query: The query to run.
+            partition_size (int): The number of rows fetched per round-trip and per batch.
+
+        Yields:
+            list[tuple]: The rows of each batch, as tuples in the order of the selected columns.
+        """
+        async with Database.connect() as conn:
+            result = await conn.stream(query.execution_options(yield_per=partition_size))
+            async for partition in result.partitions(partition_size):
+                yield [tuple(row) for row in partition]
+
+    @staticmethod
+    async def execute(query) -> int:
+        async with Database._transaction() as conn:
+            result = await conn.execute(query)
+            return result.rowcount
 
     @staticmethod
     async def execute_many(queries: list) -> None:
-        async with engine.begin() as conn:
+        async with Database._transaction() as conn:
             for query in queries:
                 await conn.execute(query)
 
     @staticmethod
-    async def init_models() -> None:
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
+    def chunk_rows(rows: list[dict]) -> Iterator[list[dict]]:
+        """Split rows for multi-row VALUES statements within the bind parameter limit.
+
+        Args:
+            rows (list[dict]): The rows to insert, all with the same columns.
+
+        Yields:
+            list[dict]: Consecutive chunks of rows.
+        """
+        if not rows:
+            return
+        size = max(1, MAX_BIND_PARAMS // len(rows[0]))
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
+
+
+MetricsRegistry.register_collector(lambda: collect_pool_metrics(Database._engine))
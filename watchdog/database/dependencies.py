@@ -0,0 +1,18 @@
+from typing import AsyncIterator
+from fastapi import Depends
+
+from watchdog.database.database import Database
+
+
+async def unit_of_work() -> AsyncIterator[None]:
+    """Open a unit of work for the duration of the endpoint.
+
+    Yields:
+        None: Database calls made by the endpoint share one connection and transaction.
+    """
+    async with Database.unit_of_work():
+        yield
+
+
+# Function scope commits before the response is sent, so a failed commit is reported.
+UnitOfWork = Depends(unit_of_work, scope="function")
@@ -1,5 +1,10 @@
+import uuid
 from sqlalchemy.orm import relationship
-from sqlalchemy import Column, UUID, String, Enum, DateTime, ForeignKey, DECIMAL
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy import (
+    Column, UUID, String, Text, Enum, DateTime, Date, Integer, BigInteger, Boolean, ForeignKey, Index, DECIMAL,
+    false
+)
 
 from watchdog.database.database import Base
 from watchdog.routing.clientes.enums import RiskLevelEnum, StatusKycEnum
@@ -7,10 +12,22 @@ from watchdog.routing.transacoes.enums import TipoTransacaoEnum, MoedaEnum
 from watchdog.routing.alertas.enums import SeveridadeEnum, StatusEnum, RegrasEnum
 
 
+class UUIDType(TypeDecorator):
+    """UUID column accepting string IDs on backends without a native UUID type."""
+
+    impl = UUID(as_uuid=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        return uuid.UUID(str(value))
+
+
 class Clientes(Base):
     __tablename__ = "clientes"
 
-    id = Column(UUID(as_uuid=True), primary_key=True)
+    id = Column(UUIDType, primary_key=True)
     nome = Column(String(50), nullable=False)
     email = Column(String(50), nullable=False, unique=True)
     pais = Column(String(50), nullable=False)
@@ -22,33 +39,110 @@ class Clientes(Base):
 class Transacoes(Base):
     __tablename__ = "transacoes"
 
-    id = Column(UUID(as_uuid=True), primary_key=True)
-    cliente_id = Column(UUID(as_uuid=True), ForeignKey("clientes.id"), nullable=False)
+    id = Column(UUIDType, primary_key=True)
+    cliente_id = Column(UUIDType, ForeignKey("clientes.id"), nullable=False)
     tipo = Column(String(50), nullable=False)
     valor = Column(DECIMAL, nullable=False)
     moeda = Column(String(50), nullable=False)
-    contraparte = Column(UUID(as_uuid=True), ForeignKey("clientes.id"), nullable=True)
-    data_hora = Column(DateTime, nullable=False)
+    contraparte = Column(UUIDType, ForeignKey("clientes.id"), nullable=True)
+    # Part of the key since the table is range partitioned by data_hora on Postgres.
+    data_hora = Column(DateTime, primary_key=True)
 
     cliente_rel = relationship("clientes", foreign_keys=[cliente_id])
     contraparte_rel = relationship("clientes", foreign_keys=[contraparte])
 
+    __table_args__ = (
+        Index("ix_transacoes_cliente_id_moeda_data_hora", "cliente_id", "moeda", "data_hora"),
+        Index("ix_transacoes_cliente_id_data_hora", "cliente_id", "data_hora"),
+        Index("ix_transacoes_contraparte", "contraparte"),
+        {"postgresql_partition_by": "RANGE (data_hora)"},
+    )
+
 
 class Alertas(Base):
     __tablename__ = "alertas"
 
-    id = Column(UUID(as_uuid=True), primary_key=True)
-    cliente_id = Column(UUID(as_uuid=True), ForeignKey("clientes.id"), nullable=False)
-    transacao_id = Column(UUID(as_uuid=True), ForeignKey("transacoes.id"), nullable=False)
+    id = Column(UUIDType, primary_key=True)
+    cliente_id = Column(UUIDType, ForeignKey("clientes.id"), nullable=False)
+    # No foreign key: transacoes.id alone is not unique on the partitioned table.
+    transacao_id = Column(UUIDType, nullable=False)
     regra = Column(String(50), nullable=False)
     severidade = Column(String(50), nullable=False)
     status = Column(String(50), nullable=False)
-    data_hora = Column(DateTime, nullable=False)
+    data_hora = Column(DateTime, primary_key=True)
 
     cliente_rel = relationship("clientes", foreign_keys=[cliente_id])
-    transacao_rel = relationship("transacoes", foreign_keys=[transacao_id])
+
+    __table_args__ = (
+        Index("ix_alertas_cliente_id_data_hora", "cliente_id", "data_hora"),
+        Index("ix_alertas_transacao_id", "transacao_id"),
+        {"postgresql_partition_by": "RANGE (data_hora)"},
+    )
+
+
+class TransacoesDiarias(Base):
+    __tablename__ = "transacoes_diarias"
+
+    cliente_id = Column(UUIDType, ForeignKey("clientes.id"), primary_key=True)
+    moeda = Column(String(50), primary_key=True)
+    dia = Column(Date, primary_key=True)
+    quantidade = Column(Integer, nullable=False)
+    quantidade_baixo_valor = Column(Integer, nullable=False)
+    valor_total = Column(DECIMAL, nullable=False)
+
+
+class AlertasDiarias(Base):
+    __tablename__ = "alertas_diarias"
+
+    cliente_id = Column(UUIDType, ForeignKey("clientes.id"), primary_key=True)
+    dia = Column(Date, primary_key=True)
+    regra = Column(String(50), primary_key=True)
+    severidade = Column(String(50), primary_key=True)
+    quantidade = Column(Integer, nullable=False)
+
+
+class RollupsCobertura(Base):
+    __tablename__ = "rollups_cobertura"
+
+    # The rollup table, and the first day it holds for every cliente, NULL for every day.
+    tabela = Column(String(50), primary_key=True)
+    inicio = Column(Date, nullable=True)
+
+
+class ChavesIdempotencia(Base):
+    __tablename__ = "chaves_idempotencia"
+
+    chave = Column(String(255), primary_key=True)
+    hash_requisicao = Column(String(64), nullable=False)
+    transacao_id = Column(UUIDType, nullable=True)
+    resposta = Column(Text, nullable=True)
+    criada_em = Column(DateTime, nullable=False)
+    expira_em = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_chaves_idempotencia_expira_em", "expira_em"),
+    )
+
+
+class FilaCompliance(Base):
+    __tablename__ = "fila_compliance"
+
+    # SQLite only autoincrements INTEGER PRIMARY KEY columns.
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    transacao_id = Column(UUIDType, nullable=False)
+    data_hora = Column(DateTime, nullable=False)
+    # Failed evaluations: retried from proxima_tentativa on, dead-lettered (morta) after the last one.
+    tentativas = Column(Integer, nullable=False, server_default="0")
+    proxima_tentativa = Column(DateTime, nullable=True)
+    morta = Column(Boolean, nullable=False, server_default=false())
+    ultimo_erro = Column(String(500), nullable=True)
 
 
 clientes_table = Clientes.__table__
 transacoes_table = Transacoes.__table__
 alertas_table = Alertas.__table__
+transacoes_diarias_table = TransacoesDiarias.__table__
+alertas_diarias_table = AlertasDiarias.__table__
+rollups_cobertura_table = RollupsCobertura.__table__
+fila_compliance_table = FilaCompliance.__table__
+chaves_idempotencia_table = ChavesIdempotencia.__table__
@@ -7,3 +7,30 @@ class DatabaseOperationException(BaseCustomException):
     
     STATUS_CODE = status.HTTP_500_INTERNAL_SERVER_ERROR
     DETAIL = "An error occurred while performing a database operation. {error}"
+
+
+class InvalidCursorException(BaseCustomException):
+
+    STATUS_CODE = status.HTTP_400_BAD_REQUEST
+    DETAIL = "The pagination cursor '{cursor}' is invalid."
+
+
+class DatabaseUnavailableException(BaseCustomException):
+
+    STATUS_CODE = status.HTTP_503_SERVICE_UNAVAILABLE
+    DETAIL = "The database is unavailable. {error}"
+
+
+class SchemaVersionException(BaseCustomException):
+
+    STATUS_CODE = status.HTTP_503_SERVICE_UNAVAILABLE
+    DETAIL = (
+        "The database schema is at version {atual}, expected {esperada}. "
+        "Apply the migrations with 'python -m watchdog.database.migrate upgrade'."
+    )
+
+
+class QueryBudgetExceededException(BaseCustomException):
+
+    STATUS_CODE = status.HTTP_500_INTERNAL_SERVER_ERROR
+    DETAIL = "The request ran {detalhe}, over DB_QUERY_WARN_COUNT or DB_QUERY_WARN_REPEATS."
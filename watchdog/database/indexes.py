@@ -0,0 +1,122 @@
+import asyncio
+from sqlalchemy import Index, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from watchdog.database.database import Base, Database
+import watchdog.database.entities  # noqa: F401  (registers the tables on Base.metadata)
+
+
+class IndexManager:
+
+    @classmethod
+    def get_indexes(cls) -> list[Index]:
+        """Get every index declared on the entities.
+
+        Returns:
+            list[Index]: The declared indexes, in table dependency order.
+        """
+        return [
+            index
+            for table in Base.metadata.sorted_tables
+            for index in sorted(table.indexes, key=lambda index: index.name)
+        ]
+
+    @classmethod
+    async def create_concurrently(cls) -> list[str]:
+        """Build the declared indexes on an existing database without blocking writes.
+
+        Safe to run repeatedly: existing valid indexes are skipped, and invalid ones
+        left behind by an interrupted concurrent build are dropped and rebuilt.
+        Partitioned tables cannot be indexed concurrently: their index is created
+        on the parent only, then built concurrently on each partition and attached.
+
+        Returns:
+            list[str]: The names of the indexes that were built.
+        """
+        built = []
+        async with Database.get_engine().connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for index in cls.get_indexes():
+                if await cls.__is_valid(conn, index.name):
+                    continue
+                columns = ", ".join(f'"{column.name}"' for column in index.columns)
+                particoes = await cls.__get_particoes(conn, index.table.name)
+                if not particoes:
+                    await cls.__create_concurrently(conn, index.name, index.table.name, columns)
+                    built.append(index.name)
+                    continue
+
+                await conn.execute(text(
+                    f'CREATE INDEX IF NOT EXISTS "{index.name}" ON ONLY "{index.table.name}" ({columns})'
+                ))
+                for particao in particoes:
+                    nome = index.name + particao.removeprefix(index.table.name)
+                    if not await cls.__is_valid(conn, nome):
+                        await cls.__create_concurrently(conn, nome, particao, columns)
+                        built.append(nome)
+                    await conn.execute(text(f'ALTER INDEX "{index.name}" ATTACH PARTITION "{nome}"'))
+                built.append(index.name)
+        return built
+
+    @classmethod
+    async def drop(cls) -> None:
+        """Drop the declared indexes, used to benchmark the unindexed schema."""
+        async with Database.get_engine().connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for index in cls.get_indexes():
+                if await cls.__get_particoes(conn, index.table.name):
+                    # Dropping the parent index drops the attached ones; it cannot be concurrent.
+                    await conn.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+                else:
+                    await conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+
+    @classmethod
+    async def __is_valid(cls, conn: AsyncConnection, name: str) -> bool:
+        """Whether an index exists and is valid, dropping it when a build left it invalid.
+
+        The index of a partitioned table ('I') stays invalid until every partition
+        has its index attached, so it is kept.
+        """
+        row = (await conn.execute(
+            text(
+                "SELECT i.indisvalid, c.relkind FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name"
+            ),
+            {"name": name}
+        )).first()
+        if row is None:
+            return False
+        valid, relkind = row
+        if not valid and relkind == "i":
+            await conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+        return valid
+
+    @classmethod
+    async def __create_concurrently(cls, conn: AsyncConnection, name: str, table: str, columns: str) -> None:
+        await conn.execute(text(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" ({columns})'))
+
+    @classmethod
+    async def __get_particoes(cls, conn: AsyncConnection, table: str) -> list[str]:
+        """The partitions of a table, empty if it is not partitioned."""
+        result = await conn.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :table AND p.relkind = 'p' "
+                "ORDER BY c.relname"
+            ),
+            {"table": table}
+        )
+        return list(result.scalars())
+
+
+async def main() -> None:
+    for name in await IndexManager.create_concurrently():
+        print(f"Built index {name}")
+    await Database.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
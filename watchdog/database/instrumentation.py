@@ -0,0 +1,204 @@
+import re
+from time import perf_counter
+from contextvars import ContextVar
+from contextlib import contextmanager
+from typing import Iterator
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from watchdog.app.settings import database_settings
+from watchdog.database.exceptions import QueryBudgetExceededException
+from watchdog.metrics.registry import Gauge, Metric, MetricsRegistry
+
+STATEMENT_TYPES = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "CREATE", "DROP", "ALTER"})
+_KEYWORD = re.compile(r"\s*(\w+)")
+
+pool_connections = MetricsRegistry.counter(
+    "watchdog_db_pool_connections_total",
+    "Connections opened to the database by the pool."
+)
+pool_invalidated = MetricsRegistry.counter(
+    "watchdog_db_pool_invalidated_total",
+    "Pooled connections invalidated, e.g. by a failed pre-ping."
+)
+pool_wait = MetricsRegistry.histogram(
+    "watchdog_db_pool_wait_seconds",
+    "Time spent waiting for a connection from the pool."
+)
+pool_timeouts = MetricsRegistry.counter(
+    "watchdog_db_pool_timeouts_total",
+    "Requests that gave up waiting for a connection after DB_POOL_TIMEOUT."
+)
+query_duration = MetricsRegistry.histogram(
+    "watchdog_db_query_duration_seconds",
+    "Statement execution time by statement type.",
+    labels=("statement",)
+)
+query_errors = MetricsRegistry.counter(
+    "watchdog_db_query_errors_total",
+    "Failed statements by statement type.",
+    labels=("statement",)
+)
+
+
+class RequestQueries:
+    """The statements executed on behalf of one request, recorded by the engine listeners.
+
+    A statement shape is its SQL text as sent to the driver, with the values
+    bound as parameters, so a lookup repeated in a loop, an N+1, shows up as one
+    shape with many executions.
+    """
+
+    __slots__ = ("count", "seconds", "slowest", "slowest_seconds", "shapes")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest: str | None = None
+        self.slowest_seconds = 0.0
+        self.shapes: dict[str, int] = {}
+
+    def record(self, statement: str, elapsed: float) -> None:
+        """Record an executed statement.
+
+        Args:
+            statement (str): The SQL sent to the driver.
+            elapsed (float): The execution time, in seconds.
+
+        Raises:
+            QueryBudgetExceededException: With DB_QUERY_RAISE, if the statement
+                goes over DB_QUERY_WARN_COUNT or DB_QUERY_WARN_REPEATS.
+        """
+        self.count += 1
+        self.seconds += elapsed
+        if elapsed > self.slowest_seconds:
+            self.slowest = statement
+            self.slowest_seconds = elapsed
+        repeats = self.shapes.get(statement, 0) + 1
+        self.shapes[statement] = repeats
+        if database_settings.DB_QUERY_RAISE:
+            if 0 < database_settings.DB_QUERY_WARN_COUNT < self.count:
+                raise QueryBudgetExceededException(detalhe=f"{self.count} statements")
+            if 0 < database_settings.DB_QUERY_WARN_REPEATS < repeats:
+                raise QueryBudgetExceededException(detalhe=f"{repeats} times the statement {statement[:200]!r}")
+
+    def get_repeated(self) -> dict[str, int]:
+        """Get the shapes executed more than DB_QUERY_WARN_REPEATS times.
+
+        Returns:
+            dict[str, int]: The executions of each repeated shape, most repeated first.
+        """
+        limit = database_settings.DB_QUERY_WARN_REPEATS
+        if limit <= 0:
+            return {}
+        repeated = sorted(
+            ((statement, repeats) for statement, repeats in self.shapes.items() if repeats > limit),
+            key=lambda item: item[1],
+            reverse=True
+        )
+        return dict(repeated)
+
+    def is_over_count(self) -> bool:
+        """Whether the request ran more than DB_QUERY_WARN_COUNT statements."""
+        return 0 < database_settings.DB_QUERY_WARN_COUNT < self.count
+
+
+_request_queries: ContextVar[RequestQueries | None] = ContextVar("request_queries", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[RequestQueries]:
+    """Record the statements run by the current context, and the tasks it starts.
+
+    Nested calls share the counters of the outer one.
+
+    Yields:
+        RequestQueries: The counters, updated as the statements complete.
+    """
+    current = _request_queries.get()
+    if current is not None:
+        yield current
+        return
+    queries = RequestQueries()
+    token = _request_queries.set(queries)
+    try:
+        yield queries
+    finally:
+        _request_queries.reset(token)
+
+
+def statement_type(statement: str) -> str:
+    """Get the leading keyword of a SQL statement, used as a low-cardinality label.
+
+    Args:
+        statement (str): The SQL sent to the driver.
+
+    Returns:
+        str: The upper-cased keyword, or OTHER for anything unexpected.
+    """
+    match = _KEYWORD.match(statement)
+    keyword = match.group(1).upper() if match else ""
+    return keyword if keyword in STATEMENT_TYPES else "OTHER"
+
+
+def collect_pool_metrics(engine: AsyncEngine | None) -> list[Metric]:
+    """Read the occupancy of the engine's pool, as counted by the pool itself.
+
+    Args:
+        engine (AsyncEngine | None): The engine in use, if it was created yet.
+
+    Returns:
+        list[Metric]: The pool gauges, empty for pools without a size (SQLite :memory:).
+    """
+    if engine is None or not isinstance(engine.pool, QueuePool):
+        return []
+    pool = engine.pool
+    size = Gauge("watchdog_db_pool_size", "Connections the pool keeps open (DB_POOL_SIZE).")
+    checked_out = Gauge("watchdog_db_pool_checked_out", "Connections currently checked out of the pool.")
+    overflow = Gauge("watchdog_db_pool_overflow", "Connections open beyond DB_POOL_SIZE.")
+    size.set(value=pool.size())
+    checked_out.set(value=pool.checkedout())
+    overflow.set(value=max(pool.overflow(), 0))
+    return [size, checked_out, overflow]
+
+
+def instrument_engine(engine: AsyncEngine) -> AsyncEngine:
+    """Attach the pool and query metrics listeners to an engine.
+
+    Args:
+        engine (AsyncEngine): The engine to instrument.
+
+    Returns:
+        AsyncEngine: The same engine.
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record) -> None:
+        pool_connections.inc()
+
+    @event.listens_for(sync_engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception) -> None:
+        pool_invalidated.inc()
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_start", []).append(perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = perf_counter() - conn.info["query_start"].pop()
+        query_duration.observe(statement_type(statement), value=elapsed)
+        queries = _request_queries.get()
+        if queries is not None:
+            queries.record(statement, elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def on_error(exception_context) -> None:
+        starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
+        query_errors.inc(statement_type(exception_context.statement or ""))
+
+    return engine
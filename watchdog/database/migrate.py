@@ -0,0 +1,32 @@
+"""Apply or inspect the versioned schema migrations.
+
+    python -m watchdog.database.migrate upgrade
+    python -m watchdog.database.migrate current
+"""
+import asyncio
+import argparse
+
+from watchdog.database.database import Database
+from watchdog.database.migrations import MigrationManager
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        if args.command == "upgrade":
+            applied = await MigrationManager.upgrade()
+            for versao in applied:
+                print(f"Applied migration {versao:04d}")
+            if not applied:
+                print("Schema already up to date")
+        print(
+            f"Schema at version {await MigrationManager.get_versao_atual()}, "
+            f"expected {MigrationManager.get_versao_esperada()}"
+        )
+    finally:
+        await Database.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the database schema migrations.")
+    parser.add_argument("command", choices=["upgrade", "current"])
+    asyncio.run(main(parser.parse_args()))
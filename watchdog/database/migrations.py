@@ -0,0 +1,130 @@
+import logging
+from datetime import datetime
+from typing import Callable
+from sqlalchemy import Column, Connection, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from watchdog.database.config import database_config
+from watchdog.database.database import Database
+from watchdog.database.exceptions import DatabaseUnavailableException, SchemaVersionException
+
+logger = logging.getLogger(__name__)
+
+Migration = Callable[[Connection], None]
+
+versao_schema_table = Table(
+    "versao_schema", MetaData(),
+    Column("versao", Integer, primary_key=True),
+    Column("descricao", String(100), nullable=False),
+    Column("aplicada_em", DateTime, nullable=False)
+)
+
+# Key of the Postgres advisory lock serializing concurrent upgrades.
+UPGRADE_LOCK_KEY = 7245001
+
+
+class MigrationManager:
+    """Registry of the versioned schema migrations and of the applied versions.
+
+    Every applied migration is recorded in versao_schema, so checking the schema
+    at startup is a single query instead of inspecting every table.
+    """
+
+    _migrations: dict[int, tuple[str, Migration]] = {}
+
+    @classmethod
+    def register(cls, versao: int, descricao: str) -> Callable[[Migration], Migration]:
+        """Register a migration, usable as a function decorator.
+
+        Args:
+            versao (int): The schema version the migration produces.
+            descricao (str): A short description, recorded when applied.
+
+        Returns:
+            Callable[[Migration], Migration]: The decorator registering the migration.
+        """
+        def decorator(migration: Migration) -> Migration:
+            if versao in cls._migrations:
+                raise ValueError(f"Migration {versao} is already registered.")
+            cls._migrations[versao] = (descricao, migration)
+            return migration
+        return decorator
+
+    @classmethod
+    def get_versao_esperada(cls) -> int:
+        """Get the schema version expected by this code.
+
+        Returns:
+            int: The highest registered migration version.
+        """
+        return max(cls.__get_migrations(), default=0)
+
+    @classmethod
+    async def get_versao_atual(cls) -> int:
+        """Get the schema version of the database.
+
+        Returns:
+            int: The last applied migration version, 0 if none was applied.
+        """
+        async with Database.connect() as conn:
+            return await conn.run_sync(cls.__get_versao)
+
+    @classmethod
+    async def check(cls) -> int:
+        """Check that the database schema is at the version expected by this code.
+
+        Returns:
+            int: The schema version.
+
+        Raises:
+            SchemaVersionException: If the schema is at another version.
+            DatabaseUnavailableException: If the database cannot be queried.
+        """
+        try:
+            atual = await cls.get_versao_atual()
+        except (SQLAlchemyError, OSError) as error:
+            raise DatabaseUnavailableException(error=error.__class__.__name__)
+        esperada = cls.get_versao_esperada()
+        if atual != esperada:
+            raise SchemaVersionException(atual=atual, esperada=esperada)
+        return atual
+
+    @classmethod
+    async def upgrade(cls) -> list[int]:
+        """Apply the pending migrations in version order, in one database transaction.
+
+        Concurrent upgrades from several processes are serialized by an advisory
+        lock on Postgres, so each migration is applied once.
+
+        Returns:
+            list[int]: The versions applied, empty if the schema was up to date.
+        """
+        migrations = cls.__get_migrations()
+        applied = []
+        async with Database.begin() as conn:
+            if database_config.backend == "postgres":
+                await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": UPGRADE_LOCK_KEY})
+            await conn.run_sync(versao_schema_table.create, checkfirst=True)
+            atual = await conn.run_sync(cls.__get_versao)
+            for versao in sorted(versao for versao in migrations if versao > atual):
+                descricao, migration = migrations[versao]
+                await conn.run_sync(migration)
+                await conn.execute(versao_schema_table.insert().values(
+                    versao=versao,
+                    descricao=descricao,
+                    aplicada_em=datetime.now()
+                ))
+                logger.info("Applied migration %04d %s", versao, descricao)
+                applied.append(versao)
+        return applied
+
+    @classmethod
+    def __get_versao(cls, conn: Connection) -> int:
+        if not inspect(conn).has_table(versao_schema_table.name):
+            return 0
+        return conn.scalar(select(func.max(versao_schema_table.c.versao))) or 0
+
+    @classmethod
+    def __get_migrations(cls) -> dict[int, tuple[str, Migration]]:
+        import watchdog.database.versions  # noqa: F401  (registers the migrations)
+        return cls._migrations
@@ -0,0 +1,110 @@
+import json
+from uuid import UUID
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from sqlalchemy import Column, Select, tuple_
+
+from watchdog.database.exceptions import InvalidCursorException
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class KeysetPagination:
+    """Keyset pagination on a (timestamp, id) pair, with opaque cursors."""
+
+    @classmethod
+    def encode_cursor(cls, data_hora: datetime, id: UUID) -> str:
+        """Encode the position after the given row as an opaque cursor.
+
+        Args:
+            data_hora (datetime): The timestamp of the last returned row.
+            id (UUID): The ID of the last returned row.
+
+        Returns:
+            str: The cursor to send back to fetch the next page.
+        """
+        payload = json.dumps([data_hora.isoformat(), str(id)]).encode()
+        return urlsafe_b64encode(payload).decode().rstrip("=")
+
+    @classmethod
+    def decode_cursor(cls, cursor: str) -> tuple[datetime, UUID]:
+        """Decode a cursor produced by encode_cursor.
+
+        Args:
+            cursor (str): The opaque cursor.
+
+        Returns:
+            tuple[datetime, UUID]: The timestamp and ID of the last returned row.
+
+        Raises:
+            InvalidCursorException: If the cursor is malformed.
+        """
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            data_hora, id = json.loads(urlsafe_b64decode(padded))
+            return datetime.fromisoformat(data_hora), UUID(id)
+        except (ValueError, TypeError):
+            raise InvalidCursorException(cursor=cursor)
+
+    @classmethod
+    def paginate(
+        cls,
+        query: Select,
+        time_column: Column,
+        id_column: Column,
+        cursor: str | None,
+        limit: int | None
+    ) -> Select:
+        """Order a query by (time_column, id_column) and start it after the cursor.
+
+        One extra row is requested so that build_page can tell whether a next
+        page exists without a count query.
+
+        Args:
+            query (Select): The filtered query.
+            time_column (Column): The timestamp column of the keyset.
+            id_column (Column): The ID column breaking timestamp ties.
+            cursor (str | None): The cursor returned with the previous page.
+            limit (int | None): The page size, or None to read until the end.
+
+        Returns:
+            Select: The paginated query.
+        """
+        if cursor:
+            data_hora, id = cls.decode_cursor(cursor)
+            # The plain bound is implied by the row comparison, but only it lets
+            # Postgres prune the partitions before the cursor.
+            query = query.where(
+                time_column >= data_hora,
+                tuple_(time_column, id_column) > tuple_(data_hora, id)
+            )
+        query = query.order_by(time_column, id_column)
+        if limit is not None:
+            query = query.limit(limit + 1)
+        return query
+
+    @classmethod
+    def build_page(
+        cls,
+        rows: list[dict],
+        limit: int,
+        time_key: str,
+        id_key: str = "id"
+    ) -> tuple[list[dict], str | None]:
+        """Split the rows of a paginated query into the page and the next cursor.
+
+        Args:
+            rows (list[dict]): The rows returned by a query built with paginate.
+            limit (int): The page size.
+            time_key (str): The name of the timestamp column of the keyset.
+            id_key (str): The name of the ID column of the keyset.
+
+        Returns:
+            tuple[list[dict], str | None]: The page rows and the cursor of the next
+                page, or None if this is the last page.
+        """
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, cls.encode_cursor(rows[-1][time_key], rows[-1][id_key])
@@ -0,0 +1,276 @@
+"""Monthly range partitions of transacoes and alertas on Postgres.
+
+Both tables are partitioned by data_hora. The partitions of the next
+DB_PARTITION_MONTHS_AHEAD months are created at startup and once a day, and
+with DB_PARTITION_RETENTION_MONTHS set the older ones are detached and dropped,
+instead of deleting rows. Rows dated outside every monthly partition land in
+the DEFAULT partition of their table, and the maintenance moves them into the
+partition of their month, creating it. The same operations are available by hand:
+
+    python -m watchdog.database.partitions list
+    python -m watchdog.database.partitions ensure --desde 2024-01-01
+    python -m watchdog.database.partitions detach --antes 2024-01-01 --drop
+
+On SQLite the tables are not partitioned and every operation is a no-op.
+"""
+import re
+import asyncio
+import logging
+import argparse
+from datetime import date
+from sqlalchemy import text
+
+from watchdog.app.settings import database_settings
+from watchdog.database.config import database_config
+from watchdog.database.database import Database
+from watchdog.database.schemas import Particao
+
+logger = logging.getLogger(__name__)
+
+TABELAS_PARTICIONADAS = ("transacoes", "alertas")
+
+# Key of the Postgres advisory lock serializing partition maintenance across workers.
+MAINTENANCE_LOCK_KEY = 7245002
+MAINTENANCE_INTERVAL = 24 * 60 * 60
+
+PARTICAO_PATTERN = re.compile(r"_(\d{4})_(\d{2})$")
+
+
+def add_meses(mes: date, meses: int) -> date:
+    """Get the first day of the month a number of months after another.
+
+    Args:
+        mes (date): Any day of the starting month.
+        meses (int): The number of months to add, negative to go back.
+
+    Returns:
+        date: The first day of the resulting month.
+    """
+    indice = mes.year * 12 + mes.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+class PartitionManager:
+
+    _task: asyncio.Task | None = None
+
+    @classmethod
+    def get_nome(cls, tabela: str, mes: date) -> str:
+        """Get the name of the partition of a table holding a month.
+
+        Args:
+            tabela (str): The partitioned table.
+            mes (date): Any day of the month.
+
+        Returns:
+            str: The partition name, as <tabela>_<YYYY>_<MM>.
+        """
+        return f"{tabela}_{mes:%Y_%m}"
+
+    @classmethod
+    def get_default(cls, tabela: str) -> str:
+        """Get the name of the DEFAULT partition of a table.
+
+        Args:
+            tabela (str): The partitioned table.
+
+        Returns:
+            str: The partition name, as <tabela>_default.
+        """
+        return f"{tabela}_default"
+
+    @classmethod
+    async def get_particoes(cls) -> list[Particao]:
+        """Get the monthly partitions of the partitioned tables.
+
+        Returns:
+            list[Particao]: The partitions ordered by table and month, empty on SQLite.
+        """
+        if database_config.backend != "postgres":
+            return []
+        rows = await Database.fetch_all(text(
+            "SELECT p.relname AS tabela, c.relname AS nome, c.reltuples AS linhas "
+            "FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname IN ('transacoes', 'alertas') "
+            "ORDER BY p.relname, c.relname"
+        ))
+        particoes = []
+        for row in rows:
+            match = PARTICAO_PATTERN.search(row["nome"])
+            if not match:
+                continue
+            inicio = date(int(match[1]), int(match[2]), 1)
+            particoes.append(Particao(
+                tabela=row["tabela"],
+                nome=row["nome"],
+                inicio=inicio,
+                fim=add_meses(inicio, 1),
+                # -1 until the partition is first analyzed.
+                linhas_estimadas=max(0, int(row["linhas"]))
+            ))
+        return particoes
+
+    @classmethod
+    async def ensure(cls, desde: date | None = None) -> list[str]:
+        """Create the missing monthly partitions up to DB_PARTITION_MONTHS_AHEAD months ahead.
+
+        The months of the rows in the DEFAULT partitions are created as well,
+        and their rows moved into them.
+
+        Args:
+            desde (date | None, optional): The first month to cover, for imports of
+                older rows. Defaults to the current month.
+
+        Returns:
+            list[str]: The names of the partitions created.
+        """
+        if database_config.backend != "postgres":
+            return []
+        hoje = date.today()
+        ultimo = add_meses(hoje, database_settings.DB_PARTITION_MONTHS_AHEAD)
+        created = []
+        async with Database.unit_of_work():
+            await Database.execute(text("SELECT pg_advisory_xact_lock(:key)").bindparams(key=MAINTENANCE_LOCK_KEY))
+            existentes = {particao.nome for particao in await cls.get_particoes()}
+            meses = set()
+            mes = add_meses(desde or hoje, 0)
+            while mes <= ultimo:
+                meses.add(mes)
+                mes = add_meses(mes, 1)
+            fora = {}
+            for tabela in TABELAS_PARTICIONADAS:
+                rows = await Database.fetch_all(text(
+                    f"SELECT DISTINCT date_trunc('month', data_hora) AS mes FROM {cls.get_default(tabela)}"
+                ))
+                fora[tabela] = {row["mes"].date() for row in rows}
+                meses.update(fora[tabela])
+            for mes in sorted(meses):
+                for tabela in TABELAS_PARTICIONADAS:
+                    nome = cls.get_nome(tabela, mes)
+                    if nome in existentes:
+                        continue
+                    if mes in fora[tabela]:
+                        await cls.__split(tabela, nome, mes)
+                    else:
+                        await Database.execute(text(
+                            f"CREATE TABLE {nome} PARTITION OF {tabela} "
+                            f"FOR VALUES FROM ('{mes}') TO ('{add_meses(mes, 1)}')"
+                        ))
+                    created.append(nome)
+        for nome in created:
+            logger.info("Created partition %s", nome)
+        return created
+
+    @classmethod
+    async def __split(cls, tabela: str, nome: str, mes: date) -> None:
+        """Create the partition of a month holding rows of the DEFAULT partition, moving them.
+
+        Postgres refuses to create a partition over rows of the DEFAULT one, so
+        the partition is filled as a standalone table and then attached, in the
+        caller's unit of work.
+
+        Args:
+            tabela (str): The partitioned table.
+            nome (str): The partition name.
+            mes (date): The first day of the month.
+        """
+        default = cls.get_default(tabela)
+        fim = add_meses(mes, 1)
+        await Database.execute(text(f"CREATE TABLE {nome} (LIKE {tabela} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        movidas = await Database.execute(text(
+            f"WITH movidas AS ("
+            f"DELETE FROM {default} WHERE data_hora >= '{mes}' AND data_hora < '{fim}' RETURNING *"
+            f") INSERT INTO {nome} SELECT * FROM movidas"
+        ))
+        await Database.execute(text(f"ALTER TABLE {tabela} ATTACH PARTITION {nome} FOR VALUES FROM ('{mes}') TO ('{fim}')"))
+        logger.warning("Moved %d rows out of %s into %s", movidas, default, nome)
+
+    @classmethod
+    async def detach(cls, antes: date, drop: bool = False) -> list[str]:
+        """Detach the partitions holding only rows older than a date.
+
+        Detaching takes a brief lock on the parent table, while deleting the same
+        rows would rewrite every index and leave the table bloated. Reports keep
+        the daily totals of the detached months through the rollup tables.
+
+        Args:
+            antes (date): Partitions ending on or before this date are detached.
+            drop (bool, optional): Drop the detached partitions. Defaults to False.
+
+        Returns:
+            list[str]: The names of the detached partitions.
+        """
+        detached = []
+        for particao in await cls.get_particoes():
+            if particao.fim > antes:
+                continue
+            async with Database.unit_of_work():
+                await Database.execute(text("SELECT pg_advisory_xact_lock(:key)").bindparams(key=MAINTENANCE_LOCK_KEY))
+                await Database.execute(text(f"ALTER TABLE {particao.tabela} DETACH PARTITION {particao.nome}"))
+                if drop:
+                    await Database.execute(text(f"DROP TABLE {particao.nome}"))
+            logger.info("%s partition %s", "Dropped" if drop else "Detached", particao.nome)
+            detached.append(particao.nome)
+        return detached
+
+    @classmethod
+    async def run_maintenance(cls) -> None:
+        """Create the upcoming partitions and drop the ones past the retention."""
+        await cls.ensure()
+        if database_settings.DB_PARTITION_RETENTION_MONTHS:
+            await cls.detach(add_meses(date.today(), -database_settings.DB_PARTITION_RETENTION_MONTHS), drop=True)
+
+    @classmethod
+    def start(cls) -> None:
+        """Start the daily maintenance task on the running event loop, on Postgres only."""
+        if database_config.backend == "postgres":
+            cls._task = asyncio.create_task(cls.run(), name="partition-maintenance")
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Cancel the maintenance task."""
+        if cls._task is not None:
+            cls._task.cancel()
+            await asyncio.gather(cls._task, return_exceptions=True)
+            cls._task = None
+
+    @classmethod
+    async def run(cls) -> None:
+        """Run the maintenance once a day until cancelled."""
+        while True:
+            await asyncio.sleep(MAINTENANCE_INTERVAL)
+            try:
+                await cls.run_maintenance()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Partition maintenance failed")
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        if args.command == "list":
+            for particao in await PartitionManager.get_particoes():
+                print(f"{particao.nome:<24} {particao.inicio} .. {particao.fim}  ~{particao.linhas_estimadas} rows")
+        elif args.command == "ensure":
+            for nome in await PartitionManager.ensure(args.desde):
+                print(f"Created partition {nome}")
+        else:
+            for nome in await PartitionManager.detach(args.antes, drop=args.drop):
+                print(f"{'Dropped' if args.drop else 'Detached'} partition {nome}")
+    finally:
+        await Database.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the monthly partitions of transacoes and alertas.")
+    parser.add_argument("command", choices=["list", "ensure", "detach"])
+    parser.add_argument("--desde", type=date.fromisoformat, default=None, help="First month to create, YYYY-MM-DD.")
+    parser.add_argument("--antes", type=date.fromisoformat, default=None, help="Detach partitions ending by YYYY-MM-DD.")
+    parser.add_argument("--drop", action="store_true", help="Drop the detached partitions.")
+    args = parser.parse_args()
+    if args.command == "detach" and args.antes is None:
+        parser.error("detach requires --antes")
+    asyncio.run(main(args))
@@ -0,0 +1,11 @@
+from datetime import date
+from pydantic import BaseModel
+
+
+class Particao(BaseModel):
+
+    tabela: str
+    nome: str
+    inicio: date
+    fim: date
+    linhas_estimadas: int
@@ -0,0 +1,252 @@
+"""Versioned schema migrations, applied in order by MigrationManager.
+
+A migration declares the tables it creates as they were at that version, not
+through the entities, so replaying the history on an empty database keeps
+producing the same schema after the entities change.
+"""
+from datetime import date
+from sqlalchemy import (
+    Column, Connection, MetaData, Table, String, Text, DateTime, Date, Integer, BigInteger, ForeignKey, Index, DECIMAL,
+    text
+)
+
+from watchdog.compliance.config import values_limit
+from watchdog.database.entities import UUIDType
+from watchdog.database.migrations import MigrationManager
+
+
+@MigrationManager.register(1, "baseline")
+def baseline(conn: Connection) -> None:
+    """Create the tables of the schema previously built by create_all.
+
+    Tables and indexes already present, as in databases created before
+    migrations existed, are left untouched.
+    """
+    metadata = MetaData()
+    Table(
+        "clientes", metadata,
+        Column("id", UUIDType, primary_key=True),
+        Column("nome", String(50), nullable=False),
+        Column("email", String(50), nullable=False, unique=True),
+        Column("pais", String(50), nullable=False),
+        Column("nivel_risco", String(50), nullable=False),
+        Column("status_kyc", String(50), nullable=False),
+        Column("data_criacao", DateTime, nullable=False)
+    )
+    Table(
+        "transacoes", metadata,
+        Column("id", UUIDType, primary_key=True),
+        Column("cliente_id", UUIDType, ForeignKey("clientes.id"), nullable=False),
+        Column("tipo", String(50), nullable=False),
+        Column("valor", DECIMAL, nullable=False),
+        Column("moeda", String(50), nullable=False),
+        Column("contraparte", UUIDType, ForeignKey("clientes.id"), nullable=True),
+        Column("data_hora", DateTime, nullable=False),
+        Index("ix_transacoes_cliente_id_moeda_data_hora", "cliente_id", "moeda", "data_hora"),
+        Index("ix_transacoes_cliente_id_data_hora", "cliente_id", "data_hora"),
+        Index("ix_transacoes_contraparte", "contraparte")
+    )
+    Table(
+        "alertas", metadata,
+        Column("id", UUIDType, primary_key=True),
+        Column("cliente_id", UUIDType, ForeignKey("clientes.id"), nullable=False),
+        Column("transacao_id", UUIDType, ForeignKey("transacoes.id"), nullable=False),
+        Column("regra", String(50), nullable=False),
+        Column("severidade", String(50), nullable=False),
+        Column("status", String(50), nullable=False),
+        Column("data_hora", DateTime, nullable=False),
+        Index("ix_alertas_cliente_id_data_hora", "cliente_id", "data_hora"),
+        Index("ix_alertas_transacao_id", "transacao_id")
+    )
+    Table(
+        "transacoes_diarias", metadata,
+        Column("cliente_id", UUIDType, ForeignKey("clientes.id"), primary_key=True),
+        Column("moeda", String(50), primary_key=True),
+        Column("dia", Date, primary_key=True),
+        Column("quantidade", Integer, nullable=False),
+        Column("quantidade_baixo_valor", Integer, nullable=False),
+        Column("valor_total", DECIMAL, nullable=False)
+    )
+    Table(
+        "alertas_diarias", metadata,
+        Column("cliente_id", UUIDType, ForeignKey("clientes.id"), primary_key=True),
+        Column("dia", Date, primary_key=True),
+        Column("regra", String(50), primary_key=True),
+        Column("severidade", String(50), primary_key=True),
+        Column("quantidade", Integer, nullable=False)
+    )
+    Table(
+        "fila_compliance", metadata,
+        Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+        Column("transacao_id", UUIDType, nullable=False),
+        Column("data_hora", DateTime, nullable=False)
+    )
+    metadata.create_all(conn, checkfirst=True)
+
+
+@MigrationManager.register(2, "chaves de idempotencia")
+def chaves_idempotencia(conn: Connection) -> None:
+    """Create the table of the Idempotency-Key values of POST /api/transacoes."""
+    metadata = MetaData()
+    Table(
+        "chaves_idempotencia", metadata,
+        Column("chave", String(255), primary_key=True),
+        Column("hash_requisicao", String(64), nullable=False),
+        Column("transacao_id", UUIDType, nullable=True),
+        Column("resposta", Text, nullable=True),
+        Column("criada_em", DateTime, nullable=False),
+        Column("expira_em", DateTime, nullable=False),
+        Index("ix_chaves_idempotencia_expira_em", "expira_em")
+    )
+    metadata.create_all(conn)
+
+
+@MigrationManager.register(3, "particionamento mensal de transacoes e alertas")
+def particionamento_mensal(conn: Connection) -> None:
+    """Rebuild transacoes and alertas as tables range partitioned by month on data_hora.
+
+    The rows are copied into monthly partitions covering every existing row and
+    the next three months; PartitionManager creates the later ones. Partitioned
+    tables need the partition key in every unique constraint, so the primary
+    keys become (id, data_hora) and alertas.transacao_id loses its foreign key.
+    SQLite has no partitioning and keeps its tables.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+
+    indexes = {
+        "transacoes": [
+            "ix_transacoes_cliente_id_moeda_data_hora",
+            "ix_transacoes_cliente_id_data_hora",
+            "ix_transacoes_contraparte"
+        ],
+        "alertas": ["ix_alertas_cliente_id_data_hora", "ix_alertas_transacao_id"]
+    }
+    conn.execute(text("ALTER TABLE alertas DROP CONSTRAINT IF EXISTS alertas_transacao_id_fkey"))
+    for tabela, nomes in indexes.items():
+        conn.execute(text(f"ALTER TABLE {tabela} RENAME TO {tabela}_legado"))
+        conn.execute(text(f"ALTER TABLE {tabela}_legado DROP CONSTRAINT {tabela}_pkey"))
+        for nome in nomes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {nome}"))
+
+    metadata = MetaData()
+    Table("clientes", metadata, Column("id", UUIDType, primary_key=True))
+    Table(
+        "transacoes", metadata,
+        Column("id", UUIDType, primary_key=True),
+        Column("cliente_id", UUIDType, ForeignKey("clientes.id"), nullable=False),
+        Column("tipo", String(50), nullable=False),
+        Column("valor", DECIMAL, nullable=False),
+        Column("moeda", String(50), nullable=False),
+        Column("contraparte", UUIDType, ForeignKey("clientes.id"), nullable=True),
+        Column("data_hora", DateTime, primary_key=True),
+        Index("ix_transacoes_cliente_id_moeda_data_hora", "cliente_id", "moeda", "data_hora"),
+        Index("ix_transacoes_cliente_id_data_hora", "cliente_id", "data_hora"),
+        Index("ix_transacoes_contraparte", "contraparte"),
+        postgresql_partition_by="RANGE (data_hora)"
+    )
+    Table(
+        "alertas", metadata,
+        Column("id", UUIDType, primary_key=True),
+        Column("cliente_id", UUIDType, ForeignKey("clientes.id"), nullable=False),
+        Column("transacao_id", UUIDType, nullable=False),
+        Column("regra", String(50), nullable=False),
+        Column("severidade", String(50), nullable=False),
+        Column("status", String(50), nullable=False),
+        Column("data_hora", DateTime, primary_key=True),
+        Index("ix_alertas_cliente_id_data_hora", "cliente_id", "data_hora"),
+        Index("ix_alertas_transacao_id", "transacao_id"),
+        postgresql_partition_by="RANGE (data_hora)"
+    )
+    metadata.tables["transacoes"].create(conn)
+    metadata.tables["alertas"].create(conn)
+
+    primeiro, ultimo = conn.execute(text(
+        "SELECT least(min(data_hora), localtimestamp), greatest(max(data_hora), localtimestamp) FROM ("
+        "SELECT data_hora FROM transacoes_legado UNION ALL SELECT data_hora FROM alertas_legado) t"
+    )).one()
+    mes = date(primeiro.year, primeiro.month, 1)
+    ultimo_mes = date(ultimo.year + (ultimo.month + 2) // 12, (ultimo.month + 2) % 12 + 1, 1)
+    while mes <= ultimo_mes:
+        proximo = date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+        for tabela in indexes:
+            conn.execute(text(
+                f"CREATE TABLE {tabela}_{mes:%Y_%m} PARTITION OF {tabela} "
+                f"FOR VALUES FROM ('{mes}') TO ('{proximo}')"
+            ))
+        mes = proximo
+
+    for tabela in indexes:
+        conn.execute(text(f"INSERT INTO {tabela} SELECT * FROM {tabela}_legado"))
+        conn.execute(text(f"DROP TABLE {tabela}_legado"))
+
+
+@MigrationManager.register(4, "preenchimento dos rollups diarios")
+def preenchimento_rollups(conn: Connection) -> None:
+    """Fill transacoes_diarias and alertas_diarias from the raw rows.
+
+    The rollups were created empty, so the days before they were maintained by
+    the write paths read as zero in the reports. They are recomputed like
+    'python -m watchdog.routing.relatorios.rollups rebuild' does, leaving out
+    the transactions still in the compliance queue, and rollups_cobertura
+    records that they now hold every day.
+    """
+    metadata = MetaData()
+    Table(
+        "rollups_cobertura", metadata,
+        Column("tabela", String(50), primary_key=True),
+        Column("inicio", Date, nullable=True)
+    )
+    metadata.create_all(conn)
+
+    # SQLite stores dates as ISO text; CAST AS DATE would yield a number.
+    dia = "date(data_hora)" if conn.dialect.name == "sqlite" else "CAST(data_hora AS DATE)"
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("LOCK TABLE transacoes_diarias, alertas_diarias IN SHARE ROW EXCLUSIVE MODE"))
+    conn.execute(text("DELETE FROM transacoes_diarias"))
+    conn.execute(text("DELETE FROM alertas_diarias"))
+    conn.execute(text(
+        "INSERT INTO transacoes_diarias (cliente_id, moeda, dia, quantidade, quantidade_baixo_valor, valor_total) "
+        f"SELECT cliente_id, moeda, {dia}, count(*), sum(CASE WHEN valor < :baixo_valor THEN 1 ELSE 0 END), "
+        "sum(valor) FROM transacoes "
+        "WHERE id NOT IN (SELECT transacao_id FROM fila_compliance) "
+        f"GROUP BY cliente_id, moeda, {dia}"
+    ), {"baixo_valor": values_limit.MAX_LOW_AMMOUNT})
+    conn.execute(text(
+        "INSERT INTO alertas_diarias (cliente_id, dia, regra, severidade, quantidade) "
+        f"SELECT cliente_id, {dia}, regra, severidade, count(*) FROM alertas "
+        f"GROUP BY cliente_id, {dia}, regra, severidade"
+    ))
+    conn.execute(text(
+        "INSERT INTO rollups_cobertura (tabela, inicio) VALUES ('transacoes_diarias', NULL), ('alertas_diarias', NULL)"
+    ))
+
+
+@MigrationManager.register(5, "tentativas da fila de compliance")
+def tentativas_fila(conn: Connection) -> None:
+    """Track the failed evaluations of the compliance queue entries.
+
+    A failing entry is retried with exponential backoff and dead-lettered,
+    morta, after COMPLIANCE_MAX_ATTEMPTS, instead of blocking its cliente.
+    """
+    for coluna in (
+        "tentativas INTEGER NOT NULL DEFAULT 0",
+        "proxima_tentativa TIMESTAMP",
+        "morta BOOLEAN NOT NULL DEFAULT FALSE",
+        "ultimo_erro VARCHAR(500)"
+    ):
+        conn.execute(text(f"ALTER TABLE fila_compliance ADD COLUMN {coluna}"))
+
+
+@MigrationManager.register(6, "particoes default de transacoes e alertas")
+def particoes_default(conn: Connection) -> None:
+    """Add a DEFAULT partition to transacoes and alertas.
+
+    Without it a row dated outside every monthly partition, such as a backdated
+    import, fails to insert. PartitionManager moves the rows it collects into
+    monthly partitions on its next run. SQLite has no partitioning.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    for tabela in ("transacoes", "alertas"):
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {tabela}_default PARTITION OF {tabela} DEFAULT"))
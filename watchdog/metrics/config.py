@@ -0,0 +1,13 @@
+from pydantic_settings import BaseSettings
+
+
+class ProfilingConfig(BaseSettings):
+
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: str | None = None
+    PROFILING_SAMPLE_RATE: float = 0
+    PROFILING_PATHS: list[str] = ["/api/"]
+    PROFILING_DIR: str = "profiles"
+
+
+profiling_config = ProfilingConfig()
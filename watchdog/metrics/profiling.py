@@ -0,0 +1,133 @@
+"""Opt-in profiling of single requests.
+
+With PROFILING_ENABLED, a request under PROFILING_PATHS is profiled when it
+carries the X-Profile header with PROFILING_TOKEN, or at random for a
+PROFILING_SAMPLE_RATE fraction of the requests. Its cProfile call tree is
+written to PROFILING_DIR and its wall, CPU and database time are logged.
+Requests profiled through the header also get the wall and CPU time in a
+Server-Timing header and the profile name in X-Profile-Id:
+
+    curl -i -H "X-Profile: $PROFILING_TOKEN" "http://127.0.0.1:6000/api/relatorios/?cliente_id=..."
+    python -m pstats profiles/<X-Profile-Id>.prof
+
+The profiler and the CPU clock cover the whole event loop thread, so requests
+running at the same time show up in both. Only one request is profiled at a
+time; requests selected meanwhile are only timed. The header timings stop when
+the response starts, before a streamed body is sent. Without
+PROFILING_ENABLED the middleware is not installed.
+"""
+import os
+import re
+import hmac
+import random
+import asyncio
+import logging
+import cProfile
+from uuid import uuid4
+from datetime import datetime
+from time import perf_counter, thread_time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from watchdog.database.instrumentation import track_queries
+from watchdog.metrics.config import profiling_config
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+_SLUG = re.compile(r"[^A-Za-z0-9]+")
+
+
+def server_timing(wall: float, cpu: float) -> str:
+    """Format the timings of a request as a Server-Timing header value.
+
+    The database time is added by QueryTrackingMiddleware.
+
+    Args:
+        wall (float): The elapsed seconds.
+        cpu (float): The CPU seconds of the event loop thread.
+
+    Returns:
+        str: The header value, durations in milliseconds.
+    """
+    return f"app;dur={wall * 1000:.1f}, cpu;dur={cpu * 1000:.1f}"
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling the requests selected by header or sampling."""
+
+    # cProfile allows a single active profiler per thread.
+    _profiling = False
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.paths = tuple(profiling_config.PROFILING_PATHS)
+        self.token = profiling_config.PROFILING_TOKEN.encode() if profiling_config.PROFILING_TOKEN else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+        authorized = self.__is_authorized(scope)
+        if not authorized and random.random() >= profiling_config.PROFILING_SAMPLE_RATE:
+            await self.app(scope, receive, send)
+            return
+
+        profiler = None
+        if not ProfilingMiddleware._profiling:
+            ProfilingMiddleware._profiling = True
+            profiler = cProfile.Profile()
+        nome = self.__get_nome(scope)
+
+        with track_queries() as queries:
+            start = perf_counter()
+            cpu_start = thread_time()
+
+            async def send_with_timing(message: Message) -> None:
+                if authorized and message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "Server-Timing",
+                        server_timing(perf_counter() - start, thread_time() - cpu_start)
+                    )
+                    if profiler:
+                        headers.append("X-Profile-Id", nome)
+                await send(message)
+
+            if profiler:
+                profiler.enable()
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                if profiler:
+                    profiler.disable()
+                    ProfilingMiddleware._profiling = False
+                wall = perf_counter() - start
+                cpu = thread_time() - cpu_start
+
+        arquivo = await asyncio.to_thread(self.__dump, profiler, nome) if profiler else None
+        logger.info(
+            "Timed %s %s: wall %.1f ms, cpu %.1f ms, db %.1f ms in %d queries, profile %s",
+            scope["method"], scope["path"], wall * 1000, cpu * 1000, queries.seconds * 1000, queries.count,
+            arquivo or "skipped while another request was profiled"
+        )
+
+    def __is_authorized(self, scope: Scope) -> bool:
+        if self.token is None:
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return hmac.compare_digest(value, self.token)
+        return False
+
+    @staticmethod
+    def __get_nome(scope: Scope) -> str:
+        slug = _SLUG.sub("_", scope["path"]).strip("_")
+        return f"{datetime.now():%Y%m%dT%H%M%S}-{scope['method']}-{slug}-{uuid4().hex[:8]}"
+
+    @staticmethod
+    def __dump(profiler: cProfile.Profile, nome: str) -> str:
+        os.makedirs(profiling_config.PROFILING_DIR, exist_ok=True)
+        arquivo = os.path.join(profiling_config.PROFILING_DIR, f"{nome}.prof")
+        profiler.dump_stats(arquivo)
+        return arquivo
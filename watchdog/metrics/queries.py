@@ -0,0 +1,89 @@
+"""Per-request accounting of the SQL statements.
+
+Every HTTP request is tracked with track_queries, so the engine listeners
+record its statements. The statement count, total database time and slowest
+statement are returned in Server-Timing and logged in one line:
+
+    Server-Timing: db;dur=4.2;desc="12 queries", db-slowest;dur=1.3
+
+A warning is logged when a request runs more than DB_QUERY_WARN_COUNT
+statements or one statement more than DB_QUERY_WARN_REPEATS times, usually a
+per-row lookup in a loop. With DB_QUERY_RAISE, meant for CI, the statement
+going over either limit fails the request instead.
+
+The header is sent with the response headers. For a streamed body it counts
+the statements run up to that point. The log line counts the whole request.
+"""
+import logging
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from watchdog.app.settings import database_settings
+from watchdog.database.instrumentation import RequestQueries, track_queries
+
+logger = logging.getLogger(__name__)
+
+# Characters of a statement kept in the logs.
+STATEMENT_LOG_LENGTH = 300
+
+
+def query_timing(queries: RequestQueries) -> str:
+    """Format the statements of a request as a Server-Timing header value.
+
+    Args:
+        queries (RequestQueries): The statements run for the request.
+
+    Returns:
+        str: The header value, durations in milliseconds.
+    """
+    return (
+        f'db;dur={queries.seconds * 1000:.1f};desc="{queries.count} queries", '
+        f"db-slowest;dur={queries.slowest_seconds * 1000:.1f}"
+    )
+
+
+def _shorten(statement: str | None) -> str | None:
+    return " ".join(statement.split())[:STATEMENT_LOG_LENGTH] if statement else None
+
+
+class QueryTrackingMiddleware:
+    """ASGI middleware recording the statements of every request."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = None
+        with track_queries() as queries:
+
+            async def send_with_timing(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    MutableHeaders(scope=message).append("Server-Timing", query_timing(queries))
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+
+        if not queries.count:
+            return
+        logger.info(
+            "method=%s path=%s status=%s queries=%d db_ms=%.1f slowest_ms=%.1f slowest=%r",
+            scope["method"], scope["path"], status_code, queries.count, queries.seconds * 1000,
+            queries.slowest_seconds * 1000, _shorten(queries.slowest)
+        )
+        if queries.is_over_count():
+            logger.warning(
+                "method=%s path=%s ran %d statements, over DB_QUERY_WARN_COUNT=%d",
+                scope["method"], scope["path"], queries.count, database_settings.DB_QUERY_WARN_COUNT
+            )
+        for statement, repeats in queries.get_repeated().items():
+            logger.warning(
+                "method=%s path=%s ran one statement %d times, over DB_QUERY_WARN_REPEATS=%d, possible N+1: %r",
+                scope["method"], scope["path"], repeats, database_settings.DB_QUERY_WARN_REPEATS,
+                _shorten(statement)
+            )
@@ -0,0 +1,191 @@
+import inspect
+from bisect import bisect_left
+from typing import Awaitable, Callable, Iterable
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+Sample = tuple[str, dict[str, str], float]
+Collector = Callable[[], Iterable["Metric"] | Awaitable[Iterable["Metric"]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Metric:
+    """A metric family rendered in the Prometheus text exposition format.
+
+    Every family is keyed by its label values, given positionally in the order
+    of ``labels`` when the metric is updated.
+    """
+
+    TYPE = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        lines.extend(
+            f"{name}{_format_labels(labels)} {_format_value(value)}"
+            for name, labels, value in self.samples()
+        )
+        return "\n".join(lines)
+
+    def _label_dict(self, values: tuple[str, ...]) -> dict[str, str]:
+        return dict(zip(self.labels, values))
+
+
+class Counter(Metric):
+
+    TYPE = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        # An unlabelled series is exposed as 0 before its first update.
+        self._values: dict[tuple[str, ...], float] = {} if labels else {(): 0}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def set(self, *label_values: str, value: float) -> None:
+        """Set the counter from a total kept elsewhere, such as a cache's own counters."""
+        self._values[label_values] = value
+
+    def samples(self) -> Iterable[Sample]:
+        for values, value in self._values.items():
+            yield self.name, self._label_dict(values), value
+
+
+class Gauge(Counter):
+
+    TYPE = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(Metric):
+
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, *label_values: str, value: float) -> None:
+        counts = self._counts.get(label_values)
+        if counts is None:
+            counts = self._counts[label_values] = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[label_values] = self._sums.get(label_values, 0) + value
+
+    def samples(self) -> Iterable[Sample]:
+        for values, counts in self._counts.items():
+            labels = self._label_dict(values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, self._sums[values]
+            yield f"{self.name}_count", labels, cumulative
+
+
+class MetricsRegistry:
+    """Process-wide registry of the metrics exposed on /metrics.
+
+    Metrics updated on the hot path are registered once and mutated in place;
+    values owned by other components (caches, rule engine, pool) are read by
+    collectors only when the endpoint is scraped.
+    """
+
+    _metrics: dict[str, Metric] = {}
+    _collectors: list[Collector] = []
+
+    @classmethod
+    def register(cls, metric: Metric) -> Metric:
+        """Register a metric family.
+
+        Args:
+            metric (Metric): The metric to expose.
+
+        Returns:
+            Metric: The registered metric, or the one already registered under its name.
+        """
+        return cls._metrics.setdefault(metric.name, metric)
+
+    @classmethod
+    def counter(cls, name: str, documentation: str, labels: tuple[str, ...] = ()) -> Counter:
+        return cls.register(Counter(name, documentation, labels))
+
+    @classmethod
+    def gauge(cls, name: str, documentation: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return cls.register(Gauge(name, documentation, labels))
+
+    @classmethod
+    def histogram(
+        cls,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return cls.register(Histogram(name, documentation, labels, buckets))
+
+    @classmethod
+    def register_collector(cls, collector: Collector) -> Collector:
+        """Register a function building metrics at scrape time, usable as a decorator.
+
+        Args:
+            collector (Collector): A function, or coroutine function, returning
+                the metrics to render.
+
+        Returns:
+            Collector: The same function.
+        """
+        cls._collectors.append(collector)
+        return collector
+
+    @classmethod
+    async def render(cls) -> str:
+        """Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition, one family after the other.
+        """
+        families = list(cls._metrics.values())
+        for collector in cls._collectors:
+            collected = collector()
+            if inspect.isawaitable(collected):
+                collected = await collected
+            families.extend(collected)
+        return "\n".join(family.render() for family in families) + "\n"
@@ -0,0 +1,76 @@
+from fastapi import APIRouter, status
+from fastapi.responses import PlainTextResponse
+
+from watchdog.app.startup import startup_timer
+from watchdog.cache.ttl_cache import TTLCache
+from watchdog.compliance.service import ComplianceService
+from watchdog.metrics.registry import Counter, Gauge, Metric, MetricsRegistry
+
+metrics_router = APIRouter()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@MetricsRegistry.register_collector
+def collect_cache_metrics() -> list[Metric]:
+    """Expose the counters kept by every TTLCache."""
+    size = Gauge("watchdog_cache_size", "Entries currently held by the cache.", ("cache",))
+    hits = Counter("watchdog_cache_hits_total", "Cache lookups served from memory.", ("cache",))
+    misses = Counter("watchdog_cache_misses_total", "Cache lookups that missed or expired.", ("cache",))
+    evictions = Counter("watchdog_cache_evictions_total", "Entries evicted to respect maxsize.", ("cache",))
+    for name, stats in TTLCache.get_all_stats().items():
+        size.set(name, value=stats.size)
+        hits.set(name, value=stats.hits)
+        misses.set(name, value=stats.misses)
+        evictions.set(name, value=stats.evictions)
+    return [size, hits, misses, evictions]
+
+
+@MetricsRegistry.register_collector
+def collect_rule_metrics() -> list[Metric]:
+    """Expose the evaluation counters of the compliance rules and their dependencies."""
+    evaluations = Counter("watchdog_rule_evaluations_total", "Compliance rule evaluations.", ("regra",))
+    triggers = Counter("watchdog_rule_triggers_total", "Compliance rule evaluations that raised an alerta.", ("regra",))
+    rule_seconds = Counter(
+        "watchdog_rule_evaluation_seconds_total",
+        "Time spent evaluating compliance rules.",
+        ("regra",)
+    )
+    fetches = Counter(
+        "watchdog_rule_dependency_fetches_total",
+        "Compliance rule dependencies resolved by the engine.",
+        ("dependencia",)
+    )
+    fetch_seconds = Counter(
+        "watchdog_rule_dependency_seconds_total",
+        "Time spent resolving compliance rule dependencies.",
+        ("dependencia",)
+    )
+    stats = ComplianceService.get_stats()
+    for regra, timing in stats.regras.items():
+        evaluations.set(regra, value=timing.avaliacoes)
+        triggers.set(regra, value=timing.disparos)
+        rule_seconds.set(regra, value=timing.tempo_total_ms / 1000)
+    for dependencia, timing in stats.dependencias.items():
+        fetches.set(dependencia, value=timing.avaliacoes)
+        fetch_seconds.set(dependencia, value=timing.tempo_total_ms / 1000)
+    return [evaluations, triggers, rule_seconds, fetches, fetch_seconds]
+
+
+@MetricsRegistry.register_collector
+def collect_startup_metrics() -> list[Metric]:
+    """Expose the duration of each startup step of this process."""
+    etapas = Gauge("watchdog_startup_seconds", "Time spent in each startup step.", ("etapa",))
+    for etapa, segundos in startup_timer.get_etapas().items():
+        etapas.set(etapa, value=segundos)
+    return [etapas]
+
+
+@metrics_router.get("/metrics", status_code=status.HTTP_200_OK, response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """Get the process metrics in the Prometheus text exposition format.
+
+    Returns:
+        PlainTextResponse: The pool, query, cache and rule metrics.
+    """
+    return PlainTextResponse(await MetricsRegistry.render(), media_type=CONTENT_TYPE)
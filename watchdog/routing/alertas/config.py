@@ -0,0 +1,11 @@
+from pydantic_settings import BaseSettings
+
+
+class AlertasConfig(BaseSettings):
+
+    ALERTAS_STATUS_MAX_IDS: int = 10000
+    # Alertas a filtered status update may change, larger updates are refused.
+    ALERTAS_STATUS_MAX_FILTRADOS: int = 10000
+
+
+alertas_config = AlertasConfig()
@@ -6,6 +6,9 @@ class RegrasEnum(Enum):
     LIMITE_DIARIO = "Limite Diario"
     PAISES_SUSPEITOS = "Paises Suspeitos"
     TRANSACOES_REPETIDAS = "Transacoes Repetidas"
+    CICLO_TRANSACOES = "Ciclo Transacoes"
+    FAN_OUT = "Fan Out"
+    FAN_IN = "Fan In"
 
 
 class SeveridadeEnum(Enum):
@@ -22,6 +25,14 @@ class StatusEnum(Enum):
     RESOLVIDO = "Resolvido"
 
 
+# The statuses an alerta may move to from each status.
+TRANSICOES_STATUS: dict[StatusEnum, frozenset[StatusEnum]] = {
+    StatusEnum.NOVO: frozenset({StatusEnum.EM_ANALISE, StatusEnum.RESOLVIDO}),
+    StatusEnum.EM_ANALISE: frozenset({StatusEnum.NOVO, StatusEnum.RESOLVIDO}),
+    StatusEnum.RESOLVIDO: frozenset({StatusEnum.EM_ANALISE}),
+}
+
+
 class PaisesSuspeitosEnum(Enum):
 
     COREIA_NORTE = "Coreia do Norte"
@@ -30,8 +41,4 @@ class PaisesSuspeitosEnum(Enum):
     CUBA = "Cuba"
 
 
-SEVERIDADE_ENUM_MAP = {
-    RegrasEnum.LIMITE_DIARIO: SeveridadeEnum.BAIXA,
-    RegrasEnum.TRANSACOES_REPETIDAS: SeveridadeEnum.MEDIA,
-    RegrasEnum.PAISES_SUSPEITOS: SeveridadeEnum.ALTA,
-}
+PAISES_SUSPEITOS = frozenset(pais.value for pais in PaisesSuspeitosEnum)
@@ -7,3 +7,21 @@ class AlertaNotFoundException(BaseCustomException):
 
     STATUS_CODE = status.HTTP_404_NOT_FOUND
     DETAIL = "Alerta with the given ID '{id}' was not found."
+
+
+class InvalidStatusTransitionException(BaseCustomException):
+
+    STATUS_CODE = status.HTTP_422_UNPROCESSABLE_ENTITY
+    DETAIL = "Alertas cannot move from status '{origem}' to '{destino}'."
+
+
+class AlertasStatusTooManyIdsException(BaseCustomException):
+
+    STATUS_CODE = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    DETAIL = "Status update has {size} IDs, the maximum is {max_size}."
+
+
+class AlertasStatusTooManyMatchesException(BaseCustomException):
+
+    STATUS_CODE = status.HTTP_422_UNPROCESSABLE_ENTITY
+    DETAIL = "Status update filter matches more than the maximum of {max_size} alertas."
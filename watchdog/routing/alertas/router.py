@@ -1,8 +1,18 @@
 from datetime import datetime
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Query, status
+from fastapi.responses import Response, StreamingResponse
 
+from watchdog.app.settings import entry_settings
+from watchdog.database.dependencies import UnitOfWork
+from watchdog.database.pagination import DEFAULT_LIMIT, MAX_LIMIT
+from watchdog.routing.responses import RowsJSONResponse, page_response
 from watchdog.routing.alertas.enums import RegrasEnum, SeveridadeEnum, StatusEnum
-from watchdog.routing.alertas.schemas import AlertaResponse
+from watchdog.routing.alertas.schemas import (
+    AlertaResponse,
+    AlertasPage,
+    AlertasStatusRequest,
+    AlertasStatusResponse
+)
 from watchdog.routing.alertas.service import AlertasService
 
 alertas_router = APIRouter(prefix="/alertas")
@@ -22,19 +32,21 @@ async def get_alerta_by_id(id: str) -> AlertaResponse:
 
 
 @alertas_router.get("/by-transacao-id", status_code=status.HTTP_200_OK, response_model=list[AlertaResponse])
-async def get_alertas_by_transacao_id(transacao_id: str) -> list[AlertaResponse]:
+async def get_alertas_by_transacao_id(transacao_id: str) -> list[AlertaResponse] | Response:
     """Get alertas by transaction ID endpoint.
 
     Args:
         transacao_id (str): The ID of the transaction to retrieve alertas for.
 
     Returns:
-        list[AlertaResponse]: A list of alertas associated with the transaction.
+        list[AlertaResponse] | Response: A list of alertas associated with the transaction.
     """
+    if entry_settings.APP_FAST_JSON:
+        return RowsJSONResponse(await AlertasService.fetch_alertas_by_transacao_id(transacao_id))
     return await AlertasService.get_alertas_by_transacao_id(transacao_id)
 
 
-@alertas_router.get("/filter", status_code=status.HTTP_200_OK, response_model=list[AlertaResponse])
+@alertas_router.get("/filter", status_code=status.HTTP_200_OK, response_model=AlertasPage)
 async def get_filtered_alertas(
     cliente_id: str | None = None,
     regra: RegrasEnum | None = None,
@@ -42,8 +54,11 @@ async def get_filtered_alertas(
     status: StatusEnum | None = None,
     periodo_inicio: datetime | None = None,
     periodo_fim: datetime | None = None,
-) -> list[AlertaResponse]:
-    """Get filtered alertas endpoint.
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str | None = None,
+    stream: bool = False,
+) -> AlertasPage | Response:
+    """Get filtered alertas endpoint, ordered by date.
 
     Args:
         cliente_id (str | None): Filter by client ID.
@@ -52,11 +67,15 @@ async def get_filtered_alertas(
         status (StatusEnum | None): Filter by status.
         periodo_inicio (datetime | None): Filter by start of the period.
         periodo_fim (datetime | None): Filter by end of the period.
+        limit (int): Page size.
+        cursor (str | None): The next_cursor of the previous page.
+        stream (bool): Stream every matching alerta as NDJSON, ignoring limit.
 
     Returns:
-        list[AlertaResponse]: A list of filtered alertas.
+        AlertasPage | Response: A page of filtered alertas, rendered straight
+            from the rows when APP_FAST_JSON is set, or the NDJSON stream of all of them.
     """
-    return await AlertasService.get_filtered_alertas(
+    filters = dict(
         cliente_id=cliente_id,
         regra=regra,
         severidade=severidade,
@@ -64,3 +83,29 @@ async def get_filtered_alertas(
         periodo_inicio=periodo_inicio,
         periodo_fim=periodo_fim,
     )
+    if stream:
+        return StreamingResponse(
+            AlertasService.stream_alertas(**filters, cursor=cursor),
+            media_type="application/x-ndjson"
+        )
+    if entry_settings.APP_FAST_JSON:
+        return page_response(*await AlertasService.fetch_alertas_page(**filters, limit=limit, cursor=cursor))
+    return await AlertasService.get_alertas_page(**filters, limit=limit, cursor=cursor)
+
+
+@alertas_router.patch(
+    "/status",
+    status_code=status.HTTP_200_OK,
+    response_model=AlertasStatusResponse,
+    dependencies=[UnitOfWork]
+)
+async def update_status(request: AlertasStatusRequest) -> AlertasStatusResponse:
+    """Move alertas to a new status in bulk endpoint.
+
+    Args:
+        request (AlertasStatusRequest): The target status and the alerta IDs or a filter.
+
+    Returns:
+        AlertasStatusResponse: The number of alertas updated and the IDs left unchanged.
+    """
+    return await AlertasService.update_status(request)
@@ -1,5 +1,5 @@
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from datetime import datetime
 
 from watchdog.routing.alertas.enums import SeveridadeEnum, StatusEnum, RegrasEnum
@@ -23,3 +23,41 @@ class AlertaResponse(BaseModel):
     severidade: SeveridadeEnum
     status: StatusEnum
     data_hora: datetime
+
+
+class AlertasPage(BaseModel):
+
+    items: list[AlertaResponse]
+    next_cursor: str | None
+
+
+class AlertasFiltro(BaseModel):
+
+    cliente_id: str | None = None
+    regra: RegrasEnum | None = None
+    severidade: SeveridadeEnum | None = None
+    status: StatusEnum | None = None
+    periodo_inicio: datetime | None = None
+    periodo_fim: datetime | None = None
+
+
+class AlertasStatusRequest(BaseModel):
+
+    ids: list[UUID] | None = None
+    filtro: AlertasFiltro | None = None
+    status: StatusEnum
+
+    @model_validator(mode="after")
+    def check_selecao(self) -> "AlertasStatusRequest":
+        if (self.ids is None) == (self.filtro is None):
+            raise ValueError("Provide either ids or filtro.")
+        if self.filtro is not None and not self.filtro.model_dump(exclude_none=True):
+            raise ValueError("filtro must set at least one condition.")
+        return self
+
+
+class AlertasStatusResponse(BaseModel):
+
+    status: StatusEnum
+    atualizados: int
+    ignorados: list[UUID]
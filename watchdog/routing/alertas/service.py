@@ -1,36 +1,95 @@
-from uuid import uuid4
+from uuid import UUID, uuid4
+from typing import AsyncIterator
 from datetime import datetime
+from collections import Counter
+from sqlalchemy import ColumnElement, Select, func, select
 
 from watchdog.database.database import Database
-from watchdog.database.entities import alertas_table
-from watchdog.routing.alertas.enums import RegrasEnum, SeveridadeEnum, StatusEnum
-from watchdog.routing.alertas.exceptions import AlertaNotFoundException
-from watchdog.routing.alertas.schemas import AlertaRequest, AlertaResponse
+from watchdog.database.entities import alertas_diarias_table, alertas_table, transacoes_table
+from watchdog.database.pagination import KeysetPagination
+from watchdog.routing.alertas.config import alertas_config
+from watchdog.routing.alertas.enums import TRANSICOES_STATUS, RegrasEnum, SeveridadeEnum, StatusEnum
+from watchdog.routing.alertas.exceptions import (
+    AlertaNotFoundException,
+    AlertasStatusTooManyIdsException,
+    AlertasStatusTooManyMatchesException,
+    InvalidStatusTransitionException
+)
+from watchdog.routing.alertas.schemas import (
+    AlertaRequest,
+    AlertaResponse,
+    AlertasPage,
+    AlertasStatusRequest,
+    AlertasStatusResponse
+)
+from watchdog.routing.relatorios.cache import RelatorioCache
+from watchdog.routing.responses import encode_ndjson
 
 
 class AlertasService:
 
     @classmethod
-    async def prepare_insert_query(cls, alerta: AlertaRequest):
-        """Prepare the insert query for a new alerta.
-        
+    async def prepare_bulk_insert_querys(cls, alertas: list[AlertaRequest]) -> list:
+        """Prepare multi-row insert queries for a batch of new alertas.
+
+        The daily alertas rollup is updated by upserts in the same list, so it
+        stays consistent with the alertas table.
+
         Args:
-            alerta (AlertaRequest): The alerta data to insert.
+            alertas (list[AlertaRequest]): The alertas data to insert.
+
+        Returns:
+            list: The insert and rollup queries, empty if there are no alertas.
+        """
+        rows = [cls.prepare_insert_values(alerta) for alerta in alertas]
+        querys = [alertas_table.insert().values(chunk) for chunk in Database.chunk_rows(rows)]
+        return querys + cls.prepare_rollup_querys(rows)
+
+    @classmethod
+    def prepare_rollup_querys(cls, rows: list[dict]) -> list:
+        """Prepare the upserts adding new alertas rows to the daily alertas rollup.
+
+        Args:
+            rows (list[dict]): The alertas rows being inserted.
 
         Returns:
+            list: The upsert queries, one row per (cliente, dia, regra, severidade).
         """
-        new_id = uuid4()
-        date_created = datetime.now()
-
-        return alertas_table.insert().values(
-            id = new_id,
-            cliente_id = alerta.cliente_id,
-            transacao_id = alerta.transacao_id,
-            regra = alerta.regra.value,
-            severidade = alerta.severidade.value,
-            status = alerta.status.value,
-            data_hora = date_created
+        quantidades = Counter(
+            (UUID(str(row["cliente_id"])), row["data_hora"].date(), row["regra"], row["severidade"])
+            for row in rows
         )
+        rollup_rows = [
+            {
+                "cliente_id": cliente_id,
+                "dia": dia,
+                "regra": regra,
+                "severidade": severidade,
+                "quantidade": quantidade
+            }
+            for (cliente_id, dia, regra, severidade), quantidade in quantidades.items()
+        ]
+        return [cls.__build_rollup_query(chunk) for chunk in Database.chunk_rows(rollup_rows)]
+
+    @classmethod
+    def prepare_insert_values(cls, alerta: AlertaRequest) -> dict:
+        """Prepare the column values for a new alerta.
+
+        Args:
+            alerta (AlertaRequest): The alerta data to insert.
+
+        Returns:
+            dict: The values of the new alerta row.
+        """
+        return {
+            "id": uuid4(),
+            "cliente_id": alerta.cliente_id,
+            "transacao_id": alerta.transacao_id,
+            "regra": alerta.regra.value,
+            "severidade": alerta.severidade.value,
+            "status": alerta.status.value,
+            "data_hora": datetime.now()
+        }
 
     @classmethod
     async def get_alerta_by_id(cls, alerta_id: str) -> AlertaResponse:
@@ -61,9 +120,27 @@ class AlertasService:
         Returns:
             list[AlertaResponse]: A list of alertas associated with the transaction.
         """
-        query = alertas_table.select().where(alertas_table.c.transacao_id == transacao_id)
-        rows = await Database.fetch_all(query)
-        return [AlertaResponse(**row) for row in rows] if rows else []
+        rows = await cls.fetch_alertas_by_transacao_id(transacao_id)
+        return [AlertaResponse(**row) for row in rows]
+
+    @classmethod
+    async def fetch_alertas_by_transacao_id(cls, transacao_id: str) -> list[dict]:
+        """Get the raw rows of the alertas of a transaction.
+
+        Args:
+            transacao_id (str): The ID of the transaction to retrieve alertas for.
+
+        Returns:
+            list[dict]: The alerta rows associated with the transaction.
+        """
+        # Alertas are never older than their transaction: bounding data_hora by it
+        # lets Postgres skip the partitions of the months before.
+        data_hora = select(transacoes_table.c.data_hora).where(transacoes_table.c.id == transacao_id)
+        query = alertas_table.select().where(
+            alertas_table.c.transacao_id == transacao_id,
+            alertas_table.c.data_hora >= data_hora.scalar_subquery()
+        )
+        return await Database.fetch_all(query)
 
     @classmethod
     async def get_filtered_alertas(
@@ -85,24 +162,341 @@ class AlertasService:
             periodo_inicio (datetime | None): Filter by start of date range.
             periodo_fim (datetime | None): Filter by end of date range.
         """
-        query = alertas_table.select()
+        query = await cls.prepare_filter_query(
+            cliente_id=cliente_id,
+            regra=regra,
+            severidade=severidade,
+            status=status,
+            periodo_inicio=periodo_inicio,
+            periodo_fim=periodo_fim
+        )
+        rows = await Database.fetch_all(query)
+        return [AlertaResponse(**row) for row in rows] if rows else []
+
+    @classmethod
+    async def get_alertas_page(
+        cls,
+        cliente_id: str | None,
+        regra: RegrasEnum | None,
+        severidade: SeveridadeEnum | None,
+        status: StatusEnum | None,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+        limit: int,
+        cursor: str | None,
+    ) -> AlertasPage:
+        """Get one page of filtered alertas, ordered by date and ID.
+
+        Args:
+            cliente_id (str | None): Filter by client ID.
+            regra (RegrasEnum | None): Filter by rule.
+            severidade (SeveridadeEnum | None): Filter by severity.
+            status (StatusEnum | None): Filter by status.
+            periodo_inicio (datetime | None): Filter by start of date range.
+            periodo_fim (datetime | None): Filter by end of date range.
+            limit (int): The maximum number of alertas in the page.
+            cursor (str | None): The cursor returned with the previous page.
+
+        Returns:
+            AlertasPage: The alertas and the cursor of the next page.
+        """
+        rows, next_cursor = await cls.fetch_alertas_page(
+            cliente_id=cliente_id,
+            regra=regra,
+            severidade=severidade,
+            status=status,
+            periodo_inicio=periodo_inicio,
+            periodo_fim=periodo_fim,
+            limit=limit,
+            cursor=cursor
+        )
+        return AlertasPage(
+            items=[AlertaResponse(**row) for row in rows],
+            next_cursor=next_cursor
+        )
+
+    @classmethod
+    async def fetch_alertas_page(
+        cls,
+        cliente_id: str | None,
+        regra: RegrasEnum | None,
+        severidade: SeveridadeEnum | None,
+        status: StatusEnum | None,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+        limit: int,
+        cursor: str | None,
+    ) -> tuple[list[dict], str | None]:
+        """Get the raw rows of one page of filtered alertas, ordered by date and ID.
+
+        Args:
+            cliente_id (str | None): Filter by client ID.
+            regra (RegrasEnum | None): Filter by rule.
+            severidade (SeveridadeEnum | None): Filter by severity.
+            status (StatusEnum | None): Filter by status.
+            periodo_inicio (datetime | None): Filter by start of date range.
+            periodo_fim (datetime | None): Filter by end of date range.
+            limit (int): The maximum number of alertas in the page.
+            cursor (str | None): The cursor returned with the previous page.
+
+        Returns:
+            tuple[list[dict], str | None]: The alerta rows and the cursor of the next page.
+        """
+        query = await cls.prepare_filter_query(
+            cliente_id=cliente_id,
+            regra=regra,
+            severidade=severidade,
+            status=status,
+            periodo_inicio=periodo_inicio,
+            periodo_fim=periodo_fim
+        )
+        query = KeysetPagination.paginate(
+            query,
+            alertas_table.c.data_hora,
+            alertas_table.c.id,
+            cursor=cursor,
+            limit=limit
+        )
+        return KeysetPagination.build_page(
+            await Database.fetch_all(query),
+            limit=limit,
+            time_key="data_hora"
+        )
+
+    @classmethod
+    async def get_quantidade_por_regra(
+        cls,
+        cliente_id: str,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+        condicao: ColumnElement[bool] | None = None
+    ) -> dict[RegrasEnum, int]:
+        """Count a client's alertas per rule on the database side.
+
+        Args:
+            cliente_id (str): Filter by client ID.
+            periodo_inicio (datetime | None): Filter by start of date range.
+            periodo_fim (datetime | None): Filter by end of date range.
+            condicao (ColumnElement[bool] | None): An extra filter, such as the
+                edge days of a rollup read.
+
+        Returns:
+            dict[RegrasEnum, int]: The number of alertas for each rule with at least one alerta.
+        """
+        query = await cls.prepare_filter_query(
+            cliente_id=cliente_id,
+            regra=None,
+            severidade=None,
+            status=None,
+            periodo_inicio=periodo_inicio,
+            periodo_fim=periodo_fim
+        )
+        if condicao is not None:
+            query = query.where(condicao)
+        query = query.with_only_columns(
+            alertas_table.c.regra,
+            func.count().label("quantidade")
+        ).group_by(alertas_table.c.regra)
+
+        rows = await Database.fetch_all(query)
+        return {RegrasEnum(row["regra"]): row["quantidade"] for row in rows}
+
+    @classmethod
+    async def stream_alertas(
+        cls,
+        cliente_id: str | None,
+        regra: RegrasEnum | None,
+        severidade: SeveridadeEnum | None,
+        status: StatusEnum | None,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+        cursor: str | None,
+    ) -> AsyncIterator[bytes]:
+        """Stream the filtered alertas as NDJSON from a server-side cursor.
+
+        Args:
+            cliente_id (str | None): Filter by client ID.
+            regra (RegrasEnum | None): Filter by rule.
+            severidade (SeveridadeEnum | None): Filter by severity.
+            status (StatusEnum | None): Filter by status.
+            periodo_inicio (datetime | None): Filter by start of date range.
+            periodo_fim (datetime | None): Filter by end of date range.
+            cursor (str | None): Start after the position of this cursor.
+
+        Yields:
+            bytes: One JSON encoded alerta per line.
+        """
+        query = await cls.prepare_filter_query(
+            cliente_id=cliente_id,
+            regra=regra,
+            severidade=severidade,
+            status=status,
+            periodo_inicio=periodo_inicio,
+            periodo_fim=periodo_fim
+        )
+        query = KeysetPagination.paginate(
+            query,
+            alertas_table.c.data_hora,
+            alertas_table.c.id,
+            cursor=cursor,
+            limit=None
+        )
+        async for row in Database.stream(query):
+            yield encode_ndjson(row, AlertaResponse)
+
+    @classmethod
+    async def prepare_filter_query(
+        cls,
+        cliente_id: str | None,
+        regra: RegrasEnum | None,
+        severidade: SeveridadeEnum | None,
+        status: StatusEnum | None,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+    ) -> Select:
+        """Prepare the select query for the provided filters.
+
+        Args:
+            cliente_id (str | None): Filter by client ID.
+            regra (RegrasEnum | None): Filter by rule.
+            severidade (SeveridadeEnum | None): Filter by severity.
+            status (StatusEnum | None): Filter by status.
+            periodo_inicio (datetime | None): Filter by start of date range.
+            periodo_fim (datetime | None): Filter by end of date range.
+
+        Returns:
+            Select: The filtered query.
+        """
+        return alertas_table.select().where(*cls.get_filter_conditions(
+            cliente_id=cliente_id,
+            regra=regra,
+            severidade=severidade,
+            status=status,
+            periodo_inicio=periodo_inicio,
+            periodo_fim=periodo_fim
+        ))
 
+    @classmethod
+    def get_filter_conditions(
+        cls,
+        cliente_id: str | None,
+        regra: RegrasEnum | None,
+        severidade: SeveridadeEnum | None,
+        status: StatusEnum | None,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+    ) -> list[ColumnElement[bool]]:
+        """Get the WHERE conditions of the provided filters.
+
+        Args:
+            cliente_id (str | None): Filter by client ID.
+            regra (RegrasEnum | None): Filter by rule.
+            severidade (SeveridadeEnum | None): Filter by severity.
+            status (StatusEnum | None): Filter by status.
+            periodo_inicio (datetime | None): Filter by start of date range.
+            periodo_fim (datetime | None): Filter by end of date range.
+
+        Returns:
+            list[ColumnElement[bool]]: The conditions, empty without filters.
+        """
+        conditions = []
         if cliente_id:
-            query = query.where(alertas_table.c.cliente_id == cliente_id)
+            conditions.append(alertas_table.c.cliente_id == cliente_id)
         if regra:
-            query = query.where(alertas_table.c.regra == regra.value)
+            conditions.append(alertas_table.c.regra == regra.value)
         if severidade:
-            query = query.where(alertas_table.c.severidade == severidade.value)
+            conditions.append(alertas_table.c.severidade == severidade.value)
         if status:
-            query = query.where(alertas_table.c.status == status.value)
+            conditions.append(alertas_table.c.status == status.value)
         if (periodo_inicio and periodo_fim) and (periodo_inicio <= periodo_fim):
-            query = query.where(
-                alertas_table.c.data_hora.between(periodo_inicio, periodo_fim)
-            )
+            conditions.append(alertas_table.c.data_hora.between(periodo_inicio, periodo_fim))
         elif periodo_inicio:
-            query = query.where(alertas_table.c.data_hora >= periodo_inicio)
+            conditions.append(alertas_table.c.data_hora >= periodo_inicio)
         elif periodo_fim:
-            query = query.where(alertas_table.c.data_hora <= periodo_fim)
-        
-        rows = await Database.fetch_all(query)
-        return [AlertaResponse(**row) for row in rows] if rows else []
+            conditions.append(alertas_table.c.data_hora <= periodo_fim)
+        return conditions
+
+    @classmethod
+    async def update_status(cls, request: AlertasStatusRequest) -> AlertasStatusResponse:
+        """Move the selected alertas to a new status with a single set-based UPDATE.
+
+        Only the alertas whose current status allows the transition, as listed in
+        TRANSICOES_STATUS, are updated; the others are left as they are.
+
+        Args:
+            request (AlertasStatusRequest): The target status and either the alerta
+                IDs or a filter as in get_filtered_alertas.
+
+        Returns:
+            AlertasStatusResponse: The number of alertas updated and, when selected
+                by ID, the IDs not found or not allowed to make the transition.
+
+        Raises:
+            AlertasStatusTooManyIdsException: If more IDs than configured are given.
+            AlertasStatusTooManyMatchesException: If the filter matches more alertas than configured.
+            InvalidStatusTransitionException: If the filtered status cannot move to the target.
+        """
+        origens = [origem.value for origem, destinos in TRANSICOES_STATUS.items() if request.status in destinos]
+        query = alertas_table.update().where(
+            alertas_table.c.status.in_(origens)
+        ).values(status=request.status.value)
+
+        if request.ids is None:
+            filtro = request.filtro
+            if filtro.status and request.status not in TRANSICOES_STATUS[filtro.status]:
+                raise InvalidStatusTransitionException(origem=filtro.status.value, destino=request.status.value)
+            # One statement, bounded to one row past the limit; going past it
+            # raises and rolls back the unit of work.
+            limite = alertas_config.ALERTAS_STATUS_MAX_FILTRADOS
+            selecionados = select(alertas_table.c.id).where(
+                alertas_table.c.status.in_(origens),
+                *cls.get_filter_conditions(**filtro.model_dump())
+            ).limit(limite + 1)
+            rows = await Database.fetch_all(
+                query.where(alertas_table.c.id.in_(selecionados)).returning(alertas_table.c.cliente_id)
+            )
+            if len(rows) > limite:
+                raise AlertasStatusTooManyMatchesException(max_size=limite)
+            RelatorioCache.invalidate_after_commit({row["cliente_id"] for row in rows})
+            return AlertasStatusResponse(status=request.status, atualizados=len(rows), ignorados=[])
+
+        if len(request.ids) > alertas_config.ALERTAS_STATUS_MAX_IDS:
+            raise AlertasStatusTooManyIdsException(
+                size=len(request.ids),
+                max_size=alertas_config.ALERTAS_STATUS_MAX_IDS
+            )
+        ids = list(dict.fromkeys(request.ids))
+        rows = await Database.fetch_all(
+            query.where(Database.in_values(alertas_table.c.id, ids)).returning(
+                alertas_table.c.id,
+                alertas_table.c.cliente_id
+            )
+        )
+        RelatorioCache.invalidate_after_commit(row["cliente_id"] for row in rows)
+        atualizados = {UUID(str(row["id"])) for row in rows}
+        return AlertasStatusResponse(
+            status=request.status,
+            atualizados=len(atualizados),
+            ignorados=[id for id in ids if id not in atualizados]
+        )
+
+    @classmethod
+    def __build_rollup_query(cls, rows: list[dict]):
+        """Build the multi-row upsert adding the given counts to the alertas rollup.
+
+        Args:
+            rows (list[dict]): The rollup rows to add.
+
+        Returns:
+            The upsert query.
+        """
+        query = Database.insert(alertas_diarias_table).values(rows)
+        return query.on_conflict_do_update(
+            index_elements=[
+                alertas_diarias_table.c.cliente_id,
+                alertas_diarias_table.c.dia,
+                alertas_diarias_table.c.regra,
+                alertas_diarias_table.c.severidade
+            ],
+            set_={"quantidade": alertas_diarias_table.c.quantidade + query.excluded.quantidade}
+        )
@@ -1,12 +1,17 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import Response, StreamingResponse
 
-from watchdog.routing.clientes.schemas import ClienteRequest, ClienteResponse
+from watchdog.app.settings import entry_settings
+from watchdog.database.dependencies import UnitOfWork
+from watchdog.database.pagination import DEFAULT_LIMIT, MAX_LIMIT
+from watchdog.routing.clientes.schemas import ClienteRequest, ClienteResponse, ClientesPage
 from watchdog.routing.clientes.service import ClientesService
+from watchdog.routing.responses import conditional_response, page_response
 
 clientes_router = APIRouter(prefix="/clientes")
 
 
-@clientes_router.post("/", status_code=201, response_model=ClienteResponse)
+@clientes_router.post("/", status_code=201, response_model=ClienteResponse, dependencies=[UnitOfWork])
 async def create_cliente(user: ClienteRequest) -> ClienteResponse:
     """Create a new user
     
@@ -19,24 +24,43 @@ async def create_cliente(user: ClienteRequest) -> ClienteResponse:
     return await ClientesService.create_cliente(user)
 
 
-@clientes_router.get("/", status_code=200, response_model=list[ClienteResponse])
-async def get_clientes() -> list[ClienteResponse]:
-    """Get all users
+@clientes_router.get("/", status_code=200, response_model=ClientesPage)
+async def get_clientes(
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str | None = None,
+    stream: bool = False,
+) -> ClientesPage | Response:
+    """Get users, ordered by creation date
     
+    Args:
+        limit (int): Page size.
+        cursor (str | None): The next_cursor of the previous page.
+        stream (bool): Stream every user as NDJSON, ignoring limit.
+
     Returns:
-        list[ClienteResponse]: List of users.
+        ClientesPage | Response: Page of users, rendered straight from the rows when
+            APP_FAST_JSON is set, or the NDJSON stream of all of them.
     """
-    return await ClientesService.get_clientes()
+    if stream:
+        return StreamingResponse(
+            ClientesService.stream_clientes(cursor),
+            media_type="application/x-ndjson"
+        )
+    if entry_settings.APP_FAST_JSON:
+        return page_response(*await ClientesService.fetch_clientes_page(limit=limit, cursor=cursor))
+    return await ClientesService.get_clientes(limit=limit, cursor=cursor)
 
 
 @clientes_router.get("/by-id", status_code=200, response_model=ClienteResponse)
-async def get_user(id: str) -> ClienteResponse:
+async def get_user(id: str, if_none_match: str | None = Header(None, alias="If-None-Match")) -> Response:
     """Get a user by ID
     
     Args:
         id (str): User ID.
+        if_none_match (str | None): The ETag of the user held by the client, answered
+            with 304 Not Modified while it is current.
 
     Returns:
-        ClienteResponse: User with the given ID.
+        Response: User with the given ID, or 304 Not Modified.
     """
-    return await ClientesService.get_cliente_by_id(id)
+    return conditional_response(await ClientesService.get_cached_cliente(id), if_none_match)
@@ -23,3 +23,16 @@ class ClienteResponse(BaseModel):
     nivel_risco: RiskLevelEnum
     status_kyc: StatusKycEnum
     data_criacao: datetime
+
+
+class ClientesPage(BaseModel):
+
+    items: list[ClienteResponse]
+    next_cursor: str | None
+
+
+class ClientePerfil(BaseModel):
+
+    id: UUID
+    pais: str
+    nivel_risco: RiskLevelEnum
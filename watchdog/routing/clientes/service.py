@@ -1,22 +1,41 @@
-from uuid import uuid4
-from datetime import datetime
+from uuid import UUID, uuid4
+from typing import AsyncIterator
+from datetime import datetime, timezone
 from sqlalchemy.exc import IntegrityError
 
+from watchdog.cache.config import cache_config
+from watchdog.cache.schemas import RespostaCacheada
+from watchdog.cache.ttl_cache import TTLCache
 from watchdog.database.database import Database
 from watchdog.database.entities import clientes_table
+from watchdog.database.pagination import KeysetPagination
 
 from watchdog.routing.clientes.exceptions import (
     ClienteNotFoundException,
     ClienteEmailAlreadyExistsException
 )
 from watchdog.routing.clientes.schemas import (
+    ClientePerfil,
     ClienteRequest,
-    ClienteResponse
+    ClienteResponse,
+    ClientesPage
 )
+from watchdog.routing.responses import cache_response, encode_ndjson
 
 
 class ClientesService:
 
+    perfil_cache = TTLCache(
+        name="clientes_perfil",
+        maxsize=cache_config.CLIENTE_CACHE_MAXSIZE,
+        ttl=cache_config.CLIENTE_CACHE_TTL
+    )
+    resposta_cache = TTLCache(
+        name="clientes",
+        maxsize=cache_config.CLIENTE_CACHE_MAXSIZE,
+        ttl=cache_config.CLIENTE_CACHE_TTL
+    )
+
     @classmethod
     async def create_cliente(cls, new_user: ClienteRequest) -> ClienteResponse:
         """Create a new cliente in the database.
@@ -49,15 +68,65 @@ class ClientesService:
         return ClienteResponse(id=new_id, **new_user.model_dump(), data_criacao=date_created)
 
     @classmethod
-    async def get_clientes(cls) -> list[ClienteResponse]:
-        """Retrieve all clientes from the database.
+    async def get_clientes(cls, limit: int, cursor: str | None) -> ClientesPage:
+        """Retrieve one page of clientes, ordered by creation date and ID.
+
+        Args:
+            limit (int): The maximum number of clientes in the page.
+            cursor (str | None): The cursor returned with the previous page.
 
         Returns:
-            list[ClienteResponse]: A list of all clientes.
+            ClientesPage: The clientes and the cursor of the next page.
         """
-        query = clientes_table.select()
-        rows = await Database.fetch_all(query)
-        return [ClienteResponse(**row) for row in rows]
+        rows, next_cursor = await cls.fetch_clientes_page(limit=limit, cursor=cursor)
+        return ClientesPage(
+            items=[ClienteResponse(**row) for row in rows],
+            next_cursor=next_cursor
+        )
+
+    @classmethod
+    async def fetch_clientes_page(cls, limit: int, cursor: str | None) -> tuple[list[dict], str | None]:
+        """Retrieve the raw rows of one page of clientes, ordered by creation date and ID.
+
+        Args:
+            limit (int): The maximum number of clientes in the page.
+            cursor (str | None): The cursor returned with the previous page.
+
+        Returns:
+            tuple[list[dict], str | None]: The cliente rows and the cursor of the next page.
+        """
+        query = KeysetPagination.paginate(
+            clientes_table.select(),
+            clientes_table.c.data_criacao,
+            clientes_table.c.id,
+            cursor=cursor,
+            limit=limit
+        )
+        return KeysetPagination.build_page(
+            await Database.fetch_all(query),
+            limit=limit,
+            time_key="data_criacao"
+        )
+
+    @classmethod
+    async def stream_clientes(cls, cursor: str | None) -> AsyncIterator[bytes]:
+        """Stream all clientes as NDJSON from a server-side cursor.
+
+        Args:
+            cursor (str | None): Start after the position of this cursor.
+
+        Yields:
+            bytes: One JSON encoded cliente per line.
+        """
+        query = KeysetPagination.paginate(
+            clientes_table.select(),
+            clientes_table.c.data_criacao,
+            clientes_table.c.id,
+            cursor=cursor,
+            limit=None
+        )
+        async for row in Database.stream(query):
+            yield encode_ndjson(row, ClienteResponse)
 
     @classmethod
     async def get_cliente_by_id(cls, cliente_id: str) -> ClienteResponse:
@@ -77,3 +146,104 @@ class ClientesService:
         if not row:
             raise ClienteNotFoundException(id=cliente_id)
         return ClienteResponse(**row)
+
+    @classmethod
+    async def get_cached_cliente(cls, cliente_id: str) -> RespostaCacheada:
+        """Retrieve the rendered cliente, using the cache.
+
+        Clientes are never updated, so the creation date is their Last-Modified.
+
+        Args:
+            cliente_id (str): The ID of the cliente to retrieve.
+
+        Returns:
+            RespostaCacheada: The cliente JSON with its ETag.
+
+        Raises:
+            ClienteNotFoundException: If no cliente with the given ID is found.
+        """
+        key = cls.__get_key(cliente_id)
+        resposta = cls.resposta_cache.get(key)
+        if resposta is None:
+            cliente = await cls.get_cliente_by_id(cliente_id)
+            resposta = cache_response(cliente, cliente.data_criacao.astimezone(timezone.utc).replace(microsecond=0))
+            cls.resposta_cache.set(key, resposta)
+        return resposta
+
+    @classmethod
+    async def get_cliente_perfil(cls, cliente_id: str) -> ClientePerfil:
+        """Retrieve the country and risk attributes of a cliente, using the cache.
+
+        Args:
+            cliente_id (str): The ID of the cliente to retrieve.
+
+        Returns:
+            ClientePerfil: The cliente country and risk level.
+
+        Raises:
+            ClienteNotFoundException: If no cliente with the given ID is found.
+        """
+        key = cls.__get_key(cliente_id)
+        perfil = cls.perfil_cache.get(key)
+        if perfil is None:
+            query = clientes_table.select().with_only_columns(
+                clientes_table.c.id,
+                clientes_table.c.pais,
+                clientes_table.c.nivel_risco
+            ).where(clientes_table.c.id == cliente_id)
+            row = await Database.fetch_one(query)
+            if not row:
+                raise ClienteNotFoundException(id=cliente_id)
+            perfil = ClientePerfil(**row)
+            cls.perfil_cache.set(key, perfil)
+        return perfil
+
+    @classmethod
+    async def get_clientes_perfis(cls, cliente_ids: set[str]) -> dict[str, ClientePerfil]:
+        """Retrieve the country and risk attributes of several clientes in one query.
+
+        Args:
+            cliente_ids (set[str]): The IDs of the clientes to retrieve.
+
+        Returns:
+            dict[str, ClientePerfil]: The found clientes keyed by the given ID.
+                Unknown or malformed IDs are left out.
+        """
+        perfis = {}
+        missing = {}
+        for cliente_id in cliente_ids:
+            try:
+                uuid = UUID(str(cliente_id))
+            except ValueError:
+                continue
+            perfil = cls.perfil_cache.get(str(uuid))
+            if perfil is not None:
+                perfis[cliente_id] = perfil
+            else:
+                missing[cliente_id] = uuid
+
+        if missing:
+            query = clientes_table.select().with_only_columns(
+                clientes_table.c.id,
+                clientes_table.c.pais,
+                clientes_table.c.nivel_risco
+            ).where(clientes_table.c.id.in_(list(set(missing.values()))))
+            rows = await Database.fetch_all(query)
+            found = {row["id"]: ClientePerfil(**row) for row in rows}
+            for cliente_id, uuid in missing.items():
+                if uuid in found:
+                    perfis[cliente_id] = found[uuid]
+                    cls.perfil_cache.set(str(uuid), found[uuid])
+        return perfis
+
+    @classmethod
+    def __get_key(cls, cliente_id: str | UUID) -> str:
+        """Get the cache key of a cliente, the canonical form of their ID.
+
+        Raises:
+            ClienteNotFoundException: If the ID is not a UUID.
+        """
+        try:
+            return str(UUID(str(cliente_id)))
+        except ValueError:
+            raise ClienteNotFoundException(id=cliente_id)
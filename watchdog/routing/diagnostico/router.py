@@ -0,0 +1,109 @@
+from uuid import UUID
+from fastapi import APIRouter, Query, status
+
+from watchdog.cache.schemas import CacheStats
+from watchdog.cache.ttl_cache import TTLCache
+from watchdog.compliance.graph import GrafoContrapartes
+from watchdog.compliance.fila import FilaComplianceService
+from watchdog.compliance.schemas import FilaMorta, FilaStats, GrafoStats, JanelaStats, RuleEngineStats, TotaisDiarios
+from watchdog.compliance.service import ComplianceService
+from watchdog.compliance.window import JanelaDeslizante
+from watchdog.compliance.worker import ComplianceWorker
+from watchdog.database.partitions import PartitionManager
+from watchdog.database.schemas import Particao
+from watchdog.routing.transacoes.enums import MoedaEnum
+
+diagnostico_router = APIRouter(prefix="/diagnostico")
+
+
+@diagnostico_router.get("/cache", status_code=status.HTTP_200_OK, response_model=dict[str, CacheStats])
+async def get_cache_stats() -> dict[str, CacheStats]:
+    """Get the hit/miss counters of the in-process caches.
+
+    Returns:
+        dict[str, CacheStats]: The counters keyed by cache name.
+    """
+    return TTLCache.get_all_stats()
+
+
+@diagnostico_router.get("/regras", status_code=status.HTTP_200_OK, response_model=RuleEngineStats)
+async def get_regras_stats() -> RuleEngineStats:
+    """Get the evaluation counters and latencies of the compliance rules.
+
+    Returns:
+        RuleEngineStats: The counters of every rule and rule dependency.
+    """
+    return ComplianceService.get_stats()
+
+
+@diagnostico_router.get("/fila", status_code=status.HTTP_200_OK, response_model=FilaStats)
+async def get_fila_stats() -> FilaStats:
+    """Get the depth and lag of the compliance queue and the worker counters.
+
+    Returns:
+        FilaStats: The queue depth, the age of its oldest entry, the dead-lettered
+            entries and the worker counters.
+    """
+    return await ComplianceWorker.get_stats()
+
+
+@diagnostico_router.get("/fila/mortas", status_code=status.HTTP_200_OK, response_model=list[FilaMorta])
+async def get_fila_mortas(limit: int = Query(100, ge=1, le=1000)) -> list[FilaMorta]:
+    """Get the compliance queue entries dead-lettered after failing every attempt.
+
+    Args:
+        limit (int): The maximum number of entries.
+
+    Returns:
+        list[FilaMorta]: The entries, oldest first, with their attempts and last error.
+    """
+    return await FilaComplianceService.get_mortas(limit)
+
+
+@diagnostico_router.get("/particoes", status_code=status.HTTP_200_OK, response_model=list[Particao])
+async def get_particoes() -> list[Particao]:
+    """Get the monthly partitions of transacoes and alertas.
+
+    Returns:
+        list[Particao]: The partitions with their month and estimated row count,
+            empty when the backend does not partition.
+    """
+    return await PartitionManager.get_particoes()
+
+
+@diagnostico_router.get("/janela", status_code=status.HTTP_200_OK, response_model=JanelaStats)
+async def get_janela_stats() -> JanelaStats:
+    """Get the configured rolling windows and the size of their in-memory state.
+
+    Returns:
+        JanelaStats: The window lengths, the bucket size and the series and buckets held.
+    """
+    return JanelaDeslizante.get_stats()
+
+
+@diagnostico_router.get(
+    "/janela/{cliente_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=dict[int, TotaisDiarios]
+)
+async def get_janela_totais(cliente_id: UUID, moeda: MoedaEnum) -> dict[int, TotaisDiarios]:
+    """Get the rolling totals of a client over every configured window.
+
+    Args:
+        cliente_id (UUID): The ID of the client.
+        moeda (MoedaEnum): The currency of the totals.
+
+    Returns:
+        dict[int, TotaisDiarios]: The totals keyed by window length in minutes.
+    """
+    return JanelaDeslizante.get_todos_totais(cliente_id, moeda)
+
+
+@diagnostico_router.get("/grafo", status_code=status.HTTP_200_OK, response_model=GrafoStats)
+async def get_grafo_stats() -> GrafoStats:
+    """Get the window and the size of the in-memory counterparty graph.
+
+    Returns:
+        GrafoStats: The window length and the nodes, edges and transactions held.
+    """
+    return GrafoContrapartes.get_stats()
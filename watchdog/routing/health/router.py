@@ -0,0 +1,30 @@
+from fastapi import APIRouter, status
+
+from watchdog.database.migrations import MigrationManager
+from watchdog.routing.health.schemas import ReadinessResponse
+
+health_router = APIRouter(prefix="/health")
+
+
+@health_router.get("/live", status_code=status.HTTP_200_OK, response_model=dict[str, str])
+async def get_liveness() -> dict[str, str]:
+    """Check that the process is serving requests, without touching the database.
+
+    Returns:
+        dict[str, str]: The process status.
+    """
+    return {"status": "ok"}
+
+
+@health_router.get("/ready", status_code=status.HTTP_200_OK, response_model=ReadinessResponse)
+async def get_readiness() -> ReadinessResponse:
+    """Check that the database is reachable and its schema at the expected version.
+
+    Returns:
+        ReadinessResponse: The status and the schema version.
+
+    Raises:
+        SchemaVersionException: If the schema is at another version.
+        DatabaseUnavailableException: If the database cannot be queried.
+    """
+    return ReadinessResponse(status="ok", versao_schema=await MigrationManager.check())
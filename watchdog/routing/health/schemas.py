@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class ReadinessResponse(BaseModel):
+
+    status: str
+    versao_schema: int
@@ -0,0 +1,152 @@
+"""In-process cache of the reports, invalidated by the writes touching their cliente.
+
+Every cliente has a version, bumped once a write of its transacoes or alertas
+commits in this process. Cached reports are keyed by the version they were
+computed at, so an invalidated report is never read again and ages out of the
+LRU. Versions come from one counter, and clientes without a version read the
+counter at the last prune: the versions can be dropped at any time, at the cost
+of some hits, so at most RELATORIO_CACHE_MAXSIZE of them are kept.
+
+Invalidation only reaches this process, so with several APP_WORKERS the cache
+is disabled, and so is the versioning: every report is computed, and its ETag
+still answers 304 when the client holds the current version.
+"""
+from uuid import UUID
+from functools import partial
+from datetime import datetime, timezone
+from typing import Hashable, Iterable
+
+from watchdog.app.settings import entry_settings
+from watchdog.cache.config import cache_config
+from watchdog.cache.schemas import RespostaCacheada
+from watchdog.cache.ttl_cache import TTLCache
+from watchdog.database.database import Database
+from watchdog.routing.relatorios.schemas import RelatorioResponse
+from watchdog.routing.responses import cache_response
+
+
+class RelatorioCache:
+
+    respostas = TTLCache(
+        name="relatorios",
+        maxsize=cache_config.RELATORIO_CACHE_MAXSIZE,
+        ttl=cache_config.RELATORIO_CACHE_TTL
+    )
+    # Every version is taken from it, so a new one is above all the older ones.
+    _contador = 0
+    # The version of the clientes written before the last prune.
+    _piso = 0
+    # One entry per cliente written since the last prune.
+    _versoes: dict[str, int] = {}
+    _modificado_em: dict[str, datetime] = {}
+    # Other workers would keep serving the reports invalidated here.
+    ativo = entry_settings.workers == 1
+
+    @classmethod
+    def get_chave(
+        cls,
+        cliente_id: str,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+        include_rows: bool
+    ) -> Hashable:
+        """Get the cache key of a report at the current version of its cliente.
+
+        Take the key before computing the report: a write committing meanwhile
+        then leaves the report under a key that is no longer read.
+
+        Args:
+            cliente_id (str): The cliente id.
+            periodo_inicio (datetime | None): The start date.
+            periodo_fim (datetime | None): The end date.
+            include_rows (bool): Whether the report lists the transacoes and alertas.
+
+        Returns:
+            Hashable: The cache key.
+        """
+        cliente = cls.__normalize(cliente_id)
+        return (cliente, cls._versoes.get(cliente, cls._piso), periodo_inicio, periodo_fim, include_rows)
+
+    @classmethod
+    def get(cls, chave: Hashable) -> RespostaCacheada | None:
+        """Get a cached report.
+
+        Args:
+            chave (Hashable): The key from get_chave.
+
+        Returns:
+            RespostaCacheada | None: The rendered report, None on a cache miss
+                or when the cache is disabled.
+        """
+        if not cls.ativo:
+            return None
+        return cls.respostas.get(chave)
+
+    @classmethod
+    def set(cls, chave: Hashable, relatorio: RelatorioResponse) -> RespostaCacheada:
+        """Render a report, caching it when the cache is enabled.
+
+        Args:
+            chave (Hashable): The key from get_chave, taken before computing the report.
+            relatorio (RelatorioResponse): The report.
+
+        Returns:
+            RespostaCacheada: The rendered report.
+        """
+        modificado_em = cls._modificado_em.get(chave[0]) or datetime.now(timezone.utc)
+        resposta = cache_response(relatorio, modificado_em.replace(microsecond=0))
+        if cls.ativo:
+            cls.respostas.set(chave, resposta)
+        return resposta
+
+    @classmethod
+    def invalidate(cls, cliente_ids: Iterable[str]) -> None:
+        """Stop serving the cached reports of some clientes.
+
+        Args:
+            cliente_ids (Iterable[str]): The clientes whose data changed.
+        """
+        if not cls.ativo:
+            return
+        if len(cls._versoes) >= cache_config.RELATORIO_CACHE_MAXSIZE:
+            cls.__prune()
+        agora = datetime.now(timezone.utc)
+        cls._contador += 1
+        for cliente in {cls.__normalize(cliente_id) for cliente_id in cliente_ids}:
+            cls._versoes[cliente] = cls._contador
+            cls._modificado_em[cliente] = agora
+
+    @classmethod
+    def invalidate_after_commit(cls, cliente_ids: Iterable[str]) -> None:
+        """Invalidate the reports of some clientes once the current unit of work commits.
+
+        Args:
+            cliente_ids (Iterable[str]): The clientes written by the unit of work.
+        """
+        Database.after_commit(partial(cls.invalidate, list(cliente_ids)))
+
+    @classmethod
+    def clear(cls) -> None:
+        """Stop serving every cached report, after a write whose clientes are not known."""
+        cls._contador += 1
+        cls.__prune()
+        cls.respostas.clear()
+
+    @classmethod
+    def __prune(cls) -> None:
+        """Drop every cliente version; all of them then read the current counter.
+
+        A report computed before the latest write of its cliente was keyed with
+        a version lower than that write's, so lower than the counter: it is
+        never read again.
+        """
+        cls._piso = cls._contador
+        cls._versoes.clear()
+        cls._modificado_em.clear()
+
+    @classmethod
+    def __normalize(cls, cliente_id) -> str:
+        try:
+            return str(UUID(str(cliente_id)))
+        except ValueError:
+            return str(cliente_id)
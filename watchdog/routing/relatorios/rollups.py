@@ -0,0 +1,316 @@
+"""Daily rollups of transacoes and alertas, read by the reports for whole days.
+
+transacoes_diarias and alertas_diarias are maintained by the write paths in the
+same database transaction as the rows they count. rollups_cobertura holds the
+first day each rollup covers; the reports read the days before it from the raw
+rows. Rebuild the rollups from the raw rows after a bulk import or a manual fix,
+which also extends their coverage back to the first rebuilt day:
+
+    python -m watchdog.routing.relatorios.rollups rebuild --desde 2025-01-01 --ate 2025-12-31
+"""
+import asyncio
+import argparse
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import ColumnElement, and_, case, cast, false, func, or_, select, text, Date
+
+from watchdog.database.config import database_config
+from watchdog.database.database import Database
+from watchdog.database.entities import (
+    alertas_diarias_table,
+    alertas_table,
+    fila_compliance_table,
+    rollups_cobertura_table,
+    transacoes_diarias_table,
+    transacoes_table
+)
+from watchdog.compliance.config import values_limit
+from watchdog.routing.alertas.enums import RegrasEnum
+from watchdog.routing.alertas.service import AlertasService
+from watchdog.routing.transacoes.enums import MoedaEnum
+from watchdog.routing.transacoes.service import TransacoesService
+
+Dias = tuple[date | None, date | None]
+
+
+class RollupsService:
+
+    @classmethod
+    async def get_totais_por_moeda(
+        cls,
+        cliente_id: str,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None
+    ) -> dict[MoedaEnum, tuple[int, float]]:
+        """Count and sum a client's transactions per currency, reading whole days from the rollup.
+
+        Only the partial days at the edges of the period, the days before the
+        rollup coverage and the transactions still waiting in the compliance
+        queue, not yet in the rollup, are read from the transacoes table.
+
+        Args:
+            cliente_id (str): The ID of the client.
+            periodo_inicio (datetime | None): Filter by start date.
+            periodo_fim (datetime | None): Filter by end date.
+
+        Returns:
+            dict[MoedaEnum, tuple[int, float]]: The number and total amount of
+                transactions for each currency with at least one transaction.
+        """
+        if periodo_inicio and periodo_fim and periodo_inicio > periodo_fim:
+            # An inverted period does not filter the transacoes.
+            periodo_inicio = periodo_fim = None
+        cobertura = await cls.get_cobertura(transacoes_diarias_table.name)
+        dias = cls.get_dias_completos(periodo_inicio, periodo_fim, cobertura)
+        if dias is None:
+            return await TransacoesService.get_totais_por_moeda(cliente_id, periodo_inicio, periodo_fim)
+
+        query = select(
+            transacoes_diarias_table.c.moeda,
+            func.sum(transacoes_diarias_table.c.quantidade).label("quantidade"),
+            func.sum(transacoes_diarias_table.c.valor_total).label("valor_total")
+        ).where(
+            transacoes_diarias_table.c.cliente_id == cliente_id,
+            cls.__dias_condition(transacoes_diarias_table.c.dia, dias)
+        ).group_by(transacoes_diarias_table.c.moeda)
+        queued = transacoes_table.c.id.in_(select(fila_compliance_table.c.transacao_id))
+
+        rows, bordas, pendentes = await asyncio.gather(
+            Database.fetch_all(query),
+            TransacoesService.get_totais_por_moeda(
+                cliente_id,
+                periodo_inicio,
+                periodo_fim,
+                condicao=cls.__bordas_condition(transacoes_table.c.data_hora, dias)
+            ),
+            TransacoesService.get_totais_por_moeda(
+                cliente_id,
+                periodo_inicio,
+                periodo_fim,
+                condicao=and_(~cls.__bordas_condition(transacoes_table.c.data_hora, dias), queued)
+            )
+        )
+        totais = {
+            MoedaEnum(row["moeda"]): (int(row["quantidade"]), float(row["valor_total"]))
+            for row in rows
+        }
+        for parcial in (bordas, pendentes):
+            for moeda, (quantidade, valor_total) in parcial.items():
+                total_quantidade, total_valor = totais.get(moeda, (0, 0.0))
+                totais[moeda] = (total_quantidade + quantidade, total_valor + valor_total)
+        return totais
+
+    @classmethod
+    async def get_quantidade_por_regra(
+        cls,
+        cliente_id: str,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None
+    ) -> dict[RegrasEnum, int]:
+        """Count a client's alertas per rule, reading whole days from the rollup.
+
+        The partial days at the edges of the period and the days before the
+        rollup coverage are read from the alertas table.
+
+        Args:
+            cliente_id (str): Filter by client ID.
+            periodo_inicio (datetime | None): Filter by start of date range.
+            periodo_fim (datetime | None): Filter by end of date range.
+
+        Returns:
+            dict[RegrasEnum, int]: The number of alertas for each rule with at least one alerta.
+        """
+        if periodo_inicio and periodo_fim and periodo_inicio > periodo_fim:
+            # An inverted period only filters the alertas by its start.
+            periodo_fim = None
+        cobertura = await cls.get_cobertura(alertas_diarias_table.name)
+        dias = cls.get_dias_completos(periodo_inicio, periodo_fim, cobertura)
+        if dias is None:
+            return await AlertasService.get_quantidade_por_regra(cliente_id, periodo_inicio, periodo_fim)
+
+        query = select(
+            alertas_diarias_table.c.regra,
+            func.sum(alertas_diarias_table.c.quantidade).label("quantidade")
+        ).where(
+            alertas_diarias_table.c.cliente_id == cliente_id,
+            cls.__dias_condition(alertas_diarias_table.c.dia, dias)
+        ).group_by(alertas_diarias_table.c.regra)
+
+        rows, bordas = await asyncio.gather(
+            Database.fetch_all(query),
+            AlertasService.get_quantidade_por_regra(
+                cliente_id,
+                periodo_inicio,
+                periodo_fim,
+                condicao=cls.__bordas_condition(alertas_table.c.data_hora, dias)
+            )
+        )
+        quantidades = {RegrasEnum(row["regra"]): int(row["quantidade"]) for row in rows}
+        for regra, quantidade in bordas.items():
+            quantidades[regra] = quantidades.get(regra, 0) + quantidade
+        return quantidades
+
+    @classmethod
+    async def get_cobertura(cls, tabela: str) -> date | None:
+        """Get the first day a rollup holds for every cliente.
+
+        Args:
+            tabela (str): The name of the rollup table.
+
+        Returns:
+            date | None: The first day covered, None if the rollup covers every day.
+        """
+        row = await Database.fetch_one(
+            select(rollups_cobertura_table.c.inicio).where(rollups_cobertura_table.c.tabela == tabela)
+        )
+        return row["inicio"] if row else None
+
+    @classmethod
+    def get_dias_completos(
+        cls,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+        cobertura: date | None = None
+    ) -> Dias | None:
+        """Get the whole days of a period, which can be read from the rollups.
+
+        Args:
+            periodo_inicio (datetime | None): The start of the period, unbounded if None.
+            periodo_fim (datetime | None): The end of the period, unbounded if None.
+            cobertura (date | None): The first day the rollup covers, None if it covers every day.
+
+        Returns:
+            Dias | None: The first whole day and the day after the last one, each
+                None when unbounded, or None if the period has no whole day.
+        """
+        primeiro = None
+        if periodo_inicio:
+            primeiro = periodo_inicio.date()
+            if periodo_inicio.time() != time.min:
+                primeiro += timedelta(days=1)
+        if cobertura and (primeiro is None or primeiro < cobertura):
+            primeiro = cobertura
+        ultimo = periodo_fim.date() if periodo_fim else None
+        if primeiro and ultimo and primeiro >= ultimo:
+            return None
+        return primeiro, ultimo
+
+    @classmethod
+    async def rebuild(cls, desde: date | None = None, ate: date | None = None) -> None:
+        """Recompute the rollups of the given days from the raw rows.
+
+        Runs in one database transaction. On Postgres the rollup tables are
+        locked against writes meanwhile, so concurrent transactions wait instead
+        of being lost. Transactions still in the compliance queue are left out,
+        since the workers add them to the totals once evaluated. When the rebuilt
+        days reach the first day covered, the coverage starts at desde.
+
+        Args:
+            desde (date | None): The first day to rebuild, unbounded if None.
+            ate (date | None): The last day to rebuild, unbounded if None.
+        """
+        dias = (desde, ate + timedelta(days=1) if ate else None)
+        async with Database.unit_of_work():
+            if database_config.backend == "postgres":
+                await Database.execute(text(
+                    "LOCK TABLE transacoes_diarias, alertas_diarias IN SHARE ROW EXCLUSIVE MODE"
+                ))
+            await Database.execute_many([
+                transacoes_diarias_table.delete().where(cls.__dias_condition(transacoes_diarias_table.c.dia, dias)),
+                alertas_diarias_table.delete().where(cls.__dias_condition(alertas_diarias_table.c.dia, dias)),
+                cls.__rebuild_transacoes_query(dias),
+                cls.__rebuild_alertas_query(dias),
+                cls.__cobertura_query(dias)
+            ])
+
+    @classmethod
+    def __cobertura_query(cls, dias: Dias):
+        primeiro, ultimo = dias
+        inicio = rollups_cobertura_table.c.inicio
+        query = rollups_cobertura_table.update().values(inicio=primeiro).where(inicio.is_not(None))
+        if primeiro:
+            query = query.where(inicio > primeiro)
+        if ultimo:
+            # The rebuilt days must reach the covered ones, without a gap.
+            query = query.where(inicio <= ultimo)
+        return query
+
+    @classmethod
+    def __rebuild_transacoes_query(cls, dias: Dias):
+        dia = cls.__dia(transacoes_table.c.data_hora).label("dia")
+        query = select(
+            transacoes_table.c.cliente_id,
+            transacoes_table.c.moeda,
+            dia,
+            func.count(),
+            func.sum(case((transacoes_table.c.valor < values_limit.MAX_LOW_AMMOUNT, 1), else_=0)),
+            func.sum(transacoes_table.c.valor)
+        ).where(
+            ~cls.__bordas_condition(transacoes_table.c.data_hora, dias),
+            transacoes_table.c.id.not_in(select(fila_compliance_table.c.transacao_id))
+        ).group_by(transacoes_table.c.cliente_id, transacoes_table.c.moeda, dia)
+        return transacoes_diarias_table.insert().from_select(
+            ["cliente_id", "moeda", "dia", "quantidade", "quantidade_baixo_valor", "valor_total"],
+            query
+        )
+
+    @classmethod
+    def __rebuild_alertas_query(cls, dias: Dias):
+        dia = cls.__dia(alertas_table.c.data_hora).label("dia")
+        query = select(
+            alertas_table.c.cliente_id,
+            dia,
+            alertas_table.c.regra,
+            alertas_table.c.severidade,
+            func.count()
+        ).where(
+            ~cls.__bordas_condition(alertas_table.c.data_hora, dias)
+        ).group_by(alertas_table.c.cliente_id, dia, alertas_table.c.regra, alertas_table.c.severidade)
+        return alertas_diarias_table.insert().from_select(
+            ["cliente_id", "dia", "regra", "severidade", "quantidade"],
+            query
+        )
+
+    @classmethod
+    def __dias_condition(cls, column, dias: Dias) -> ColumnElement[bool]:
+        """Match the rollup rows of the whole days."""
+        primeiro, ultimo = dias
+        conditions = []
+        if primeiro:
+            conditions.append(column >= primeiro)
+        if ultimo:
+            conditions.append(column < ultimo)
+        return and_(True, *conditions)
+
+    @classmethod
+    def __bordas_condition(cls, column, dias: Dias) -> ColumnElement[bool]:
+        """Match the raw rows outside the whole days."""
+        primeiro, ultimo = dias
+        conditions = []
+        if primeiro:
+            conditions.append(column < datetime.combine(primeiro, time.min))
+        if ultimo:
+            conditions.append(column >= datetime.combine(ultimo, time.min))
+        return or_(false(), *conditions)
+
+    @classmethod
+    def __dia(cls, column):
+        """The day of a timestamp column, as stored in the rollup dia columns."""
+        if database_config.backend == "sqlite":
+            # SQLite stores dates as ISO text; CAST AS DATE would yield a number.
+            return func.date(column)
+        return cast(column, Date)
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        await RollupsService.rebuild(args.desde, args.ate)
+    finally:
+        await Database.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the daily transacoes and alertas rollups.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--desde", type=date.fromisoformat, default=None, help="First day, YYYY-MM-DD.")
+    parser.add_argument("--ate", type=date.fromisoformat, default=None, help="Last day, YYYY-MM-DD.")
+    asyncio.run(main(parser.parse_args()))
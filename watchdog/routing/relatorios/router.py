@@ -1,6 +1,8 @@
 from datetime import datetime
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Header, status
+from fastapi.responses import Response
 
+from watchdog.routing.responses import conditional_response
 from watchdog.routing.relatorios.schemas import RelatorioResponse
 from watchdog.routing.relatorios.service import RelatorioService
 
@@ -12,15 +14,24 @@ async def get_relatorio(
     cliente_id: str,
     periodo_inicio: datetime | None = None,
     periodo_fim: datetime | None = None,
-) -> RelatorioResponse:
+    include_rows: bool = True,
+    if_none_match: str | None = Header(None, alias="If-None-Match"),
+) -> Response:
     """Get the report for the given cliente and period.
 
+    With a single worker, reports are cached until a write touches the cliente.
+    The response carries an ETag: sending it back in If-None-Match gets a 304,
+    without a database query while the cached report is current.
+
     Args:
         cliente_id (str): The cliente id.
         periodo_inicio (datetime | None): The start date.
         periodo_fim (datetime | None): The end date.
+        include_rows (bool): Include the transacoes and alertas lists, not only the totals.
+        if_none_match (str | None): The ETags of the reports held by the client.
 
     Returns:
-        RelatorioResponse: The final report.
+        Response: The final report, or 304 Not Modified.
     """
-    return await RelatorioService.get_report(cliente_id, periodo_inicio, periodo_fim)
+    resposta = await RelatorioService.get_cached_report(cliente_id, periodo_inicio, periodo_fim, include_rows)
+    return conditional_response(resposta, if_none_match)
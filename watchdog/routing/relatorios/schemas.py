@@ -20,7 +20,7 @@ class TransacaoRelatorio(BaseModel):
 class TransacoesInfo(BaseModel):
 
     numero_transacoes: int
-    transacoes: list[TransacaoRelatorio]
+    transacoes: list[TransacaoRelatorio] | None = None
     valor_usd: float
     valor_eur: float
     valor_brl: float
@@ -39,7 +39,8 @@ class AlertaRelatorio(BaseModel):
 class AlertasInfo(BaseModel):
     
     numero_alertas: int
-    alertas: list[AlertaRelatorio]
+    alertas: list[AlertaRelatorio] | None = None
+    por_regra: dict[RegrasEnum, int]
     limite_diario: int
     fracionamento: int
     paises_suspeitos: int
@@ -1,13 +1,17 @@
+import asyncio
 from datetime import datetime
 
+from watchdog.cache.schemas import RespostaCacheada
+from watchdog.compliance.service import ComplianceService
+from watchdog.database.database import Database
 from watchdog.routing.alertas.enums import RegrasEnum
-from watchdog.routing.alertas.schemas import AlertaResponse
 from watchdog.routing.alertas.service import AlertasService
 from watchdog.routing.clientes.service import ClientesService
 from watchdog.routing.clientes.schemas import ClienteResponse
 from watchdog.routing.transacoes.enums import MoedaEnum
-from watchdog.routing.transacoes.schemas import TransacaoResponse
 from watchdog.routing.transacoes.service import TransacoesService
+from watchdog.routing.relatorios.cache import RelatorioCache
+from watchdog.routing.relatorios.rollups import RollupsService
 from watchdog.routing.relatorios.schemas import (
     AlertaRelatorio,
     AlertasInfo,
@@ -24,28 +28,37 @@ class RelatorioService:
         cls,
         cliente_id: str,
         periodo_inicio: datetime | None,
-        periodo_fim: datetime | None
+        periodo_fim: datetime | None,
+        include_rows: bool = True
     ) -> RelatorioResponse:
         """Get the report for the given cliente and period.
 
+        The cliente, transacoes and alertas queries are independent and run
+        concurrently, each on its own connection.
+
         Args:
             cliente_id (str): The cliente id.
             periodo_inicio (datetime | None): The start date.
             periodo_fim (datetime | None): The end date.
+            include_rows (bool): Whether to list the transacoes and alertas.
 
         Returns:
             RelatorioResponse: The final report.
         """
-        cliente_info = await cls.get_cliente_info(cliente_id)
-        transacoes_info = await cls.get_transacoes_info(
-            cliente_id,
-            periodo_inicio,
-            periodo_fim
-        )
-        alertas_info = await cls.get_alertas_info(
-            cliente_id,
-            periodo_inicio,
-            periodo_fim
+        cliente_info, transacoes_info, alertas_info = await asyncio.gather(
+            cls.get_cliente_info(cliente_id),
+            cls.get_transacoes_info(
+                cliente_id,
+                periodo_inicio,
+                periodo_fim,
+                include_rows
+            ),
+            cls.get_alertas_info(
+                cliente_id,
+                periodo_inicio,
+                periodo_fim,
+                include_rows
+            )
         )
         return RelatorioResponse(
             cliente_id=cliente_info.id,
@@ -58,6 +71,32 @@ class RelatorioService:
             alertas_info=alertas_info
         )
 
+    @classmethod
+    async def get_cached_report(
+        cls,
+        cliente_id: str,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+        include_rows: bool = True
+    ) -> RespostaCacheada:
+        """Get the rendered report for the given cliente and period, from the cache if current.
+
+        Args:
+            cliente_id (str): The cliente id.
+            periodo_inicio (datetime | None): The start date.
+            periodo_fim (datetime | None): The end date.
+            include_rows (bool): Whether to list the transacoes and alertas.
+
+        Returns:
+            RespostaCacheada: The report JSON with its ETag.
+        """
+        chave = RelatorioCache.get_chave(cliente_id, periodo_inicio, periodo_fim, include_rows)
+        resposta = RelatorioCache.get(chave)
+        if resposta is None:
+            relatorio = await cls.get_report(cliente_id, periodo_inicio, periodo_fim, include_rows)
+            resposta = RelatorioCache.set(chave, relatorio)
+        return resposta
+
     @classmethod
     async def get_cliente_info(cls, cliente_id: str) -> ClienteResponse:
         """Get the cliente info.
@@ -75,122 +114,129 @@ class RelatorioService:
         cls,
         cliente_id: str,
         periodo_inicio: datetime | None,
-        periodo_fim: datetime | None
+        periodo_fim: datetime | None,
+        include_rows: bool = True
     ) -> TransacoesInfo:
         """Get the transacoes info for the given cliente and period.
 
+        The totals of whole days are read from the daily rollup.
+
         Args:
             cliente_id (str): The cliente id.
             periodo_inicio (datetime | None): The start date.
             periodo_fim (datetime | None): The end date.
+            include_rows (bool): Whether to list the transacoes.
 
         Returns:
             TransacoesInfo: The transacoes info.
         """
-        rows = await TransacoesService.get_filtered_transactions(
-            cliente_id=cliente_id,
-            moeda=None,
-            tipo=None,
-            periodo_inicio=periodo_inicio,
-            periodo_fim=periodo_fim
+        totais, transacoes = await asyncio.gather(
+            RollupsService.get_totais_por_moeda(cliente_id, periodo_inicio, periodo_fim),
+            cls.__get_transacoes_relatorio(cliente_id, periodo_inicio, periodo_fim, include_rows)
         )
-
-        numero_transacoes = len(rows)
-        transacoes = []
-        valores = {
-            MoedaEnum.USD.value: 0,
-            MoedaEnum.EUR.value: 0,
-            MoedaEnum.BRL.value: 0
-        }
-
-        for row in rows:
-            valores[row.moeda.value] += row.valor
-            transacoes.append(await cls.__get_transacao_relatorio(row))
-
         return TransacoesInfo(
-            numero_transacoes=numero_transacoes,
+            numero_transacoes=sum(quantidade for quantidade, _ in totais.values()),
             transacoes=transacoes,
-            valor_usd=valores.get(MoedaEnum.USD.value),
-            valor_eur=valores.get(MoedaEnum.EUR.value),
-            valor_brl=valores.get(MoedaEnum.BRL.value)
+            valor_usd=totais.get(MoedaEnum.USD, (0, 0))[1],
+            valor_eur=totais.get(MoedaEnum.EUR, (0, 0))[1],
+            valor_brl=totais.get(MoedaEnum.BRL, (0, 0))[1]
         )
-    
+
     @classmethod
     async def get_alertas_info(
         cls,
         cliente_id: str,
         periodo_inicio: datetime | None,
-        periodo_fim: datetime | None
+        periodo_fim: datetime | None,
+        include_rows: bool = True
     ) -> AlertasInfo:
         """Get the alertas info for the given cliente and period.
 
+        The counts of whole days are read from the daily rollup.
+
         Args:
             cliente_id (str): The cliente id.
             periodo_inicio (datetime | None): The start date.
             periodo_fim (datetime | None): The end date.
+            include_rows (bool): Whether to list the alertas.
 
         Returns:
             AlertasInfo: The alertas info.
         """
-        rows = await AlertasService.get_filtered_alertas(
-            cliente_id=cliente_id,
-            regra=None,
-            severidade=None,
-            status=None,
-            periodo_inicio=periodo_inicio,
-            periodo_fim=periodo_fim
+        regras_qtd, alertas = await asyncio.gather(
+            RollupsService.get_quantidade_por_regra(cliente_id, periodo_inicio, periodo_fim),
+            cls.__get_alertas_relatorio(cliente_id, periodo_inicio, periodo_fim, include_rows)
         )
-
-        numero_alertas = len(rows)
-        alertas = []
-        regras_qtd = {
-            RegrasEnum.LIMITE_DIARIO.value: 0,
-            RegrasEnum.TRANSACOES_REPETIDAS.value: 0,
-            RegrasEnum.PAISES_SUSPEITOS.value: 0
-        }
-
-        for row in rows:
-            regras_qtd[row.regra.value] += 1
-            alertas.append(await cls.__get_alerta_relatorio(row))
-
+        por_regra = {regra: regras_qtd.get(regra, 0) for regra in ComplianceService.get_regras()}
+        por_regra.update(regras_qtd)
         return AlertasInfo(
-            numero_alertas=numero_alertas,
+            numero_alertas=sum(regras_qtd.values()),
             alertas=alertas,
-            limite_diario=regras_qtd.get(RegrasEnum.LIMITE_DIARIO.value),
-            fracionamento=regras_qtd.get(RegrasEnum.TRANSACOES_REPETIDAS.value),
-            paises_suspeitos=regras_qtd.get(RegrasEnum.PAISES_SUSPEITOS.value)
+            por_regra=por_regra,
+            limite_diario=regras_qtd.get(RegrasEnum.LIMITE_DIARIO, 0),
+            fracionamento=regras_qtd.get(RegrasEnum.TRANSACOES_REPETIDAS, 0),
+            paises_suspeitos=regras_qtd.get(RegrasEnum.PAISES_SUSPEITOS, 0)
         )
 
     @classmethod
-    async def __get_transacao_relatorio(
+    async def __get_transacoes_relatorio(
         cls,
-        transacao: TransacaoResponse
-    ) -> TransacaoRelatorio:
-        """Convert TransacaoResponse to TransacaoRelatorio
+        cliente_id: str,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+        include_rows: bool
+    ) -> list[TransacaoRelatorio] | None:
+        """Get the transacoes of the report straight from the database rows.
 
         Args:
-            transacao (TransacaoResponse): Transacao to be converted.
+            cliente_id (str): The cliente id.
+            periodo_inicio (datetime | None): The start date.
+            periodo_fim (datetime | None): The end date.
+            include_rows (bool): Whether to list the transacoes.
 
         Returns:
-            TransacaoRelatorio: The transacao converted for the report.
+            list[TransacaoRelatorio] | None: The transacoes, or None if not requested.
         """
-        dump = transacao.model_dump()
-        del dump["cliente_id"]
-        return TransacaoRelatorio(**dump)
+        if not include_rows:
+            return None
+        query = await TransacoesService.prepare_filter_query(
+            cliente_id=cliente_id,
+            moeda=None,
+            tipo=None,
+            periodo_inicio=periodo_inicio,
+            periodo_fim=periodo_fim
+        )
+        rows = await Database.fetch_all(query)
+        return [TransacaoRelatorio(**row) for row in rows]
 
     @classmethod
-    async def __get_alerta_relatorio(
+    async def __get_alertas_relatorio(
         cls,
-        alerta: AlertaResponse
-    ) -> AlertaRelatorio:
-        """Convert AlertaResponse to AlertaRelatorio
+        cliente_id: str,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+        include_rows: bool
+    ) -> list[AlertaRelatorio] | None:
+        """Get the alertas of the report straight from the database rows.
 
         Args:
-            alerta (AlertaResponse): Alerta to be converted.
+            cliente_id (str): The cliente id.
+            periodo_inicio (datetime | None): The start date.
+            periodo_fim (datetime | None): The end date.
+            include_rows (bool): Whether to list the alertas.
 
         Returns:
-            AlertaRelatorio: The alerta converted for the report.
+            list[AlertaRelatorio] | None: The alertas, or None if not requested.
         """
-        dump = alerta.model_dump()
-        del dump["cliente_id"]
-        return AlertaRelatorio(**dump)
+        if not include_rows:
+            return None
+        query = await AlertasService.prepare_filter_query(
+            cliente_id=cliente_id,
+            regra=None,
+            severidade=None,
+            status=None,
+            periodo_inicio=periodo_inicio,
+            periodo_fim=periodo_fim
+        )
+        rows = await Database.fetch_all(query)
+        return [AlertaRelatorio(**row) for row in rows]
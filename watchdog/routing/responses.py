@@ -0,0 +1,138 @@
+import json
+from enum import Enum
+from uuid import UUID
+from hashlib import blake2b
+from decimal import Decimal
+from datetime import date, datetime
+from email.utils import format_datetime
+from typing import Any, Mapping
+from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response
+
+from watchdog.app.settings import entry_settings
+from watchdog.cache.schemas import RespostaCacheada
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Convert the values the JSON encoders do not handle natively.
+
+    Args:
+        value (Any): A value found in a database row.
+
+    Returns:
+        Any: A JSON serializable equivalent, matching what the response models produce.
+
+    Raises:
+        TypeError: If the value has no JSON representation.
+    """
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, UUID):
+        # asyncpg returns its own UUID subclass, which orjson does not recognize.
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize database rows, or containers of them, straight to JSON bytes.
+
+    Args:
+        content (Any): The content, typically a page dict holding RowMapping items.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+
+def encode_ndjson(row: Mapping, model: type[BaseModel]) -> bytes:
+    """Encode one row of an NDJSON stream.
+
+    Args:
+        row (Mapping): The database row.
+        model (type[BaseModel]): The response model used when APP_FAST_JSON is off.
+
+    Returns:
+        bytes: The JSON encoded row followed by a newline.
+    """
+    if entry_settings.APP_FAST_JSON:
+        return dumps(row) + b"\n"
+    return model(**row).model_dump_json().encode() + b"\n"
+
+
+class RowsJSONResponse(JSONResponse):
+    """JSON response rendering database rows without building response models.
+
+    Returning it from an endpoint bypasses the response_model validation, which
+    is still declared on the route for the OpenAPI schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def page_response(rows: list[Mapping], next_cursor: str | None) -> RowsJSONResponse:
+    """Build a paginated response from the rows of a keyset page.
+
+    Args:
+        rows (list[Mapping]): The page rows.
+        next_cursor (str | None): The cursor of the next page.
+
+    Returns:
+        RowsJSONResponse: The page, shaped like the *Page response models.
+    """
+    return RowsJSONResponse({"items": rows, "next_cursor": next_cursor})
+
+
+def cache_response(content: BaseModel, modificado_em: datetime) -> RespostaCacheada:
+    """Render a response model once, for a cache serving it with conditional requests.
+
+    Args:
+        content (BaseModel): The response model.
+        modificado_em (datetime): The time of the last change of the content, in UTC.
+
+    Returns:
+        RespostaCacheada: The JSON body and its ETag, a hash of the body.
+    """
+    conteudo = content.model_dump_json().encode()
+    return RespostaCacheada(
+        conteudo=conteudo,
+        etag=f'"{blake2b(conteudo, digest_size=16).hexdigest()}"',
+        modificado_em=modificado_em
+    )
+
+
+def conditional_response(resposta: RespostaCacheada, if_none_match: str | None) -> Response:
+    """Send a cached response, or 304 Not Modified when the client already holds it.
+
+    Args:
+        resposta (RespostaCacheada): The cached response.
+        if_none_match (str | None): The If-None-Match header of the request.
+
+    Returns:
+        Response: The JSON body, or an empty 304, with the ETag and Last-Modified headers.
+    """
+    headers = {
+        "ETag": resposta.etag,
+        "Last-Modified": format_datetime(resposta.modificado_em, usegmt=True),
+        # Clients may keep the response but must revalidate it before each use.
+        "Cache-Control": "no-cache"
+    }
+    if if_none_match:
+        etags = {etag.strip().removeprefix("W/") for etag in if_none_match.split(",")}
+        if "*" in etags or resposta.etag in etags:
+            return Response(status_code=304, headers=headers)
+    return Response(resposta.conteudo, media_type="application/json", headers=headers)
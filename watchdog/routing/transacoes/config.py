@@ -0,0 +1,10 @@
+from pydantic_settings import BaseSettings
+
+
+class TransacoesConfig(BaseSettings):
+
+    TRANSACOES_BATCH_MAX_SIZE: int = 10000
+    TRANSACOES_IDEMPOTENCY_TTL: int = 86400
+
+
+transacoes_config = TransacoesConfig()
@@ -7,3 +7,15 @@ class TransactionNotFoundException(BaseCustomException):
     
     STATUS_CODE = status.HTTP_404_NOT_FOUND
     DETAIL = "Transaction with ID '{transaction_id}' not found."
+
+
+class TransactionBatchTooLargeException(BaseCustomException):
+
+    STATUS_CODE = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    DETAIL = "Transaction batch has {size} items, the maximum is {max_size}."
+
+
+class IdempotencyKeyReusedException(BaseCustomException):
+
+    STATUS_CODE = status.HTTP_422_UNPROCESSABLE_ENTITY
+    DETAIL = "Idempotency key '{chave}' was already used with a different request."
@@ -0,0 +1,185 @@
+"""Idempotency-Key handling of POST /api/transacoes.
+
+A key is claimed in the same database transaction as the transaction it
+creates, so a retry after a lost response replays the stored response instead
+of creating the transaction, and its alertas, a second time. Expired keys are
+reused on their next claim; purge them in bulk from a scheduled job:
+
+    python -m watchdog.routing.transacoes.idempotencia purge
+"""
+import asyncio
+import argparse
+from hashlib import sha256
+from functools import partial
+from datetime import datetime, timedelta
+from sqlalchemy import select
+
+from watchdog.cache.config import cache_config
+from watchdog.cache.ttl_cache import TTLCache
+from watchdog.database.database import Database
+from watchdog.database.entities import chaves_idempotencia_table
+from watchdog.routing.transacoes.config import transacoes_config
+from watchdog.routing.transacoes.exceptions import IdempotencyKeyReusedException
+from watchdog.routing.transacoes.schemas import TransancaoRequest, TransacaoResponse
+
+# Expired keys deleted per statement by purge.
+PURGE_BATCH_SIZE = 10000
+
+
+class IdempotenciaService:
+
+    # A key never outlives its row: a cached response is only replayed while
+    # the key it was stored under is still valid.
+    resposta_cache = TTLCache(
+        name="idempotencia",
+        maxsize=cache_config.IDEMPOTENCY_CACHE_MAXSIZE,
+        ttl=min(cache_config.IDEMPOTENCY_CACHE_TTL, transacoes_config.TRANSACOES_IDEMPOTENCY_TTL)
+    )
+
+    @classmethod
+    def get_hash_requisicao(cls, new_transacao: TransancaoRequest) -> str:
+        """Get the fingerprint of a request, compared on replay.
+
+        Args:
+            new_transacao (TransancaoRequest): The transaction data.
+
+        Returns:
+            str: The hex SHA-256 of the request JSON.
+        """
+        return sha256(new_transacao.model_dump_json().encode()).hexdigest()
+
+    @classmethod
+    def get_cached(cls, chave: str, hash_requisicao: str) -> TransacaoResponse | None:
+        """Get the response stored for a key from the in-process cache.
+
+        Args:
+            chave (str): The Idempotency-Key.
+            hash_requisicao (str): The fingerprint of the request.
+
+        Returns:
+            TransacaoResponse | None: The stored response, None on a cache miss.
+
+        Raises:
+            IdempotencyKeyReusedException: If the key was used for another request.
+        """
+        entry = cls.resposta_cache.get(chave)
+        if entry is None:
+            return None
+        return cls.__check(chave, hash_requisicao, *entry)
+
+    @classmethod
+    async def claim(cls, chave: str, hash_requisicao: str) -> TransacaoResponse | None:
+        """Claim a key for the current unit of work, or get the response stored for it.
+
+        The key row is written first, so on Postgres a concurrent request with
+        the same key waits on it until this transaction ends, then replays its
+        response. An expired key is taken over as a new one.
+
+        Args:
+            chave (str): The Idempotency-Key.
+            hash_requisicao (str): The fingerprint of the request.
+
+        Returns:
+            TransacaoResponse | None: None if the key was claimed, else the
+                response stored for it.
+
+        Raises:
+            IdempotencyKeyReusedException: If the key was used for another request.
+        """
+        agora = datetime.now()
+        query = Database.insert(chaves_idempotencia_table).values(
+            chave=chave,
+            hash_requisicao=hash_requisicao,
+            criada_em=agora,
+            expira_em=agora + timedelta(seconds=transacoes_config.TRANSACOES_IDEMPOTENCY_TTL)
+        )
+        query = query.on_conflict_do_update(
+            index_elements=[chaves_idempotencia_table.c.chave],
+            set_={
+                "hash_requisicao": query.excluded.hash_requisicao,
+                "transacao_id": None,
+                "resposta": None,
+                "criada_em": query.excluded.criada_em,
+                "expira_em": query.excluded.expira_em
+            },
+            where=chaves_idempotencia_table.c.expira_em <= agora
+        ).returning(chaves_idempotencia_table.c.chave)
+        if await Database.fetch_one(query):
+            return None
+
+        row = await Database.fetch_one(
+            select(chaves_idempotencia_table.c.hash_requisicao, chaves_idempotencia_table.c.resposta)
+            .where(chaves_idempotencia_table.c.chave == chave)
+        )
+        resposta = TransacaoResponse.model_validate_json(row["resposta"])
+        cls.resposta_cache.set(chave, (row["hash_requisicao"], resposta))
+        return cls.__check(chave, hash_requisicao, row["hash_requisicao"], resposta)
+
+    @classmethod
+    async def complete(cls, chave: str, hash_requisicao: str, resposta: TransacaoResponse) -> None:
+        """Store the response of a claimed key, cached once the unit of work commits.
+
+        Args:
+            chave (str): The Idempotency-Key claimed by claim.
+            hash_requisicao (str): The fingerprint of the request.
+            resposta (TransacaoResponse): The response of the created transaction.
+        """
+        await Database.execute(
+            chaves_idempotencia_table.update()
+            .where(chaves_idempotencia_table.c.chave == chave)
+            .values(transacao_id=resposta.id, resposta=resposta.model_dump_json())
+        )
+        Database.after_commit(partial(cls.resposta_cache.set, chave, (hash_requisicao, resposta)))
+
+    @classmethod
+    async def purge(cls) -> int:
+        """Delete the expired keys, in batches of PURGE_BATCH_SIZE.
+
+        Each batch is its own database transaction, so the purge never holds
+        locks on the whole table.
+
+        Returns:
+            int: The number of keys deleted.
+        """
+        agora = datetime.now()
+        total = 0
+        while True:
+            expiradas = (
+                select(chaves_idempotencia_table.c.chave)
+                .where(chaves_idempotencia_table.c.expira_em <= agora)
+                .limit(PURGE_BATCH_SIZE)
+            )
+            async with Database.unit_of_work():
+                removidas = await Database.fetch_all(
+                    chaves_idempotencia_table.delete()
+                    .where(chaves_idempotencia_table.c.chave.in_(expiradas))
+                    .returning(chaves_idempotencia_table.c.chave)
+                )
+            total += len(removidas)
+            if len(removidas) < PURGE_BATCH_SIZE:
+                return total
+
+    @classmethod
+    def __check(
+        cls,
+        chave: str,
+        hash_requisicao: str,
+        hash_armazenado: str,
+        resposta: TransacaoResponse
+    ) -> TransacaoResponse:
+        if hash_requisicao != hash_armazenado:
+            raise IdempotencyKeyReusedException(chave=chave)
+        return resposta
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        print(f"{await IdempotenciaService.purge()} expired idempotency keys deleted")
+    finally:
+        await Database.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete the expired idempotency keys.")
+    parser.add_argument("command", choices=["purge"])
+    asyncio.run(main(parser.parse_args()))
@@ -1,8 +1,16 @@
 from datetime import datetime
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Header, Query, status
+from fastapi.responses import Response, StreamingResponse
+
+from watchdog.database.dependencies import UnitOfWork
+from watchdog.app.settings import entry_settings
+from watchdog.database.pagination import DEFAULT_LIMIT, MAX_LIMIT
+from watchdog.routing.responses import page_response
 
 from watchdog.routing.transacoes.enums import TipoTransacaoEnum, MoedaEnum
 from watchdog.routing.transacoes.schemas import (
+    TransacaoBatchItemResponse,
+    TransacoesPage,
     TransancaoRequest,
     TransacaoResponse
 )
@@ -12,17 +20,52 @@ from watchdog.routing.transacoes.service import TransacoesService
 transacoes_router = APIRouter(prefix="/transacoes")
 
 
-@transacoes_router.post("/", status_code=status.HTTP_201_CREATED, response_model=TransacaoResponse)
-async def create(transacao: TransancaoRequest) -> TransacaoResponse:
+@transacoes_router.post(
+    "/",
+    status_code=status.HTTP_201_CREATED,
+    response_model=TransacaoResponse,
+    dependencies=[UnitOfWork]
+)
+async def create(
+    transacao: TransancaoRequest,
+    response: Response,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", min_length=1, max_length=255)
+) -> TransacaoResponse:
     """Create a new transaction.
 
     Args:
         transacao (TransancaoRequest): Transaction data.
+        response (Response): The response, flagged with Idempotent-Replayed on a replay.
+        idempotency_key (str | None, optional): Retrying with the same key replays
+            the first response instead of creating the transaction again. Defaults to None.
 
     Returns:
         TransacaoResponse: Created transaction details.
     """
-    return await TransacoesService.create(transacao)
+    if idempotency_key is None:
+        return await TransacoesService.create(transacao)
+    transacao, replayed = await TransacoesService.create_idempotent(transacao, idempotency_key)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return transacao
+
+
+@transacoes_router.post(
+    "/batch",
+    status_code=status.HTTP_201_CREATED,
+    response_model=list[TransacaoBatchItemResponse],
+    dependencies=[UnitOfWork]
+)
+async def create_batch(transacoes: list[TransancaoRequest]) -> list[TransacaoBatchItemResponse]:
+    """Create a batch of transactions.
+
+    Args:
+        transacoes (list[TransancaoRequest]): Transactions data, in processing order.
+
+    Returns:
+        list[TransacaoBatchItemResponse]: Result of each transaction, in request order.
+    """
+    return await TransacoesService.create_batch(transacoes)
 
 
 @transacoes_router.get("/by-id", status_code=status.HTTP_200_OK, response_model=TransacaoResponse)
@@ -38,15 +81,18 @@ async def get_by_id(id: str) -> TransacaoResponse:
     return await TransacoesService.get_transaction(id)
 
 
-@transacoes_router.get("/filter", status_code=status.HTTP_200_OK, response_model=list[TransacaoResponse])
+@transacoes_router.get("/filter", status_code=status.HTTP_200_OK, response_model=TransacoesPage)
 async def get_by_filter(
     cliente_id: str | None = None,
     moeda: MoedaEnum | None = None,
     tipo: TipoTransacaoEnum | None = None,
     periodo_inicio: datetime | None = None,
     periodo_fim: datetime | None = None,
-) -> list[TransacaoResponse]:
-    """Retrieve transactions based on filters.
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str | None = None,
+    stream: bool = False,
+) -> TransacoesPage | Response:
+    """Retrieve transactions based on filters, ordered by date.
 
     Args:
         cliente_id (str | None, optional): Client ID filter. Defaults to None.
@@ -54,14 +100,28 @@ async def get_by_filter(
         tipo (TipoTransacaoEnum | None, optional): Transaction type filter. Defaults to None
         periodo_inicio (datetime | None, optional): Start date filter. Defaults to None.
         periodo_fim (datetime | None, optional): End date filter. Defaults to None.
+        limit (int, optional): Page size. Defaults to DEFAULT_LIMIT.
+        cursor (str | None, optional): The next_cursor of the previous page. Defaults to None.
+        stream (bool, optional): Stream every matching transaction as NDJSON,
+            ignoring limit. Defaults to False.
 
     Returns:
-        list[TransacaoResponse]: List of transactions matching the filters.
+        TransacoesPage | Response: A page of transactions matching the filters,
+            rendered straight from the rows when APP_FAST_JSON is set, or the
+            NDJSON stream of all of them.
     """
-    return await TransacoesService.get_filtered_transactions(
+    filters = dict(
         cliente_id=cliente_id,
         moeda=moeda,
         tipo=tipo,
         periodo_inicio=periodo_inicio,
         periodo_fim=periodo_fim
     )
+    if stream:
+        return StreamingResponse(
+            TransacoesService.stream_transactions(**filters, cursor=cursor),
+            media_type="application/x-ndjson"
+        )
+    if entry_settings.APP_FAST_JSON:
+        return page_response(*await TransacoesService.fetch_transactions_page(**filters, limit=limit, cursor=cursor))
+    return await TransacoesService.get_transactions_page(**filters, limit=limit, cursor=cursor)
@@ -2,6 +2,7 @@ from uuid import UUID
 from datetime import datetime
 from pydantic import BaseModel
 
+from watchdog.routing.alertas.enums import RegrasEnum
 from watchdog.routing.transacoes.enums import TipoTransacaoEnum, MoedaEnum
 
 
@@ -23,3 +24,17 @@ class TransacaoResponse(BaseModel):
     moeda: MoedaEnum
     contraparte: UUID | None
     data_hora: datetime
+
+
+class TransacaoBatchItemResponse(BaseModel):
+
+    indice: int
+    transacao: TransacaoResponse | None = None
+    regras: list[RegrasEnum] = []
+    erro: str | None = None
+
+
+class TransacoesPage(BaseModel):
+
+    items: list[TransacaoResponse]
+    next_cursor: str | None
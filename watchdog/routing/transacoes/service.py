@@ -1,18 +1,34 @@
 from uuid import uuid4
-from datetime import datetime, time
+from typing import AsyncIterator
+from datetime import datetime
+from sqlalchemy import ColumnElement, Select, func
 
 from watchdog.database.database import Database
 from watchdog.database.entities import transacoes_table
+from watchdog.database.pagination import KeysetPagination
+from watchdog.compliance.config import fila_config
+from watchdog.compliance.fila import FilaComplianceService
+from watchdog.compliance.locks import ClienteLocks
 from watchdog.compliance.service import ComplianceService
-from watchdog.routing.alertas.enums import (
-    StatusEnum,
-    SEVERIDADE_ENUM_MAP
-)
+from watchdog.compliance.schemas import ContextoTransacao
+from watchdog.compliance.totais import TotaisDiariosService
+from watchdog.routing.alertas.enums import RegrasEnum, StatusEnum
 from watchdog.routing.alertas.schemas import AlertaRequest
 from watchdog.routing.alertas.service import AlertasService
+from watchdog.routing.clientes.exceptions import ClienteNotFoundException
+from watchdog.routing.clientes.service import ClientesService
+from watchdog.routing.relatorios.cache import RelatorioCache
+from watchdog.routing.responses import encode_ndjson
+from watchdog.routing.transacoes.config import transacoes_config
 from watchdog.routing.transacoes.enums import TipoTransacaoEnum, MoedaEnum
-from watchdog.routing.transacoes.exceptions import TransactionNotFoundException
+from watchdog.routing.transacoes.exceptions import (
+    TransactionBatchTooLargeException,
+    TransactionNotFoundException
+)
+from watchdog.routing.transacoes.idempotencia import IdempotenciaService
 from watchdog.routing.transacoes.schemas import (
+    TransacaoBatchItemResponse,
+    TransacoesPage,
     TransancaoRequest,
     TransacaoResponse
 )
@@ -22,6 +38,11 @@ class TransacoesService:
     @classmethod
     async def create(cls, new_transacao: TransancaoRequest) -> TransacaoResponse:
         """Create a new transaction in the database.
+
+        The cliente is locked from the read of its totals until the commit, so
+        concurrent transactions of one cliente are evaluated one after the other.
+        With COMPLIANCE_ASYNC the transaction is committed with a queue entry and
+        the compliance workers create its alertas later.
         
         Args:
             new_transacao (TransancaoRequest): The transaction data to be created.
@@ -41,18 +62,176 @@ class TransacoesService:
             contraparte = new_transacao.contraparte,
             data_hora = date_created
         )
-        query_list = await cls.get_alertas_querys(
-            transacao_id=str(new_id),
-            cliente_id=new_transacao.cliente_id,
-            contraparte=new_transacao.contraparte,
-            valor=new_transacao.valor,
-            moeda=new_transacao.moeda
-        )
-        query_list.insert(0, query)
+        if fila_config.COMPLIANCE_ASYNC:
+            if new_transacao.contraparte:
+                # Same 404 as the synchronous path, usually answered by the cache.
+                await ClientesService.get_cliente_perfil(new_transacao.contraparte)
+            await Database.execute_many([
+                query,
+                *FilaComplianceService.prepare_enqueue_querys([{"id": new_id, "data_hora": date_created}])
+            ])
+            Database.after_commit(FilaComplianceService.notify)
+            RelatorioCache.invalidate_after_commit([new_transacao.cliente_id])
+            return TransacaoResponse(id=new_id, **new_transacao.model_dump(), data_hora=date_created)
 
-        await Database.execute_many(query_list)
+        async with Database.unit_of_work():
+            await ClienteLocks.acquire([new_transacao.cliente_id])
+            totais_query = await TotaisDiariosService.prepare_upsert_query(
+                cliente_id=new_transacao.cliente_id,
+                moeda=new_transacao.moeda,
+                dia=date_created.date(),
+                valor=new_transacao.valor
+            )
+            query_list = await cls.get_alertas_querys(
+                transacao_id=str(new_id),
+                cliente_id=new_transacao.cliente_id,
+                contraparte=new_transacao.contraparte,
+                valor=new_transacao.valor,
+                moeda=new_transacao.moeda,
+                data_hora=date_created
+            )
+            query_list[:0] = [query, totais_query]
+            await Database.execute_many(query_list)
+            RelatorioCache.invalidate_after_commit([new_transacao.cliente_id])
         return TransacaoResponse(id=new_id, **new_transacao.model_dump(), data_hora=date_created)
 
+    @classmethod
+    async def create_idempotent(
+        cls,
+        new_transacao: TransancaoRequest,
+        chave: str
+    ) -> tuple[TransacaoResponse, bool]:
+        """Create a transaction once per Idempotency-Key.
+
+        A retry with the same key and request gets the response of the first
+        attempt, from the cache or the key table, without evaluating compliance
+        or writing anything again.
+
+        Args:
+            new_transacao (TransancaoRequest): The transaction data to be created.
+            chave (str): The Idempotency-Key sent by the client.
+
+        Returns:
+            tuple[TransacaoResponse, bool]: The transaction data and whether it
+                is the replay of a previous request.
+
+        Raises:
+            IdempotencyKeyReusedException: If the key was used for another request.
+        """
+        hash_requisicao = IdempotenciaService.get_hash_requisicao(new_transacao)
+        resposta = IdempotenciaService.get_cached(chave, hash_requisicao)
+        if resposta:
+            return resposta, True
+
+        async with Database.unit_of_work():
+            resposta = await IdempotenciaService.claim(chave, hash_requisicao)
+            if resposta:
+                return resposta, True
+            resposta = await cls.create(new_transacao)
+            await IdempotenciaService.complete(chave, hash_requisicao, resposta)
+        return resposta, False
+
+    @classmethod
+    async def create_batch(
+        cls,
+        new_transacoes: list[TransancaoRequest]
+    ) -> list[TransacaoBatchItemResponse]:
+        """Create a batch of transactions, evaluating compliance for the whole batch at once.
+
+        Clientes and counterparties are resolved in a single query and the daily
+        totals of every (cliente, moeda, dia) in the batch are read once. Rules are
+        then evaluated in batch order against running totals, so each transaction
+        sees the ones before it. Transactions, totals and alertas are written with
+        multi-row statements in a single database transaction, with the clientes
+        of the batch locked until it commits.
+
+        With COMPLIANCE_ASYNC the transactions are only enqueued for the compliance
+        workers, and the items are returned without regras.
+
+        Args:
+            new_transacoes (list[TransancaoRequest]): The transactions to be created.
+
+        Returns:
+            list[TransacaoBatchItemResponse]: The result of each item, in request order.
+
+        Raises:
+            TransactionBatchTooLargeException: If the batch exceeds the configured size.
+        """
+        if len(new_transacoes) > transacoes_config.TRANSACOES_BATCH_MAX_SIZE:
+            raise TransactionBatchTooLargeException(
+                size=len(new_transacoes),
+                max_size=transacoes_config.TRANSACOES_BATCH_MAX_SIZE
+            )
+
+        cliente_ids = {transacao.cliente_id for transacao in new_transacoes}
+        cliente_ids |= {transacao.contraparte for transacao in new_transacoes if transacao.contraparte}
+        perfis = await ClientesService.get_clientes_perfis(cliente_ids)
+
+        transacao_rows = []
+        contextos = []
+        results = []
+        for indice, new_transacao in enumerate(new_transacoes):
+            missing = [
+                cliente_id
+                for cliente_id in (new_transacao.cliente_id, new_transacao.contraparte)
+                if cliente_id and cliente_id not in perfis
+            ]
+            if missing:
+                results.append(TransacaoBatchItemResponse(
+                    indice=indice,
+                    erro=ClienteNotFoundException(id=missing[0]).detail
+                ))
+                continue
+
+            contraparte = perfis.get(new_transacao.contraparte) if new_transacao.contraparte else None
+            transacao_rows.append({
+                "id": uuid4(),
+                "cliente_id": perfis[new_transacao.cliente_id].id,
+                "tipo": new_transacao.tipo.value,
+                "valor": new_transacao.valor,
+                "moeda": new_transacao.moeda.value,
+                "contraparte": contraparte.id if contraparte else None,
+                "data_hora": datetime.now()
+            })
+            contextos.append(ContextoTransacao(
+                cliente_id=new_transacao.cliente_id,
+                contraparte=new_transacao.contraparte,
+                valor=new_transacao.valor,
+                moeda=new_transacao.moeda,
+                data_hora=transacao_rows[-1]["data_hora"]
+            ))
+            results.append(TransacaoBatchItemResponse(
+                indice=indice,
+                transacao=TransacaoResponse(**transacao_rows[-1])
+            ))
+
+        query_list = [
+            transacoes_table.insert().values(chunk)
+            for chunk in Database.chunk_rows(transacao_rows)
+        ]
+        async with Database.unit_of_work():
+            if fila_config.COMPLIANCE_ASYNC:
+                query_list += FilaComplianceService.prepare_enqueue_querys(transacao_rows)
+                Database.after_commit(FilaComplianceService.notify)
+            else:
+                await ClienteLocks.acquire(row["cliente_id"] for row in transacao_rows)
+                triggered, deltas = await ComplianceService.get_trigged_rules_in_order(contextos, perfis)
+                alertas = []
+                created = [result for result in results if result.transacao]
+                for result, contexto, triggered_rules in zip(created, contextos, triggered):
+                    result.regras = triggered_rules
+                    alertas.extend(await cls.prepare_alertas(
+                        transacao_id=str(result.transacao.id),
+                        cliente_id=contexto.cliente_id,
+                        triggered_rules=triggered_rules
+                    ))
+                query_list += await TotaisDiariosService.prepare_bulk_upsert_querys(deltas)
+                query_list += await AlertasService.prepare_bulk_insert_querys(alertas)
+            if query_list:
+                await Database.execute_many(query_list)
+                RelatorioCache.invalidate_after_commit(row["cliente_id"] for row in transacao_rows)
+        return results
+
     @classmethod
     async def get_alertas_querys(
         cls,
@@ -60,7 +239,8 @@ class TransacoesService:
         cliente_id: str,
         contraparte: str | None,
         valor: float,
-        moeda: MoedaEnum
+        moeda: MoedaEnum,
+        data_hora: datetime
     ) -> list:
         """Generate alert queries based on transaction data.
 
@@ -70,37 +250,52 @@ class TransacoesService:
             contraparte (str | None): The ID of the counterparty involved in the transaction.
             valor (float): The amount of the transaction.
             moeda (MoedaEnum): The currency of the transaction.
+            data_hora (datetime): The date and time of the transaction.
 
         Returns:
             list: A list of alert queries to be executed.
         """
-        querys = []
-
-        today = datetime.combine(datetime.now().date(), time.min)
-        cliente_transacoes = await cls.get_filtered_transactions(
+        triggered_rules = await ComplianceService.get_trigged_rules(ContextoTransacao(
             cliente_id=cliente_id,
-            moeda=moeda,
-            tipo=None,
-            periodo_inicio=today,
-            periodo_fim=None
-        )
-        triggered_rules = await ComplianceService.get_trigged_rules(
             contraparte=contraparte,
             valor=valor,
-            transacoes=cliente_transacoes
+            moeda=moeda,
+            data_hora=data_hora
+        ))
+        alertas = await cls.prepare_alertas(
+            transacao_id=transacao_id,
+            cliente_id=cliente_id,
+            triggered_rules=triggered_rules
         )
-        for rule in triggered_rules:
-            severidade = SEVERIDADE_ENUM_MAP.get(rule)
-            alerta = AlertaRequest(
+        return await AlertasService.prepare_bulk_insert_querys(alertas)
+
+    @classmethod
+    async def prepare_alertas(
+        cls,
+        transacao_id: str,
+        cliente_id: str,
+        triggered_rules: list[RegrasEnum]
+    ) -> list[AlertaRequest]:
+        """Build the alertas for the rules triggered by a transaction.
+
+        Args:
+            transacao_id (str): The ID of the transaction.
+            cliente_id (str): The ID of the client initiating the transaction.
+            triggered_rules (list[RegrasEnum]): The rules triggered by the transaction.
+
+        Returns:
+            list[AlertaRequest]: One new alerta per triggered rule.
+        """
+        return [
+            AlertaRequest(
                 cliente_id=cliente_id,
                 transacao_id=transacao_id,
                 regra=rule,
-                severidade=severidade,
+                severidade=ComplianceService.get_severidade(rule),
                 status=StatusEnum.NOVO
             )
-            query = await AlertasService.prepare_insert_query(alerta)
-            querys.append(query)
-        return querys
+            for rule in triggered_rules
+        ]
 
     @classmethod
     async def get_transaction(cls, transaction_id: str) -> TransacaoResponse:
@@ -139,6 +334,203 @@ class TransacoesService:
             periodo_inicio (datetime | None): Filter by start date.
             periodo_fim (datetime | None): Filter by end date.
         """
+        query = await cls.prepare_filter_query(
+            cliente_id=cliente_id,
+            moeda=moeda,
+            tipo=tipo,
+            periodo_inicio=periodo_inicio,
+            periodo_fim=periodo_fim
+        )
+        rows = await Database.fetch_all(query)
+        return [TransacaoResponse(**row) for row in rows]
+
+    @classmethod
+    async def get_transactions_page(
+        cls,
+        cliente_id: str | None,
+        moeda: MoedaEnum | None,
+        tipo: TipoTransacaoEnum | None,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+        limit: int,
+        cursor: str | None,
+    ) -> TransacoesPage:
+        """Retrieve one page of transactions, ordered by date and ID.
+
+        Args:
+            cliente_id (str | None): Filter by client ID.
+            moeda (MoedaEnum | None): Filter by currency.
+            tipo (TipoTransacaoEnum | None): Filter by transaction type.
+            periodo_inicio (datetime | None): Filter by start date.
+            periodo_fim (datetime | None): Filter by end date.
+            limit (int): The maximum number of transactions in the page.
+            cursor (str | None): The cursor returned with the previous page.
+
+        Returns:
+            TransacoesPage: The transactions and the cursor of the next page.
+        """
+        rows, next_cursor = await cls.fetch_transactions_page(
+            cliente_id=cliente_id,
+            moeda=moeda,
+            tipo=tipo,
+            periodo_inicio=periodo_inicio,
+            periodo_fim=periodo_fim,
+            limit=limit,
+            cursor=cursor
+        )
+        return TransacoesPage(
+            items=[TransacaoResponse(**row) for row in rows],
+            next_cursor=next_cursor
+        )
+
+    @classmethod
+    async def fetch_transactions_page(
+        cls,
+        cliente_id: str | None,
+        moeda: MoedaEnum | None,
+        tipo: TipoTransacaoEnum | None,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+        limit: int,
+        cursor: str | None,
+    ) -> tuple[list[dict], str | None]:
+        """Retrieve the raw rows of one page of transactions, ordered by date and ID.
+
+        Args:
+            cliente_id (str | None): Filter by client ID.
+            moeda (MoedaEnum | None): Filter by currency.
+            tipo (TipoTransacaoEnum | None): Filter by transaction type.
+            periodo_inicio (datetime | None): Filter by start date.
+            periodo_fim (datetime | None): Filter by end date.
+            limit (int): The maximum number of transactions in the page.
+            cursor (str | None): The cursor returned with the previous page.
+
+        Returns:
+            tuple[list[dict], str | None]: The transaction rows and the cursor of the next page.
+        """
+        query = await cls.prepare_filter_query(
+            cliente_id=cliente_id,
+            moeda=moeda,
+            tipo=tipo,
+            periodo_inicio=periodo_inicio,
+            periodo_fim=periodo_fim
+        )
+        query = KeysetPagination.paginate(
+            query,
+            transacoes_table.c.data_hora,
+            transacoes_table.c.id,
+            cursor=cursor,
+            limit=limit
+        )
+        return KeysetPagination.build_page(
+            await Database.fetch_all(query),
+            limit=limit,
+            time_key="data_hora"
+        )
+
+    @classmethod
+    async def get_totais_por_moeda(
+        cls,
+        cliente_id: str,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+        condicao: ColumnElement[bool] | None = None
+    ) -> dict[MoedaEnum, tuple[int, float]]:
+        """Count and sum a client's transactions per currency on the database side.
+
+        Args:
+            cliente_id (str): The ID of the client.
+            periodo_inicio (datetime | None): Filter by start date.
+            periodo_fim (datetime | None): Filter by end date.
+            condicao (ColumnElement[bool] | None): An extra filter, such as the
+                edge days of a rollup read.
+
+        Returns:
+            dict[MoedaEnum, tuple[int, float]]: The number and total amount of
+                transactions for each currency with at least one transaction.
+        """
+        query = await cls.prepare_filter_query(
+            cliente_id=cliente_id,
+            moeda=None,
+            tipo=None,
+            periodo_inicio=periodo_inicio,
+            periodo_fim=periodo_fim
+        )
+        if condicao is not None:
+            query = query.where(condicao)
+        query = query.with_only_columns(
+            transacoes_table.c.moeda,
+            func.count().label("quantidade"),
+            func.sum(transacoes_table.c.valor).label("valor_total")
+        ).group_by(transacoes_table.c.moeda)
+
+        rows = await Database.fetch_all(query)
+        return {
+            MoedaEnum(row["moeda"]): (row["quantidade"], float(row["valor_total"]))
+            for row in rows
+        }
+
+    @classmethod
+    async def stream_transactions(
+        cls,
+        cliente_id: str | None,
+        moeda: MoedaEnum | None,
+        tipo: TipoTransacaoEnum | None,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+        cursor: str | None,
+    ) -> AsyncIterator[bytes]:
+        """Stream the filtered transactions as NDJSON from a server-side cursor.
+
+        Args:
+            cliente_id (str | None): Filter by client ID.
+            moeda (MoedaEnum | None): Filter by currency.
+            tipo (TipoTransacaoEnum | None): Filter by transaction type.
+            periodo_inicio (datetime | None): Filter by start date.
+            periodo_fim (datetime | None): Filter by end date.
+            cursor (str | None): Start after the position of this cursor.
+
+        Yields:
+            bytes: One JSON encoded transaction per line.
+        """
+        query = await cls.prepare_filter_query(
+            cliente_id=cliente_id,
+            moeda=moeda,
+            tipo=tipo,
+            periodo_inicio=periodo_inicio,
+            periodo_fim=periodo_fim
+        )
+        query = KeysetPagination.paginate(
+            query,
+            transacoes_table.c.data_hora,
+            transacoes_table.c.id,
+            cursor=cursor,
+            limit=None
+        )
+        async for row in Database.stream(query):
+            yield encode_ndjson(row, TransacaoResponse)
+
+    @classmethod
+    async def prepare_filter_query(
+        cls,
+        cliente_id: str | None,
+        moeda: MoedaEnum | None,
+        tipo: TipoTransacaoEnum | None,
+        periodo_inicio: datetime | None,
+        periodo_fim: datetime | None,
+    ) -> Select:
+        """Prepare the select query for the provided filters.
+
+        Args:
+            cliente_id (str | None): Filter by client ID.
+            moeda (MoedaEnum | None): Filter by currency.
+            tipo (TipoTransacaoEnum | None): Filter by transaction type.
+            periodo_inicio (datetime | None): Filter by start date.
+            periodo_fim (datetime | None): Filter by end date.
+
+        Returns:
+            Select: The filtered query.
+        """
         query = transacoes_table.select()
 
         if cliente_id:
@@ -156,5 +548,4 @@ class TransacoesService:
         elif periodo_fim and not periodo_inicio:
             query = query.where(transacoes_table.c.data_hora <= periodo_fim)
 
-        rows = await Database.fetch_all(query)
-        return [TransacaoResponse(**row) for row in rows]
+        return query